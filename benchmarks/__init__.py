@@ -0,0 +1 @@
+"""Бенчмарки парсеров и бота"""
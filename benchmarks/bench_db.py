@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк методов EnhancedDatabase на базе в масштабе продакшна
+
+Замеряет время каждого публичного метода (p50/p95/max) на случайных
+пользователях синтетической базы (benchmarks.db_fixtures) и печатает
+EXPLAIN QUERY PLAN для каждого SQL-запроса, который метод выполнил.
+Запросы перехватываются trace callback'ом sqlite3, поэтому план строится
+по настоящему SQL метода, а не по копии в бенчмарке. Строки плана со
+SCAN по большим таблицам помечаются ⚠️ - это полный просмотр таблицы.
+
+Методы меняют данные (история, логи, очистка), поэтому бенчмарк работает
+с копией базы; cleanup_old_data выполняется последним.
+
+    python3 -m benchmarks.bench_db                               # база 10k пользователей
+    python3 -m benchmarks.bench_db --db data/bench.db --iterations 200
+    python3 -m benchmarks.bench_db --module main --users 1000 --no-explain
+"""
+
+import argparse
+import asyncio
+import inspect
+import json
+import random
+import re
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from benchmarks.db_fixtures import DATABASE_MODULES, database_class, listing_url, populate
+
+# Служебные запросы, для которых план не нужен
+_SKIP_STATEMENTS = ("BEGIN", "COMMIT", "ROLLBACK", "PRAGMA", "CREATE", "ALTER", "ANALYZE", "SAVEPOINT", "RELEASE")
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACES = re.compile(r"\s+")
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class StatementRecorder:
+    """Собирает SQL, выполненный каждым методом (по одному на форму запроса)"""
+
+    def __init__(self):
+        self.method: Optional[str] = None
+        # метод -> {форма запроса: первый выполненный SQL}
+        self.statements: Dict[str, Dict[str, str]] = {}
+
+    def __call__(self, sql: str):
+        # Вызывается из потока aiosqlite; методы выполняются по очереди
+        if self.method is None:
+            return
+        sql = _SPACES.sub(" ", sql).strip()
+        if not sql or sql.upper().startswith(_SKIP_STATEMENTS):
+            return
+        shape = _LITERALS.sub("?", sql)
+        self.statements.setdefault(self.method, {}).setdefault(shape, sql)
+
+    @contextmanager
+    def attached(self) -> Iterator["StatementRecorder"]:
+        """Подключает trace callback ко всем новым соединениям sqlite3"""
+        original_connect = sqlite3.connect
+
+        def connect(*args, **kwargs):
+            connection = original_connect(*args, **kwargs)
+            connection.set_trace_callback(self)
+            return connection
+
+        sqlite3.connect = connect
+        try:
+            yield self
+        finally:
+            sqlite3.connect = original_connect
+
+    @contextmanager
+    def recording(self, method: str) -> Iterator[None]:
+        self.method = method
+        try:
+            yield
+        finally:
+            self.method = None
+
+
+def explain(db_path: Path, sql: str) -> List[Tuple[int, str]]:
+    """Строки EXPLAIN QUERY PLAN как (глубина, текст)"""
+    connection = sqlite3.connect(db_path)
+    try:
+        try:
+            rows = connection.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+        except sqlite3.ProgrammingError:
+            # SQL без подставленных значений (старый Python) - параметры как NULL
+            rows = connection.execute(f"EXPLAIN QUERY PLAN {sql}", [None] * sql.count("?")).fetchall()
+    except sqlite3.Error as e:
+        return [(0, f"не удалось построить план: {e}")]
+    finally:
+        connection.close()
+
+    depth: Dict[int, int] = {0: -1}
+    plan = []
+    for node_id, parent_id, _, detail in rows:
+        depth[node_id] = depth.get(parent_id, -1) + 1
+        plan.append((depth[node_id], detail))
+    return plan
+
+
+def _sample_properties(user_id: int, iteration: int, batch: int, history: int) -> List[Dict[str, Any]]:
+    """Пакет объявлений цикла: половина уже есть в истории, половина новых"""
+    known = [listing_url(user_id, index) for index in range(min(batch // 2, history))]
+    fresh = [f"https://www.daft.ie/for-rent/apartment-bench/{9000000 + iteration * batch + index}"
+             for index in range(batch - len(known))]
+    return [
+        {"url": url, "title": "2 Bed Apartment, Dublin", "price": 2100, "bedrooms": 2,
+         "location": "dublin-city", "property_type": "Apartment"}
+        for url in known + fresh
+    ]
+
+
+def build_cases(db, batch: int, history: int) -> List[Tuple[str, Callable[[int, int], Any], bool]]:
+    """(метод, вызов(user_id, итерация), однократный) в порядке выполнения"""
+    params = {"regions": ["dublin-city"], "min_bedrooms": 2, "max_price": 2500}
+    phases = {"fetch": 1.2, "extract": 0.3, "dedup": 0.05, "render": 0.01, "send": 0.4}
+
+    # У EnhancedDatabase из database.database нет chat_id
+    if "chat_id" in inspect.signature(db.get_or_create_user).parameters:
+        def get_or_create_user(user_id, _):
+            return db.get_or_create_user(user_id, user_id, username=f"user{user_id}")
+    else:
+        def get_or_create_user(user_id, _):
+            return db.get_or_create_user(user_id, username=f"user{user_id}")
+
+    cases = [
+        ("get_or_create_user", get_or_create_user, False),
+        ("get_user_settings", lambda user_id, _: db.get_user_settings(user_id), False),
+        ("update_user_settings", lambda user_id, i: db.update_user_settings(user_id, max_price=2000 + i % 10 * 100), False),
+        ("get_new_properties", lambda user_id, i: db.get_new_properties(
+            user_id, _sample_properties(user_id, i, batch, history), params), False),
+        ("mark_properties_as_sent", lambda user_id, i: db.mark_properties_as_sent(
+            user_id, [p["url"] for p in _sample_properties(user_id, i, batch, history)]), False),
+        ("log_monitoring_session", lambda user_id, _: db.log_monitoring_session(
+            user_id, params, batch, batch // 2, 2.0, phase_timings=phases), False),
+        ("get_user_statistics", lambda user_id, _: db.get_user_statistics(user_id, days=7), False),
+    ]
+    if hasattr(db, "get_user_properties_count"):
+        cases.append(("get_user_properties_count", lambda user_id, _: db.get_user_properties_count(user_id), False))
+    cases.append(("cleanup_old_data", lambda user_id, _: db.cleanup_old_data(days=30), True))
+    return cases
+
+
+async def run_benchmark(db_path: Path, module: str, iterations: int, batch: int, history: int,
+                        recorder: StatementRecorder, seed: int = 0) -> Dict[str, Dict[str, float]]:
+    """Время методов (мс) на базе db_path"""
+    connection = sqlite3.connect(db_path)
+    max_user = connection.execute("SELECT MAX(user_id) FROM users").fetchone()[0] or 1
+    connection.close()
+
+    db = database_class(module)(str(db_path))
+    rng = random.Random(seed)
+    results = {}
+
+    for method, call, once in build_cases(db, batch, history):
+        timings = []
+        for iteration in range(1 if once else iterations):
+            user_id = rng.randint(1, max_user)
+            with recorder.recording(method):
+                started = time.perf_counter()
+                await call(user_id, iteration)
+                timings.append((time.perf_counter() - started) * 1000)
+        results[method] = {
+            "calls": len(timings),
+            "mean_ms": round(statistics.mean(timings), 2),
+            "p50_ms": round(statistics.median(timings), 2),
+            "p95_ms": round(percentile(timings, 0.95), 2),
+            "max_ms": round(max(timings), 2),
+        }
+        print(f"   {method:<26} {results[method]['p50_ms']:>9} {results[method]['p95_ms']:>9} "
+              f"{results[method]['max_ms']:>9}")
+    return results
+
+
+def print_plans(db_path: Path, recorder: StatementRecorder) -> Dict[str, List[Dict[str, Any]]]:
+    """Печатает планы запросов по методам и возвращает их для JSON"""
+    plans = {}
+    for method, statements in recorder.statements.items():
+        print(f"\n🔎 {method}")
+        plans[method] = []
+        for sql in statements.values():
+            plan = explain(db_path, sql)
+            plans[method].append({"sql": sql, "plan": [detail for _, detail in plan]})
+            print(f"   {sql[:160]}{'...' if len(sql) > 160 else ''}")
+            if not plan:
+                print("      — (вставка без выборки)")
+            for depth, detail in plan:
+                full_scan = detail.startswith("SCAN") and "USING" not in detail and "CONSTANT" not in detail
+                print(f"      {'  ' * depth}{'⚠️ ' if full_scan else ''}{detail}")
+    return plans
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Бенчмарк методов EnhancedDatabase")
+    arg_parser.add_argument("--db", type=Path, help="Готовая база (копируется); по умолчанию генерируется")
+    arg_parser.add_argument("--module", choices=sorted(DATABASE_MODULES), default="enhanced",
+                            help="Какой EnhancedDatabase: enhanced_main.py или main.py")
+    arg_parser.add_argument("--users", type=int, default=10000, help="Пользователей в генерируемой базе")
+    arg_parser.add_argument("--history", type=int, default=100, help="Объявлений в истории на пользователя")
+    arg_parser.add_argument("--logs", type=int, default=30, help="Сессий мониторинга на пользователя")
+    arg_parser.add_argument("--iterations", type=int, default=50, help="Вызовов каждого метода")
+    arg_parser.add_argument("--batch", type=int, default=20, help="Объявлений за цикл в get_new_properties")
+    arg_parser.add_argument("--no-explain", action="store_true", help="Без EXPLAIN QUERY PLAN")
+    arg_parser.add_argument("--output", type=Path, help="Сохранить результат в JSON")
+    args = arg_parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="bench-db-") as workdir:
+        db_path = Path(workdir) / "bench.db"
+        if args.db:
+            shutil.copyfile(args.db, db_path)
+            print(f"📂 Копия {args.db} ({args.db.stat().st_size / 1024 / 1024:.1f} МБ)")
+        else:
+            print(f"🏗️ Генерация базы: {args.users:,} пользователей, {args.users * args.history:,} объявлений, "
+                  f"{args.users * args.logs:,} логов...")
+            started = time.perf_counter()
+            populate(db_path, args.users, args.history, args.logs, module=args.module)
+            print(f"   готово за {time.perf_counter() - started:.1f} с "
+                  f"({db_path.stat().st_size / 1024 / 1024:.1f} МБ)")
+
+        print(f"\n⏱️ {'метод':<26} {'p50, мс':>9} {'p95, мс':>9} {'max, мс':>9}")
+        recorder = StatementRecorder()
+        with recorder.attached():
+            results = asyncio.run(run_benchmark(db_path, args.module, args.iterations,
+                                                args.batch, args.history, recorder))
+
+        plans = {} if args.no_explain else print_plans(db_path, recorder)
+
+    if args.output:
+        report = {
+            "config": {"module": args.module, "db": str(args.db) if args.db else None, "users": args.users,
+                       "history": args.history, "logs": args.logs, "iterations": args.iterations,
+                       "batch": args.batch},
+            "methods": results,
+            "plans": plans,
+        }
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\n💾 Результат: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Микро-бенчмарк извлечения полей объявления регулярными выражениями
+
+Сравнивает прежнюю схему (строковые шаблоны, page_content.lower() на
+каждый шаблон, поиск JSON полей по всему документу) с предкомпилированными
+шаблонами parser.patterns. Сбор текста элементов (HTMLParser) одинаков
+для обеих схем и вынесен за пределы замера.
+
+    python3 -m benchmarks.bench_extraction
+    python3 -m benchmarks.bench_extraction --pages saved_pages/ --repeat 20
+"""
+
+import argparse
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks.fixtures import generate_corpus, load_pages
+from parser import extractor, patterns
+
+
+def legacy_regex_stage(texts: Dict[str, str], html: str) -> dict:
+    """Прежняя схема извлечения (до parser.patterns)"""
+    price = None
+    for key in extractor.PRICE_TARGETS:
+        price_match = re.search(r'€([\d,]+)', texts.get(key) or '')
+        if price_match:
+            price = int(price_match.group(1).replace(',', ''))
+            break
+    if price is None:
+        json_match = re.search(r'"price":\s*(\d+)', html)
+        price = int(json_match.group(1)) if json_match else None
+
+    found_bedrooms = []
+    json_match = re.search(r'"numBedrooms":\s*"?(\d+)"?', html)
+    if json_match and 0 <= int(json_match.group(1)) <= 10:
+        found_bedrooms.append(int(json_match.group(1)))
+
+    for key in extractor.BEDROOM_TARGETS:
+        text = texts.get(key)
+        if not text:
+            continue
+        for pattern in [r'(\d+)\s*bed', r'(\d+)\s*bedroom', r'(\d+)\s*br\b',
+                        r'beds?\s*:\s*(\d+)', r'(\d+)\s*-?\s*bed']:
+            for match in re.findall(pattern, text.lower()):
+                if 0 <= int(match) <= 10:
+                    found_bedrooms.append(int(match))
+
+    title_text = texts.get('h1')
+    if title_text:
+        if 'studio' in title_text.lower():
+            found_bedrooms.append(0)
+        else:
+            for pattern in [r'(\d+)\s*bed', r'(\d+)\s*bedroom']:
+                for match in re.findall(pattern, title_text.lower()):
+                    if 0 <= int(match) <= 10:
+                        found_bedrooms.append(int(match))
+
+    for pattern in [r'(\d+)\s*bedroom\s*(?:house|apartment|flat)',
+                    r'(?:house|apartment|flat).*?(\d+)\s*bedroom',
+                    r'(\d+)\s*bed\s*(?:house|apartment|flat)']:
+        for match in re.findall(pattern, html.lower()):
+            if 0 <= int(match) <= 10:
+                found_bedrooms.append(int(match))
+
+    type_match = re.search(r'"propertyType":\s*"([^"]*)"', html)
+    desc_match = re.search(r'"description":\s*"([^"]*)"', html)
+
+    return {
+        'price': price,
+        'bedrooms': extractor.choose_bedrooms(found_bedrooms),
+        'property_type': type_match.group(1) if type_match else None,
+        'description': desc_match.group(1)[:200] if desc_match else None,
+    }
+
+
+def compiled_regex_stage(texts: Dict[str, str], html: str) -> dict:
+    """Текущая схема: предкомпилированные шаблоны, один буфер, JSON фрагмент"""
+    json_text = patterns.json_scope(html)
+    page_lower = html.lower()
+    return {
+        'price': extractor.extract_price(texts, json_text),
+        'bedrooms': extractor.extract_bedrooms(texts, json_text, page_lower),
+        'property_type': extractor.extract_property_type(json_text),
+        'description': extractor.extract_description(json_text),
+    }
+
+
+def measure(stage: Callable[[Dict[str, str], str], dict],
+            pages: List[Tuple[Dict[str, str], str]], repeat: int) -> List[float]:
+    """Время обработки одной страницы (мс) для каждого прогона"""
+    timings = []
+    for _ in range(repeat):
+        for texts, html in pages:
+            started = time.perf_counter()
+            stage(texts, html)
+            timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def summarize(name: str, timings: List[float]) -> str:
+    ordered = sorted(timings)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    return (f"{name:<10} median {statistics.median(ordered):7.3f} ms   "
+            f"p95 {p95:7.3f} ms   total {sum(ordered):9.1f} ms")
+
+
+def check_expected(corpus: List[Tuple[str, dict]]) -> int:
+    """Сверяет результаты с ожидаемыми значениями синтетических страниц"""
+    errors = 0
+    for html, expected in corpus:
+        fields = extractor.extract_property_fields(html)
+        for name, value in expected.items():
+            if fields.get(name) != value:
+                errors += 1
+                print(f"❌ {name}: ожидалось {value!r}, получено {fields.get(name)!r}")
+    return errors
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Бенчмарк извлечения полей объявления")
+    arg_parser.add_argument("--pages", type=Path, help="Каталог с сохраненными страницами (*.html)")
+    arg_parser.add_argument("--count", type=int, default=20, help="Количество синтетических страниц")
+    arg_parser.add_argument("--repeat", type=int, default=10, help="Количество прогонов")
+    args = arg_parser.parse_args(argv)
+
+    if args.pages:
+        raw_pages = [html for _, html in load_pages(args.pages)]
+        if not raw_pages:
+            print(f"❌ В {args.pages} нет *.html файлов")
+            return 1
+        errors = 0
+    else:
+        corpus = generate_corpus(args.count)
+        raw_pages = [html for html, _ in corpus]
+        errors = check_expected(corpus)
+
+    pages = [(extractor.collect_element_texts(html), html) for html in raw_pages]
+    average_kb = sum(len(html) for _, html in pages) / len(pages) / 1024
+    print(f"📄 Страниц: {len(pages)}, средний размер {average_kb:.0f} KB, прогонов: {args.repeat}")
+
+    # Обе схемы должны давать одинаковый результат
+    for texts, html in pages:
+        legacy, compiled = legacy_regex_stage(texts, html), compiled_regex_stage(texts, html)
+        if legacy['bedrooms'] != compiled['bedrooms'] or legacy['property_type'] != compiled['property_type']:
+            print(f"⚠️ Расхождение: legacy={legacy} compiled={compiled}")
+
+    legacy_timings = measure(legacy_regex_stage, pages, args.repeat)
+    compiled_timings = measure(compiled_regex_stage, pages, args.repeat)
+
+    print(summarize("legacy", legacy_timings))
+    print(summarize("compiled", compiled_timings))
+    print(f"⚡ Ускорение: {sum(legacy_timings) / sum(compiled_timings):.1f}x")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк разбора HTML: html.parser против lxml и частичного разбора
+
+Для каждой страницы измеряются время и пиковая память Python (tracemalloc):
+    html.parser      - BeautifulSoup(html, 'html.parser'), как было в парсерах
+    lxml             - utils.html_parsing.make_soup(html)
+    lxml a+script    - make_soup(html, LINKS_AND_SCRIPTS)
+    lxml hrefs       - extract_hrefs(html), без BeautifulSoup
+
+Память самого libxml2 tracemalloc не видит, поэтому для варианта
+"lxml hrefs" пик отражает только результат и временные объекты Python.
+
+    python3 -m benchmarks.bench_html_parsing
+    python3 -m benchmarks.bench_html_parsing --pages saved_pages/
+"""
+
+import argparse
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+from benchmarks.fixtures import generate_corpus, load_pages
+from utils.html_parsing import HTML_BACKEND, LINKS_AND_SCRIPTS, extract_hrefs, make_soup
+
+
+def html_parser_links(html: str) -> int:
+    soup = BeautifulSoup(html, 'html.parser')
+    return len(soup.find_all('a', href=True))
+
+
+def lxml_links(html: str) -> int:
+    return len(make_soup(html).find_all('a', href=True))
+
+
+def lxml_strained_links(html: str) -> int:
+    return len(make_soup(html, LINKS_AND_SCRIPTS).find_all('a', href=True))
+
+
+def lxml_hrefs(html: str) -> int:
+    return len(extract_hrefs(html))
+
+
+METHODS: Dict[str, Callable[[str], int]] = {
+    'html.parser': html_parser_links,
+    'lxml': lxml_links,
+    'lxml a+script': lxml_strained_links,
+    'lxml hrefs': lxml_hrefs,
+}
+
+
+def run(method: Callable[[str], int], pages: List[str], repeat: int):
+    """Время (мс) и пик памяти (KB) на страницу, количество ссылок"""
+    timings = []
+    peaks = []
+    links = 0
+    for _ in range(repeat):
+        for html in pages:
+            started = time.perf_counter()
+            links = method(html)
+            timings.append((time.perf_counter() - started) * 1000)
+
+    for html in pages:
+        tracemalloc.start()
+        method(html)
+        peaks.append(tracemalloc.get_traced_memory()[1] / 1024)
+        tracemalloc.stop()
+
+    return timings, peaks, links
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Бенчмарк разбора HTML")
+    arg_parser.add_argument("--pages", type=Path, help="Каталог с сохраненными страницами (*.html)")
+    arg_parser.add_argument("--count", type=int, default=5, help="Количество синтетических страниц")
+    arg_parser.add_argument("--repeat", type=int, default=2, help="Количество прогонов")
+    args = arg_parser.parse_args(argv)
+
+    if args.pages:
+        pages = [html for _, html in load_pages(args.pages)]
+        if not pages:
+            print(f"❌ В {args.pages} нет *.html файлов")
+            return 1
+    else:
+        pages = [html for html, _ in generate_corpus(args.count)]
+
+    if HTML_BACKEND != 'lxml':
+        print("⚠️ lxml не установлен - make_soup использует html.parser")
+
+    print(f"📄 Страниц: {len(pages)}, прогонов: {args.repeat}")
+    baseline = None
+    for name, method in METHODS.items():
+        timings, peaks, links = run(method, pages, args.repeat)
+        median_ms = statistics.median(timings)
+        median_kb = statistics.median(peaks)
+        baseline = baseline or (median_ms, median_kb)
+        print(f"{name:<14} {median_ms:8.1f} ms ({baseline[0] / median_ms:5.1f}x)   "
+              f"пик {median_kb:9.0f} KB ({baseline[1] / median_kb:5.1f}x)   ссылок {links}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк задержки event loop при разборе страниц объявлений
+
+Пока страницы разбираются через parser.offload.extract_fields, фоновая
+корутина каждые --interval мс засыпает и измеряет, насколько позже она
+проснулась. Это та же задержка, с которой бот обработал бы апдейт
+Telegram во время цикла мониторинга. Режимы сравниваются между собой:
+    none     - extract_property_fields прямо в event loop (как раньше)
+    thread   - пул потоков (GIL делится с event loop)
+    process  - пул процессов
+
+    python3 -m benchmarks.bench_loop_lag
+    python3 -m benchmarks.bench_loop_lag --pages saved_pages/ --workers 4
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from benchmarks.fixtures import generate_corpus, load_pages
+from config.settings import settings
+from parser import offload
+
+MODES = ("none", "thread", "process")
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def sample_lag(interval: float, lags: List[float], stop: asyncio.Event):
+    """Записывает опоздание пробуждения (мс) до установки stop"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, loop.time() - expected) * 1000)
+
+
+async def measure(mode: str, pages: List[str], workers: int, interval: float):
+    """Задержки event loop (мс) и общее время разбора (с) в режиме mode"""
+    settings.PARSE_EXECUTOR = mode
+    offload.get_executor(mode, workers)
+    # Прогрев: запуск процессов и импорт модулей не входят в замер
+    await asyncio.gather(*(offload.extract_fields(pages[0]) for _ in range(workers)))
+
+    lags: List[float] = []
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_lag(interval, lags, stop))
+    await asyncio.sleep(interval * 2)
+
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(workers)
+
+    async def extract(html: str):
+        async with semaphore:
+            return await offload.extract_fields(html)
+
+    await asyncio.gather(*(extract(html) for html in pages))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await sampler
+    offload.shutdown_executor()
+    return lags, elapsed
+
+
+async def run(pages: List[str], workers: int, interval: float):
+    print(f"📄 Страниц: {len(pages)}, воркеров: {workers}, интервал замера: {interval * 1000:.0f} ms")
+    for mode in MODES:
+        lags, elapsed = await measure(mode, pages, workers, interval)
+        print(f"{mode:<8} разбор {elapsed:6.2f} s   задержка loop: "
+              f"p50 {statistics.median(lags):7.1f} ms   p95 {percentile(lags, 0.95):7.1f} ms   "
+              f"p99 {percentile(lags, 0.99):7.1f} ms   max {max(lags):7.1f} ms")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Задержка event loop при разборе HTML")
+    arg_parser.add_argument("--pages", type=Path, help="Каталог с сохраненными страницами (*.html)")
+    arg_parser.add_argument("--count", type=int, default=20, help="Количество синтетических страниц")
+    arg_parser.add_argument("--workers", type=int, default=settings.PARSE_WORKERS, help="Размер пула")
+    arg_parser.add_argument("--interval", type=float, default=10, help="Период замера задержки, мс")
+    args = arg_parser.parse_args(argv)
+
+    if args.pages:
+        pages = [html for _, html in load_pages(args.pages)]
+        if not pages:
+            print(f"❌ В {args.pages} нет *.html файлов")
+            return 1
+    else:
+        pages = [html for html, _ in generate_corpus(args.count)]
+
+    asyncio.run(run(pages, args.workers, args.interval / 1000))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
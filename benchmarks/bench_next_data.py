@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк получения JSON полей объявления
+
+Сравнивает три способа:
+    regex    - re.search по всему документу (прежний _extract_price и др.)
+    soup     - дерево BeautifulSoup ради одного script (прежний RealDaftParser)
+    locator  - parser.next_data: поиск __NEXT_DATA__ по смещению и json.loads среза
+
+    python3 -m benchmarks.bench_next_data
+    python3 -m benchmarks.bench_next_data --pages saved_pages/ --repeat 5
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.fixtures import generate_corpus, load_pages
+from parser import next_data, patterns
+
+FIELDS = ("price", "bedrooms", "property_type")
+# Спальни синтетических страниц не сверяются (см. benchmarks.fixtures)
+CHECKED_FIELDS = ("price", "property_type")
+
+
+def regex_fields(html: str) -> Dict[str, object]:
+    """Первое совпадение в любом месте документа"""
+    type_match = patterns.JSON_PROPERTY_TYPE.search(html)
+    return {
+        "price": patterns.search_int(patterns.JSON_PRICE, html),
+        "bedrooms": patterns.search_int(patterns.JSON_NUM_BEDROOMS, html),
+        "property_type": type_match.group(1) if type_match else None,
+    }
+
+
+def _listing_fields(listing: Optional[dict]) -> Dict[str, object]:
+    if listing is None:
+        return dict.fromkeys(FIELDS)
+    return {
+        "price": next_data.listing_price(listing),
+        "bedrooms": next_data.listing_bedrooms(listing),
+        "property_type": next_data.listing_property_type(listing),
+    }
+
+
+def soup_fields(html: str) -> Dict[str, object]:
+    """Полное дерево BeautifulSoup и поиск script"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    script_tag = soup.find("script", id="__NEXT_DATA__")
+    data = json.loads(script_tag.string) if script_tag else None
+    return _listing_fields(next_data.find_listing(data))
+
+
+def locator_fields(html: str) -> Dict[str, object]:
+    """Срез __NEXT_DATA__ по смещению"""
+    return _listing_fields(next_data.find_listing(next_data.parse_next_data(html)))
+
+
+def measure(method: Callable[[str], dict], pages: List[str], repeat: int) -> List[float]:
+    """Время обработки одной страницы (мс)"""
+    timings = []
+    for _ in range(repeat):
+        for html in pages:
+            started = time.perf_counter()
+            method(html)
+            timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Бенчмарк извлечения __NEXT_DATA__")
+    arg_parser.add_argument("--pages", type=Path, help="Каталог с сохраненными страницами (*.html)")
+    arg_parser.add_argument("--count", type=int, default=20, help="Количество синтетических страниц")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="Количество прогонов")
+    args = arg_parser.parse_args(argv)
+
+    if args.pages:
+        pages = [html for _, html in load_pages(args.pages)]
+        expected: List[Optional[dict]] = [None] * len(pages)
+        if not pages:
+            print(f"❌ В {args.pages} нет *.html файлов")
+            return 1
+    else:
+        corpus = generate_corpus(args.count)
+        pages = [html for html, _ in corpus]
+        expected = [values for _, values in corpus]
+
+    methods = {"regex": regex_fields, "locator": locator_fields}
+    try:
+        import bs4  # noqa: F401
+        methods["soup"] = soup_fields
+    except ImportError:
+        print("⚠️ bs4 не установлен - вариант soup пропущен")
+
+    print(f"📄 Страниц: {len(pages)}, прогонов: {args.repeat}")
+    totals = {}
+    for name, method in methods.items():
+        correct = 0
+        checked = 0
+        for html, values in zip(pages, expected):
+            if values is None:
+                continue
+            result = method(html)
+            checked += 1
+            correct += all(result[field] == values[field] for field in CHECKED_FIELDS)
+
+        timings = measure(method, pages, args.repeat)
+        totals[name] = sum(timings)
+        accuracy = f"верно {correct}/{checked}" if checked else ""
+        print(f"{name:<8} median {statistics.median(timings):8.3f} ms   "
+              f"max {max(timings):8.3f} ms   {accuracy}")
+
+    for name in ("regex", "soup"):
+        if name not in totals:
+            continue
+        ratio = totals[name] / totals["locator"]
+        if ratio >= 1:
+            print(f"⚡ locator быстрее {name} в {ratio:.1f}x")
+        else:
+            print(f"⚡ locator медленнее {name} в {1 / ratio:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
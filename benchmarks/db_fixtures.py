@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Синтетическая база EnhancedDatabase в масштабе продакшна
+
+Схему создает сам EnhancedDatabase.init_database() (вместе с миграциями),
+затем таблицы users, user_settings, property_history и monitoring_logs
+заполняются пакетно через sqlite3 в одной транзакции - так миллионы строк
+вставляются за десятки секунд, а не часы через методы класса.
+
+Даты равномерно распределены за последние --days дней в формате
+CURRENT_TIMESTAMP, поэтому выборки за период и cleanup_old_data видят
+те же данные, что и в рабочей базе.
+
+    python3 -m benchmarks.db_fixtures data/bench.db --users 10000 --history 200
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from utils.phase_timer import PHASES
+
+# Модули с EnhancedDatabase: бот main.py и enhanced_main.py
+DATABASE_MODULES = {
+    "enhanced": "database.enhanced_database",
+    "main": "database.database",
+}
+
+REGIONS = ["dublin-city", "dublin-1", "dublin-2", "dublin-4", "dublin-6", "cork-city", "galway-city"]
+PROPERTY_TYPES = ["Apartment", "House", "Studio", "Duplex", "Townhouse"]
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+BATCH_SIZE = 10000
+
+
+def database_class(module: str = "enhanced"):
+    """Класс EnhancedDatabase из выбранного модуля"""
+    return importlib.import_module(DATABASE_MODULES[module]).EnhancedDatabase
+
+
+def listing_url(user_id: int, index: int) -> str:
+    """URL объявления index пользователя user_id (как в property_history)"""
+    listing_id = 5000000 + (user_id * 7919 + index) % 3000000
+    return f"https://www.daft.ie/for-rent/apartment-{listing_id}/{listing_id}"
+
+
+def _timestamp(now: datetime, rng: random.Random, days: int) -> str:
+    return (now - timedelta(seconds=rng.uniform(0, days * 86400))).strftime(TIMESTAMP_FORMAT)
+
+
+def _users(count: int, now: datetime, rng: random.Random, days: int) -> Iterator[Tuple]:
+    for user_id in range(1, count + 1):
+        created = _timestamp(now, rng, days)
+        yield (user_id, f"user{user_id}", f"User{user_id}", None, created, created, 1)
+
+
+def _settings(count: int, rng: random.Random, monitoring_share: float, with_chat_id: bool) -> Iterator[Tuple]:
+    for user_id in range(1, count + 1):
+        regions = json.dumps(rng.sample(REGIONS, rng.randint(1, 3)))
+        row = (regions, rng.randint(1, 4), rng.choice([1500, 2000, 2500, 3000, 4000]),
+               rng.choice([300, 900, 1800, 3600]), 50, int(rng.random() < monitoring_share))
+        # В схеме main.py нет chat_id
+        yield (user_id, user_id) + row if with_chat_id else (user_id,) + row
+
+
+def _history(count: int, per_user: int, now: datetime, rng: random.Random, days: int) -> Iterator[Tuple]:
+    params = json.dumps({"regions": ["dublin-city"], "min_bedrooms": 2, "max_price": 2500})
+    for user_id in range(1, count + 1):
+        for index in range(per_user):
+            yield (user_id, listing_url(user_id, index), f"{rng.randint(1, 4)} Bed Apartment, Dublin",
+                   rng.randint(900, 4500), rng.randint(1, 4), rng.choice(REGIONS),
+                   rng.choice(PROPERTY_TYPES), _timestamp(now, rng, days), int(rng.random() < 0.9), params)
+
+
+def _logs(count: int, per_user: int, now: datetime, rng: random.Random, days: int) -> Iterator[Tuple]:
+    params = json.dumps({"regions": ["dublin-city"], "min_bedrooms": 2, "max_price": 2500})
+    for user_id in range(1, count + 1):
+        for _ in range(per_user):
+            failed = rng.random() < 0.05
+            phases = {phase: round(rng.uniform(0.01, 3.0), 3) for phase in PHASES}
+            yield (user_id, params, rng.randint(0, 60), rng.randint(0, 5), round(sum(phases.values()), 3),
+                   "error" if failed else "success", "Timeout" if failed else None,
+                   json.dumps(phases, separators=(',', ':')), _timestamp(now, rng, days))
+
+
+def _insert(connection: sqlite3.Connection, sql: str, rows: Iterator[Tuple]) -> int:
+    total = 0
+    batch: List[Tuple] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            connection.executemany(sql, batch)
+            total += len(batch)
+            batch.clear()
+    if batch:
+        connection.executemany(sql, batch)
+        total += len(batch)
+    return total
+
+
+def populate(db_path: Path, users: int = 10000, history_per_user: int = 100, logs_per_user: int = 30,
+             days: int = 60, monitoring_share: float = 0.3, module: str = "enhanced", seed: int = 0) -> dict:
+    """Создает базу db_path заново и заполняет ее; возвращает количество строк по таблицам"""
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        Path(f"{db_path}{suffix}").unlink(missing_ok=True)
+
+    asyncio.run(database_class(module)(str(db_path)).init_database())
+
+    rng = random.Random(seed)
+    now = datetime.now()
+    connection = sqlite3.connect(db_path)
+    try:
+        connection.execute("PRAGMA synchronous = OFF")
+        with_chat_id = any(column[1] == "chat_id"
+                           for column in connection.execute("PRAGMA table_info(user_settings)"))
+        settings_columns = "user_id, chat_id" if with_chat_id else "user_id"
+        with connection:
+            counts = {
+                "users": _insert(connection, """
+                    INSERT INTO users (user_id, username, first_name, last_name, created_at, last_activity, is_active)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, _users(users, now, rng, days)),
+                "user_settings": _insert(connection, f"""
+                    INSERT INTO user_settings ({settings_columns}, regions, min_bedrooms, max_price,
+                                               monitoring_interval, max_results_per_search, is_monitoring_active)
+                    VALUES ({", ".join("?" * (7 + with_chat_id))})
+                """, _settings(users, rng, monitoring_share, with_chat_id)),
+                "property_history": _insert(connection, """
+                    INSERT INTO property_history (user_id, property_url, property_title, price, bedrooms,
+                                                  location, property_type, found_at, is_sent, search_params)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, _history(users, history_per_user, now, rng, days)),
+                "monitoring_logs": _insert(connection, """
+                    INSERT INTO monitoring_logs (user_id, search_params, properties_found, new_properties,
+                                                 execution_time, status, error_message, phase_timings, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, _logs(users, logs_per_user, now, rng, days)),
+            }
+        connection.execute("ANALYZE")
+    finally:
+        connection.close()
+    return counts
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Синтетическая база EnhancedDatabase")
+    arg_parser.add_argument("db_path", type=Path, help="Файл базы (перезаписывается)")
+    arg_parser.add_argument("--module", choices=sorted(DATABASE_MODULES), default="enhanced",
+                            help="Чья схема: enhanced_main.py или main.py")
+    arg_parser.add_argument("--users", type=int, default=10000)
+    arg_parser.add_argument("--history", type=int, default=100, help="Объявлений в истории на пользователя")
+    arg_parser.add_argument("--logs", type=int, default=30, help="Сессий мониторинга на пользователя")
+    arg_parser.add_argument("--days", type=int, default=60, help="За сколько дней распределены даты")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args(argv)
+
+    started = time.perf_counter()
+    counts = populate(args.db_path, args.users, args.history, args.logs, args.days,
+                      module=args.module, seed=args.seed)
+    size_mb = args.db_path.stat().st_size / 1024 / 1024
+    print(f"✅ {args.db_path}: " + ", ".join(f"{table} {rows:,}" for table, rows in counts.items())
+          + f" ({size_mb:.1f} МБ, {time.perf_counter() - started:.1f} с)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Фейковый Telegram Bot API для нагрузочного теста бота
+
+Отвечает на запросы aiogram по адресу /bot<token>/<method>, как
+api.telegram.org: getUpdates (long polling), sendMessage, editMessageText,
+answerCallbackQuery, getMe; остальные методы возвращают True. Бот
+подключается через TELEGRAM_API_URL.
+
+Ограничения Telegram имитируются token bucket'ами: --chat-rate сообщений
+в секунду на чат и --global-rate на бота; при превышении (и случайно с
+вероятностью --flood-probability) сервер отвечает 429 с retry_after, как
+настоящий Bot API.
+
+Симулятор пользователей кладет апдейты через push_message/push_callback и
+получает future, который завершится с временем от апдейта до первого
+ответа бота этому пользователю.
+"""
+
+import asyncio
+import json
+import math
+import random
+import statistics
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+BOT_USER = {"id": 100000, "is_bot": True, "first_name": "Daft Load Test", "username": "daft_load_test_bot"}
+# Методы, на которые распространяются лимиты отправки
+RATE_LIMITED = {"sendMessage", "editMessageText", "sendPhoto", "sendMediaGroup"}
+# Дольше не держим getUpdates, даже если бот просит больший timeout
+MAX_POLL_TIMEOUT = 30.0
+
+
+def latency_summary(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "p50_ms": round(statistics.median(ordered) * 1000, 1),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+        "max_ms": round(ordered[-1] * 1000, 1),
+    }
+
+
+class _TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """0, если токен взят, иначе сколько секунд ждать"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class FakeTelegramServer:
+    """Bot API в памяти с лимитами отправки и учетом задержек"""
+
+    def __init__(self, latency_ms: float = 20, chat_rate: float = 1.0, chat_burst: float = 3,
+                 global_rate: float = 30.0, flood_probability: float = 0.0, retry_after: int = 1,
+                 host: str = "127.0.0.1", port: int = 0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.flood_probability = flood_probability
+        self.retry_after = retry_after
+        self.host = host
+        self.port = port
+        self._rng = random.Random(seed)
+        self._runner: Optional[web.AppRunner] = None
+
+        self._global_bucket = _TokenBucket(global_rate, global_rate)
+        self._chat_buckets: Dict[int, _TokenBucket] = {}
+
+        # Очередь апдейтов для getUpdates
+        self._updates: List[Dict[str, Any]] = []
+        self._next_update_id = 1
+        self._new_updates = asyncio.Event()
+        self._pushed_at: Dict[int, float] = {}
+
+        # Ожидающие ответа апдейты по чату: (время апдейта, callback_query_id, future)
+        self._pending: Dict[int, Deque[Tuple[float, Optional[str], asyncio.Future]]] = {}
+        self._callback_chats: Dict[str, int] = {}
+        self._next_message_id: Dict[int, int] = {}
+        self._last_message: Dict[int, Dict[str, Any]] = {}
+
+        # Статистика
+        self.calls: Counter = Counter()
+        # Время первого вызова каждого метода (для замера старта бота)
+        self.first_call_at: Dict[str, float] = {}
+        self.flood: Counter = Counter()
+        self.delivery_lags: List[float] = []
+        self.sent_at: List[float] = []
+        self.started_at = time.monotonic()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_route("*", "/bot{token}/{method}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        self.started_at = time.monotonic()
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    # === АПДЕЙТЫ ОТ ПОЛЬЗОВАТЕЛЕЙ ===
+
+    def _user(self, user_id: int) -> Dict[str, Any]:
+        return {"id": user_id, "is_bot": False, "first_name": f"User{user_id}",
+                "username": f"user{user_id}", "language_code": "ru"}
+
+    def _chat(self, chat_id: int) -> Dict[str, Any]:
+        return {"id": chat_id, "type": "private", "first_name": f"User{chat_id}", "username": f"user{chat_id}"}
+
+    def _push(self, chat_id: int, update: Dict[str, Any], callback_id: Optional[str] = None) -> asyncio.Future:
+        update_id = self._next_update_id
+        self._next_update_id += 1
+        update["update_id"] = update_id
+        pushed_at = time.monotonic()
+        self._updates.append(update)
+        self._pushed_at[update_id] = pushed_at
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(chat_id, deque()).append((pushed_at, callback_id, future))
+        self._new_updates.set()
+        return future
+
+    def push_message(self, user_id: int, text: str) -> asyncio.Future:
+        """Сообщение пользователя боту; future - секунды до ответа"""
+        message = {
+            "message_id": self._message_id(user_id),
+            "date": int(time.time()),
+            "chat": self._chat(user_id),
+            "from": self._user(user_id),
+            "text": text,
+        }
+        if text.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        return self._push(user_id, {"message": message})
+
+    def push_callback(self, user_id: int, data: str) -> asyncio.Future:
+        """Нажатие inline-кнопки под последним сообщением бота"""
+        callback_id = f"{user_id}-{self._next_update_id}"
+        self._callback_chats[callback_id] = user_id
+        message = self._last_message.get(user_id) or {
+            "message_id": self._message_id(user_id), "date": int(time.time()),
+            "chat": self._chat(user_id), "from": BOT_USER, "text": "menu",
+        }
+        callback = {
+            "id": callback_id,
+            "from": self._user(user_id),
+            "chat_instance": str(user_id),
+            "message": message,
+            "data": data,
+        }
+        return self._push(user_id, {"callback_query": callback}, callback_id)
+
+    def _message_id(self, chat_id: int) -> int:
+        self._next_message_id[chat_id] = self._next_message_id.get(chat_id, 0) + 1
+        return self._next_message_id[chat_id]
+
+    # === BOT API ===
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params: Dict[str, Any] = dict(request.query)
+        if request.method == "POST":
+            if request.content_type == "application/json":
+                params.update(await request.json())
+            else:
+                params.update(await request.post())
+        self.calls[method] += 1
+        self.first_call_at.setdefault(method, time.monotonic())
+
+        if method == "getUpdates":
+            return self._ok(await self._get_updates(params))
+
+        if self.latency_ms:
+            await asyncio.sleep(max(0.0, self._rng.gauss(self.latency_ms, self.latency_ms / 4)) / 1000)
+
+        chat_id = self._chat_id(params)
+        if method in RATE_LIMITED:
+            retry_after = self._rate_limit(chat_id)
+            if retry_after:
+                self.flood[method] += 1
+                return self._too_many_requests(retry_after)
+
+        self._resolve_pending(chat_id, params.get("callback_query_id"))
+
+        if method == "getMe":
+            return self._ok(BOT_USER)
+        if method in ("sendMessage", "sendPhoto"):
+            self.sent_at.append(time.monotonic())
+            return self._ok(self._bot_message(chat_id, params, self._message_id(chat_id)))
+        if method == "editMessageText":
+            message_id = int(params.get("message_id") or 0) or self._message_id(chat_id)
+            return self._ok(self._bot_message(chat_id, params, message_id))
+        return self._ok(True)
+
+    async def _get_updates(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        offset = int(params.get("offset") or 0)
+        timeout = min(float(params.get("timeout") or 0), MAX_POLL_TIMEOUT)
+        # offset подтверждает получение предыдущих апдейтов
+        self._updates = [update for update in self._updates if update["update_id"] >= offset]
+        if not self._updates and timeout:
+            self._new_updates.clear()
+            try:
+                await asyncio.wait_for(self._new_updates.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        limit = int(params.get("limit") or 100)
+        updates = self._updates[:limit]
+        now = time.monotonic()
+        for update in updates:
+            pushed_at = self._pushed_at.pop(update["update_id"], None)
+            if pushed_at is not None:
+                self.delivery_lags.append(now - pushed_at)
+        return updates
+
+    def _chat_id(self, params: Dict[str, Any]) -> Optional[int]:
+        chat_id = params.get("chat_id")
+        if chat_id is not None:
+            try:
+                return int(chat_id)
+            except ValueError:
+                return None
+        return self._callback_chats.get(params.get("callback_query_id"))
+
+    def _rate_limit(self, chat_id: Optional[int]) -> int:
+        """retry_after в секундах или 0, если запрос можно выполнить"""
+        if self.flood_probability and self._rng.random() < self.flood_probability:
+            return self.retry_after
+        wait = 0.0
+        if chat_id is not None and self.chat_rate:
+            bucket = self._chat_buckets.get(chat_id)
+            if bucket is None:
+                bucket = self._chat_buckets[chat_id] = _TokenBucket(self.chat_rate, self.chat_burst)
+            wait = bucket.take()
+        if not wait:
+            wait = self._global_bucket.take()
+        return max(self.retry_after, math.ceil(wait)) if wait else 0
+
+    def _resolve_pending(self, chat_id: Optional[int], callback_id: Optional[str]):
+        """Первый запрос бота к чату - ответ на самый старый ожидающий апдейт"""
+        pending = self._pending.get(chat_id)
+        if not pending:
+            return
+        if callback_id:
+            for entry in pending:
+                if entry[1] == callback_id:
+                    break
+            else:
+                entry = pending[0]
+        else:
+            entry = pending[0]
+        pending.remove(entry)
+        pushed_at, _, future = entry
+        if not future.done():
+            # Время считается от появления апдейта, а не от его доставки боту
+            future.set_result(time.monotonic() - pushed_at)
+
+    def _bot_message(self, chat_id: int, params: Dict[str, Any], message_id: int) -> Dict[str, Any]:
+        message = {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": self._chat(chat_id),
+            "from": BOT_USER,
+            "text": params.get("text") or "",
+        }
+        if params.get("reply_markup"):
+            markup = params["reply_markup"]
+            message["reply_markup"] = json.loads(markup) if isinstance(markup, str) else markup
+        self._last_message[chat_id] = message
+        return message
+
+    @staticmethod
+    def _ok(result: Any) -> web.Response:
+        return web.json_response({"ok": True, "result": result})
+
+    @staticmethod
+    def _too_many_requests(retry_after: int) -> web.Response:
+        return web.json_response(status=429, data={
+            "ok": False,
+            "error_code": 429,
+            "description": f"Too Many Requests: retry after {retry_after}",
+            "parameters": {"retry_after": retry_after},
+        })
+
+    # === СТАТИСТИКА ===
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        per_second = Counter(int(moment - self.started_at) for moment in self.sent_at)
+        return {
+            "calls": dict(self.calls),
+            "flood_429": dict(self.flood),
+            "send": {
+                "total": len(self.sent_at),
+                "per_s_avg": round(len(self.sent_at) / elapsed, 2),
+                "per_s_peak": max(per_second.values(), default=0),
+            },
+            "delivery_lag": latency_summary(self.delivery_lags),
+        }
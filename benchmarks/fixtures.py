@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Синтетические страницы объявлений daft.ie для бенчмарков
+
+Страницы детерминированы (фиксированный seed) и по структуре повторяют
+реальные: __NEXT_DATA__ с JSON объявления, блок заголовка и цены,
+длинное описание и виджет похожих объявлений (разметка и JSON с теми же
+ключами, что у основного объявления), так что размер страницы сопоставим
+с реальной (300KB+).
+
+Для локального сервера (benchmarks.stub_server) есть и страницы поиска:
+карточки со ссылками /for-rent/<slug>/<id> и __NEXT_DATA__ со списком
+объявлений. Набор сайта на диске:
+    search/page_000.html, page_001.html, ...   - страницы поиска по 20
+    detail/<id>.html                           - страницы объявлений
+В эти каталоги можно положить и сохраненные страницы daft.ie.
+"""
+
+import json
+import random
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+PAGE_SIZE = 20
+# ID объявлений синтетического сайта: 5000000 + seed страницы объявления
+LISTING_ID_BASE = 5000000
+
+LOCATIONS = ["Dublin 1", "Dublin 2", "Dublin 4", "Dublin 8", "Dublin Docklands", "Dublin 15"]
+PROPERTY_TYPES = ["Apartment", "House", "Studio", "Flat"]
+
+_FILLER_WORDS = (
+    "bright spacious modern kitchen garden parking close amenities transport "
+    "shops schools quiet residential area viewing recommended furnished"
+).split()
+
+
+def _similar_listings(rng: random.Random, count: int) -> str:
+    """Виджет похожих объявлений - дает шум для шаблонов спален"""
+    cards = []
+    for index in range(count):
+        bedrooms = rng.randint(1, 5)
+        cards.append(
+            f'<li class="SimilarCard_card__{index}"><a href="/for-rent/apartment-{index}/{4000000 + index}">'
+            f'<span class="SimilarCard_price">€{rng.randint(1200, 4500):,} per month</span>'
+            f'<p>{bedrooms} Bed · {rng.randint(1, 3)} Bath · Apartment</p>'
+            f'<p>{bedrooms} bedroom apartment in {rng.choice(LOCATIONS)}</p></a></li>'
+        )
+    return '<ul class="SimilarListings">' + ''.join(cards) + '</ul>'
+
+
+def _similar_listings_data(rng: random.Random, count: int) -> str:
+    """JSON виджета похожих объявлений - те же ключи, что и у основного объявления"""
+    items = [
+        {
+            "id": 4000000 + index,
+            "price": rng.randint(1200, 4500),
+            "numBedrooms": str(rng.randint(1, 5)),
+            "propertyType": rng.choice(PROPERTY_TYPES),
+            "description": "Similar property nearby",
+        }
+        for index in range(count)
+    ]
+    return (
+        '<script type="application/json" data-widget="similar-listings">'
+        + json.dumps({"listings": items}) + '</script>'
+    )
+
+
+def generate_page(seed: int, target_size: int = 300_000) -> Tuple[str, dict]:
+    """Возвращает HTML страницы и ожидаемые значения полей"""
+    rng = random.Random(seed)
+    bedrooms = rng.randint(1, 4)
+    price = rng.randint(1500, 4000)
+    location = rng.choice(LOCATIONS)
+    property_type = rng.choice(PROPERTY_TYPES)
+    title = f"{bedrooms} Bed {property_type}, {location}"
+    description = " ".join(rng.choice(_FILLER_WORDS) for _ in range(60))
+
+    listing = {
+        "id": LISTING_ID_BASE + seed,
+        "title": title,
+        "price": price,
+        "numBedrooms": str(bedrooms),
+        "numBathrooms": str(rng.randint(1, 2)),
+        "propertyType": property_type,
+        "description": description,
+        "seoFriendlyPath": f"/for-rent/{property_type.lower()}-{seed}/{LISTING_ID_BASE + seed}",
+    }
+    next_data = {"props": {"pageProps": {"listing": listing}}, "page": "/for-rent/[...slug]"}
+
+    head = (
+        '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">'
+        f'<title>{title} - Daft.ie</title>'
+        '<link rel="stylesheet" href="/_next/static/css/app.css">'
+        '<style>' + ('.c{color:#333;margin:0 auto}' * 200) + '</style></head><body>'
+    )
+    header = (
+        '<div class="TitleBlock_container">'
+        f'<h1 data-testid="address">{title}</h1>'
+        f'<div class="TitleBlock_price__abc" data-testid="price"><p>€{price:,} per month</p></div>'
+        f'<div class="TitleBlock_meta__xyz" data-testid="bed-bath">'
+        f'<p data-testid="beds">{bedrooms} Bed</p><p>{listing["numBathrooms"]} Bath</p>'
+        f'<p>{property_type}</p></div></div>'
+        f'<div data-testid="description"><p>{description}</p></div>'
+    )
+    scripts = (
+        '<script id="__NEXT_DATA__" type="application/json">'
+        + json.dumps(next_data) + '</script>'
+    )
+
+    widget = _similar_listings_data(rng, 12)
+    body = [head, header, widget]
+    size = len(head) + len(header) + len(widget) + len(scripts)
+    while size < target_size:
+        chunk = _similar_listings(rng, 20)
+        body.append(chunk)
+        size += len(chunk)
+    body.append(scripts)
+    body.append('</body></html>')
+
+    # Спальни не сверяем: голосование учитывает текст всей страницы,
+    # включая похожие объявления, как и на реальных страницах
+    expected = {
+        "title": title,
+        "price": price,
+        "property_type": property_type,
+        "description": description[:200] + "...",
+    }
+    return ''.join(body), expected
+
+
+def generate_corpus(count: int = 20, target_size: int = 300_000) -> List[Tuple[str, dict]]:
+    """Набор синтетических страниц"""
+    return [generate_page(seed, target_size) for seed in range(count)]
+
+
+def load_pages(directory: Path) -> Iterator[Tuple[str, str]]:
+    """Сохраненные страницы (*.html) из каталога: (имя файла, HTML)"""
+    for path in sorted(directory.glob("*.html")):
+        yield path.name, path.read_text(encoding="utf-8", errors="replace")
+
+
+def save_corpus(directory: Path, count: int = 20, target_size: int = 300_000):
+    """Сохраняет синтетические страницы на диск"""
+    directory.mkdir(parents=True, exist_ok=True)
+    for seed, (html, _) in enumerate(generate_corpus(count, target_size)):
+        (directory / f"listing_{seed:03d}.html").write_text(html, encoding="utf-8")
+
+
+def _search_card(seed: int) -> Tuple[str, dict]:
+    """Карточка объявления на странице поиска и его элемент в __NEXT_DATA__"""
+    rng = random.Random(seed)
+    bedrooms = rng.randint(1, 4)
+    price = rng.randint(1500, 4000)
+    location = rng.choice(LOCATIONS)
+    property_type = rng.choice(PROPERTY_TYPES)
+    listing_id = LISTING_ID_BASE + seed
+    path = f"/for-rent/{property_type.lower()}-{seed}/{listing_id}"
+    title = f"{bedrooms} Bed {property_type}, {location}"
+
+    card = (
+        f'<li class="SearchPage_result__{seed}"><div class="Card_container">'
+        f'<a href="{path}"><h2 data-testid="title">{title}</h2>'
+        f'<div data-testid="price"><span>€{price:,} per month</span></div>'
+        f'<p data-testid="bed-bath">{bedrooms} Bed · {rng.randint(1, 2)} Bath · {property_type}</p>'
+        f'<p data-testid="address">{location}, Dublin</p>'
+        f'<img src="/images/{listing_id}.jpg"></a></div></li>'
+    )
+    item = {
+        "id": listing_id,
+        "title": title,
+        "price": f"€{price:,} per month",
+        "numBedrooms": f"{bedrooms} Bed",
+        "propertyType": property_type,
+        "seoPath": path,
+    }
+    return card, item
+
+
+def generate_search_page(page_index: int, total: int, page_size: int = PAGE_SIZE, first_seed: int = 0) -> str:
+    """Страница поиска page_index (с нуля) из total объявлений; за концом - пустая
+
+    first_seed сдвигает выдачу: объявления first_seed... (новые появляются в начале)
+    """
+    seeds = range(first_seed + page_index * page_size, first_seed + min(total, (page_index + 1) * page_size))
+    cards, items = zip(*(_search_card(seed) for seed in seeds)) if seeds else ((), ())
+    next_data = {
+        "props": {"pageProps": {"listings": list(items), "paging": {"totalResults": total}}},
+        "page": "/property-for-rent/[...slug]",
+    }
+    return (
+        '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">'
+        f'<title>{total} Properties to Rent - Daft.ie</title></head><body>'
+        f'<h1 data-testid="results-count">{total} Properties to Rent in Dublin</h1>'
+        '<ul data-testid="results">' + ''.join(cards) + '</ul>'
+        '<nav><a href="/property-for-rent/dublin-city?from=20">Next</a></nav>'
+        '<script id="__NEXT_DATA__" type="application/json">' + json.dumps(next_data) + '</script>'
+        '</body></html>'
+    )
+
+
+def generate_site(listings: int = 60, page_size: int = PAGE_SIZE,
+                  target_size: int = 300_000) -> Tuple[List[str], Dict[str, str]]:
+    """Страницы поиска и страницы объявлений по ID"""
+    pages = (listings + page_size - 1) // page_size
+    search = [generate_search_page(index, listings, page_size) for index in range(pages)]
+    details = {str(LISTING_ID_BASE + seed): generate_page(seed, target_size)[0] for seed in range(listings)}
+    return search, details
+
+
+def save_site(directory: Path, listings: int = 60, page_size: int = PAGE_SIZE,
+              target_size: int = 300_000):
+    """Сохраняет синтетический сайт в раскладке search/ и detail/"""
+    search, details = generate_site(listings, page_size, target_size)
+    (directory / "search").mkdir(parents=True, exist_ok=True)
+    (directory / "detail").mkdir(parents=True, exist_ok=True)
+    for index, html in enumerate(search):
+        (directory / "search" / f"page_{index:03d}.html").write_text(html, encoding="utf-8")
+    for listing_id, html in details.items():
+        (directory / "detail" / f"{listing_id}.html").write_text(html, encoding="utf-8")
+
+
+def load_site(directory: Path) -> Tuple[List[str], Dict[str, str]]:
+    """Сайт из каталога: страницы поиска по порядку и страницы объявлений по ID"""
+    search = [html for _, html in load_pages(directory / "search")]
+    details = {Path(name).stem: html for name, html in load_pages(directory / "detail")}
+    return search, details
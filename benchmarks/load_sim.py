@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный симулятор бота: сколько пользователей мониторинга держит процесс
+
+В одном процессе поднимаются фейковый Bot API (benchmarks.fake_telegram) и
+сервер фикстур daft.ie (benchmarks.stub_server), затем запускается
+CombinedBot из main.py в режиме polling с TELEGRAM_API_URL на фейковый API.
+N синтетических пользователей (с разгоном --ramp) проходят меню: /start,
+настройки, интервал, запуск мониторинга, периодически статистика и в
+конце остановка мониторинга.
+
+Отчет:
+    ответы      - время от апдейта пользователя до первого ответа бота
+    доставка    - сколько апдейт ждал getUpdates (очередь апдейтов)
+    отправка    - sendMessage в секунду (среднее и пик), ответы 429
+    event loop  - задержка цикла событий (utils.loop_monitor)
+    память      - RSS процесса вместе с Chromium: в начале, пик, в конце
+
+Парсер:
+    production - ProductionDaftParser бота (Playwright, браузер на поиск)
+    json       - RealDaftParser по __NEXT_DATA__ без браузера: нагрузка
+                 только на бота, БД и Telegram
+
+    python3 -m benchmarks.load_sim --users 50 --duration 300
+    python3 -m benchmarks.load_sim --users 200 --parser json --churn 30 --flood-probability 0.02
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from benchmarks.fake_telegram import FakeTelegramServer, latency_summary
+from benchmarks.rss import PeakRSSSampler, tree_rss_kb
+from benchmarks.stub_server import StubDaftServer
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+FAKE_TOKEN = "123456789:LOAD-TEST-TOKEN-0000000000000000000"
+FIRST_USER_ID = 1000
+DRAIN_SECONDS = 2.0
+# Кнопки меню, которые проходит пользователь при настройке
+SETUP_CLICKS = ("settings", "show_settings", "set_interval")
+
+
+class JsonParser:
+    """RealDaftParser с интерфейсом ProductionDaftParser бота"""
+
+    def __init__(self, base_url: str):
+        from real_json_parser import RealDaftParser
+
+        self.parser = RealDaftParser()
+        self.parser.base_url = base_url
+        self.parser.request_delay = (0.0, 0.0)
+
+    async def search_properties(self, min_bedrooms: int = 3, max_price: int = 2500,
+                                location: str = "dublin-city", limit: int = 20) -> List[Dict[str, Any]]:
+        results = await self.parser.search_properties(city=location, max_price=max_price, min_bedrooms=min_bedrooms)
+        return results[:limit]
+
+    async def iter_properties(self, *args, incremental: bool = False,
+                              known_urls: Optional[Set[str]] = None, **kwargs):
+        for prop in await self.search_properties(*args, **kwargs):
+            if not known_urls or prop.get("url") not in known_urls:
+                yield prop
+
+
+class SimulatedUser:
+    """Пользователь, проходящий меню бота"""
+
+    def __init__(self, telegram: FakeTelegramServer, user_id: int, interval: int,
+                 think_time: float, reply_timeout: float, latencies: List[float], rng: random.Random):
+        self.telegram = telegram
+        self.user_id = user_id
+        self.interval = interval
+        self.think_time = think_time
+        self.reply_timeout = reply_timeout
+        self.latencies = latencies
+        self.rng = rng
+        self.timeouts = 0
+
+    async def _act(self, future: asyncio.Future):
+        try:
+            self.latencies.append(await asyncio.wait_for(future, self.reply_timeout))
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+
+    async def _think(self):
+        await asyncio.sleep(self.rng.uniform(0.5, 1.5) * self.think_time)
+
+    async def run(self, start_delay: float, deadline: float):
+        await asyncio.sleep(start_delay)
+        await self._act(self.telegram.push_message(self.user_id, "/start"))
+        for data in SETUP_CLICKS + (f"interval_{self.interval}", "main_menu", "start_monitoring"):
+            await self._think()
+            await self._act(self.telegram.push_callback(self.user_id, data))
+
+        # Пока идет мониторинг - иногда смотрит статистику
+        while time.monotonic() + self.think_time * 3 < deadline:
+            await asyncio.sleep(self.rng.uniform(1, 3) * self.think_time)
+            await self._act(self.telegram.push_callback(self.user_id, "statistics"))
+            await self._think()
+            await self._act(self.telegram.push_callback(self.user_id, "main_menu"))
+
+        await self._act(self.telegram.push_callback(self.user_id, "stop_monitoring"))
+
+
+def _database_stats(db_path: str) -> Dict[str, int]:
+    connection = sqlite3.connect(db_path)
+    try:
+        sessions, errors = connection.execute(
+            "SELECT COUNT(*), COUNT(CASE WHEN status = 'error' THEN 1 END) FROM monitoring_logs"
+        ).fetchone()
+        found, sent = connection.execute(
+            "SELECT COUNT(*), COUNT(CASE WHEN is_sent = 1 THEN 1 END) FROM property_history"
+        ).fetchone()
+    finally:
+        connection.close()
+    return {"monitoring_cycles": sessions, "monitoring_errors": errors,
+            "properties_found": found, "properties_sent": sent}
+
+
+async def _sample_memory(samples: List[int], stop: asyncio.Event, interval: float = 5.0):
+    while not stop.is_set():
+        samples.append(tree_rss_kb())
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def simulate(args) -> Dict[str, Any]:
+    daft = StubDaftServer.from_corpus(
+        None, listings=args.listings, latency_ms=args.daft_latency, jitter_ms=args.daft_latency / 5,
+        churn_per_minute=args.churn
+    )
+    telegram = FakeTelegramServer(
+        latency_ms=args.api_latency, chat_rate=args.chat_rate, global_rate=args.global_rate,
+        flood_probability=args.flood_probability, retry_after=args.retry_after
+    )
+    await daft.start()
+    await telegram.start()
+
+    # Настройки читаются ботом при создании и в обработчиках
+    from config.settings import settings
+    settings.TELEGRAM_API_URL = telegram.base_url
+    settings.BOT_MODE = "polling"
+    from main import CombinedBot
+    from utils.loop_monitor import loop_monitor
+
+    bot = CombinedBot(FAKE_TOKEN)
+    if args.parser == "json":
+        bot.parser = JsonParser(daft.base_url)
+    else:
+        bot.parser.base_url = daft.base_url
+
+    print(f"🤖 CombinedBot: API {telegram.base_url}, daft {daft.base_url}, парсер {args.parser}")
+    print(f"👥 {args.users} пользователей, разгон {args.ramp} с, длительность {args.duration} с")
+
+    loop_monitor.start()
+    memory: List[int] = [tree_rss_kb()]
+    stop_sampling = asyncio.Event()
+    sampler_task = asyncio.create_task(_sample_memory(memory, stop_sampling))
+    latencies: List[float] = []
+    rng = random.Random(args.seed)
+
+    with PeakRSSSampler(interval=0.5) as peak:
+        bot_task = asyncio.create_task(bot.start_bot())
+        started = time.monotonic()
+        deadline = started + args.duration
+        users = [
+            SimulatedUser(telegram, FIRST_USER_ID + index, args.interval, args.think_time,
+                          args.reply_timeout, latencies, random.Random(rng.random()))
+            for index in range(args.users)
+        ]
+        await asyncio.gather(*(
+            user.run(args.ramp * index / max(args.users, 1), deadline)
+            for index, user in enumerate(users)
+        ))
+        elapsed = time.monotonic() - started
+
+        # Даем обработчикам последних апдейтов дойти до ответа
+        await asyncio.sleep(DRAIN_SECONDS)
+        await bot.dp.stop_polling()
+        await asyncio.gather(bot_task, return_exceptions=True)
+        await bot.stop_bot()
+
+    stop_sampling.set()
+    await sampler_task
+    memory.append(tree_rss_kb())
+    loop_lag = loop_monitor.snapshot()
+    await loop_monitor.stop()
+    await telegram.stop()
+    await daft.stop()
+
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "elapsed_s": round(elapsed, 1),
+        "responses": dict(latency_summary(latencies), timeouts=sum(user.timeouts for user in users)),
+        "telegram": telegram.stats(),
+        "daft": daft.stats(),
+        "database": _database_stats(bot.db.db_path),
+        "loop_lag_ms": {key: round(value * 1000, 1) for key, value in loop_lag.items()
+                        if key not in ("samples", "stalls")} | {"stalls": loop_lag["stalls"]},
+        "memory_mb": {
+            "start": round(memory[0] / 1024, 1),
+            "peak": peak.peak_mb,
+            "end": round(memory[-1] / 1024, 1),
+        },
+    }
+
+
+def print_summary(report: Dict[str, Any]):
+    responses = report["responses"]
+    telegram = report["telegram"]
+    delivery = telegram["delivery_lag"]
+    print()
+    print(f"💬 Ответы бота: {responses.get('count', 0)}, p50 {responses.get('p50_ms', 0)} мс, "
+          f"p95 {responses.get('p95_ms', 0)} мс, max {responses.get('max_ms', 0)} мс, "
+          f"без ответа {responses['timeouts']}")
+    print(f"📥 Доставка апдейтов: p50 {delivery.get('p50_ms', 0)} мс, p95 {delivery.get('p95_ms', 0)} мс")
+    print(f"📤 sendMessage: {telegram['send']['total']} ({telegram['send']['per_s_avg']}/с, "
+          f"пик {telegram['send']['per_s_peak']}/с), 429: {sum(telegram['flood_429'].values())}")
+    database = report["database"]
+    print(f"🔍 Циклов мониторинга: {database['monitoring_cycles']} (ошибок {database['monitoring_errors']}), "
+          f"отправлено объявлений {database['properties_sent']}/{database['properties_found']}")
+    lag = report["loop_lag_ms"]
+    print(f"⏱️ Event loop: p50 {lag['p50']} мс, p95 {lag['p95']} мс, max {lag['max']} мс, зависаний {lag['stalls']}")
+    memory = report["memory_mb"]
+    print(f"🧠 Память: {memory['start']} → пик {memory['peak']} → {memory['end']} МБ")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Нагрузочный симулятор Telegram-бота")
+    arg_parser.add_argument("--users", type=int, default=20, help="Синтетических пользователей")
+    arg_parser.add_argument("--duration", type=float, default=300, help="Длительность, с")
+    arg_parser.add_argument("--ramp", type=float, default=30, help="Разгон: за сколько секунд подключаются все")
+    arg_parser.add_argument("--think-time", type=float, default=5, help="Пауза пользователя между нажатиями, с")
+    arg_parser.add_argument("--reply-timeout", type=float, default=30, help="Ожидание ответа бота, с")
+    arg_parser.add_argument("--interval", type=int, default=300, help="Интервал мониторинга (кнопка меню), с")
+    arg_parser.add_argument("--parser", choices=("production", "json"), default="production")
+    arg_parser.add_argument("--listings", type=int, default=60, help="Объявлений на сервере фикстур")
+    arg_parser.add_argument("--churn", type=float, default=10, help="Новых объявлений в минуту")
+    arg_parser.add_argument("--daft-latency", type=float, default=80, help="Задержка сервера фикстур, мс")
+    arg_parser.add_argument("--api-latency", type=float, default=30, help="Задержка Bot API, мс")
+    arg_parser.add_argument("--chat-rate", type=float, default=1.0, help="Сообщений в секунду на чат до 429")
+    arg_parser.add_argument("--global-rate", type=float, default=30.0, help="Сообщений в секунду на бота до 429")
+    arg_parser.add_argument("--flood-probability", type=float, default=0.0, help="Доля случайных 429")
+    arg_parser.add_argument("--retry-after", type=int, default=1, help="retry_after в ответах 429, с")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--output", type=Path, help="Файл результата (по умолчанию benchmarks/results/)")
+    args = arg_parser.parse_args(argv)
+
+    # База, логи и results/ бота - во временном каталоге
+    workdir = tempfile.mkdtemp(prefix="load-sim-")
+    os.chdir(workdir)
+    Path("data").mkdir()
+    Path("logs").mkdir()
+    sys.path.insert(0, str(REPO_ROOT))
+    logging.getLogger("aiogram").setLevel(logging.WARNING)
+
+    report = asyncio.run(simulate(args))
+    print_summary(report)
+
+    output = args.output
+    if output is None:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        output = RESULTS_DIR / f"load-{datetime.datetime.now():%Y%m%d-%H%M%S}.json"
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\n💾 Результат: {output} (рабочий каталог {workdir})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Пиковая память (RSS) процесса вместе с дочерними
+
+Chromium, запущенный Playwright, - дочерние процессы драйвера, поэтому
+ru_maxrss самого Python не показывает реальное потребление. Сэмплер
+периодически суммирует VmRSS всего дерева процессов по /proc (Linux);
+где /proc нет, остается ru_maxrss текущего процесса.
+"""
+
+import os
+import resource
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+_PROC = Path("/proc")
+
+
+def _children_map() -> Dict[int, List[int]]:
+    children: Dict[int, List[int]] = {}
+    for entry in _PROC.iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text()
+        except OSError:
+            continue
+        # Имя процесса в скобках может содержать пробелы - берем поля после ')'
+        fields = stat[stat.rfind(")") + 2:].split()
+        children.setdefault(int(fields[1]), []).append(int(entry.name))
+    return children
+
+
+def _rss_kb(pid: int) -> int:
+    try:
+        for line in (_PROC / str(pid) / "status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def tree_rss_kb(pid: Optional[int] = None) -> int:
+    """Текущий RSS процесса и всех его потомков, KB"""
+    pid = pid or os.getpid()
+    if not _PROC.exists():
+        return 0
+    children = _children_map()
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        total += _rss_kb(current)
+        stack.extend(children.get(current, ()))
+    return total
+
+
+def self_max_rss_kb() -> int:
+    """ru_maxrss текущего процесса, KB (на macOS он в байтах)"""
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss // 1024 if sys.platform == "darwin" else maxrss
+
+
+class PeakRSSSampler:
+    """Фоновый поток, запоминающий максимум RSS дерева процессов"""
+
+    def __init__(self, interval: float = 0.1, pid: Optional[int] = None):
+        self.interval = interval
+        self.pid = pid or os.getpid()
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "PeakRSSSampler":
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.peak_kb = max(self.peak_kb, self_max_rss_kb())
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_kb = max(self.peak_kb, tree_rss_kb(self.pid))
+            self._stop.wait(self.interval)
+
+    @property
+    def peak_mb(self) -> float:
+        return round(self.peak_kb / 1024, 1)
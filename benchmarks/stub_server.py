@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Локальный aiohttp-сервер, отдающий страницы daft.ie из набора фикстур
+
+Повторяет URL сайта, которые используют парсеры:
+    /property-for-rent/...?from=N  - страница поиска N // 20 (за концом - пустая)
+    /for-rent/<slug>/<id>          - страница объявления по ID
+Остальные пути (стили, картинки) - 404. Перед ответом сервер ждет
+--latency мс (± --jitter), имитируя сеть, и записывает время обработки
+каждого запроса.
+
+С --churn N выдача сдвигается на N новых объявлений в минуту (страницы
+новых объявлений генерируются по запросу) - так мониторинг находит новые
+объявления в каждом цикле.
+
+    python3 -m benchmarks.stub_server --port 8765 --latency 80
+    python3 -m benchmarks.stub_server --corpus saved_site/
+"""
+
+import argparse
+import asyncio
+import random
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+from benchmarks.fixtures import (
+    LISTING_ID_BASE, PAGE_SIZE, generate_page, generate_search_page, generate_site, load_site
+)
+
+_LISTING_PATH = re.compile(r'^/for-rent/[^/]+/(\d+)/?$')
+
+
+class StubDaftServer:
+    """Сервер фикстур с настраиваемой задержкой"""
+
+    def __init__(self, search_pages: List[str], details: Dict[str, str],
+                 latency_ms: float = 50, jitter_ms: float = 10,
+                 host: str = "127.0.0.1", port: int = 0, seed: int = 0,
+                 churn_per_minute: float = 0, detail_size: int = 300_000):
+        self.search_pages = search_pages
+        self.details = details
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        # Новых объявлений в минуту (0 - выдача не меняется)
+        self.churn_per_minute = churn_per_minute
+        self.detail_size = detail_size
+        self._started_at = time.monotonic()
+        self.host = host
+        self.port = port
+        self._rng = random.Random(seed)
+        self._runner: Optional[web.AppRunner] = None
+        # (вид запроса, мс обработки)
+        self.requests: List[tuple] = []
+
+    @classmethod
+    def from_corpus(cls, directory: Optional[Path] = None, listings: int = 60, **kwargs) -> "StubDaftServer":
+        """Сервер из каталога с сайтом или из синтетического набора"""
+        if directory:
+            search, details = load_site(directory)
+        else:
+            search, details = generate_site(listings)
+        return cls(search, details, **kwargs)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self._started_at = time.monotonic()
+        # Порт 0 - выбран системой
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        started = time.perf_counter()
+        kind, body = self._route(request)
+
+        delay = max(0.0, self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms))
+        if kind != "other":
+            await asyncio.sleep(delay / 1000)
+
+        if body is None:
+            response = web.Response(status=404, text="Not found")
+        else:
+            response = web.Response(body=body.encode("utf-8"), content_type="text/html", charset="utf-8")
+        self.requests.append((kind, (time.perf_counter() - started) * 1000))
+        return response
+
+    def _route(self, request: web.Request):
+        path = request.path
+        if path.startswith("/property-for-rent"):
+            try:
+                offset = int(request.query.get("from", "0"))
+            except ValueError:
+                offset = 0
+            index = offset // PAGE_SIZE
+            shift = self._churn_shift()
+            if not shift and index < len(self.search_pages):
+                return "search", self.search_pages[index]
+            return "search", generate_search_page(index, len(self.details), first_seed=shift)
+
+        listing_match = _LISTING_PATH.match(path)
+        if listing_match:
+            return "detail", self._detail(listing_match.group(1))
+        return "other", None
+
+    def _churn_shift(self) -> int:
+        if not self.churn_per_minute:
+            return 0
+        return int((time.monotonic() - self._started_at) / 60 * self.churn_per_minute)
+
+    def _detail(self, listing_id: str) -> Optional[str]:
+        html = self.details.get(listing_id)
+        if html is None and self.churn_per_minute and listing_id.isdigit() and int(listing_id) >= LISTING_ID_BASE:
+            # Объявление, появившееся после старта - генерируем и запоминаем
+            html = self.details[listing_id] = generate_page(int(listing_id) - LISTING_ID_BASE, self.detail_size)[0]
+        return html
+
+    def reset_stats(self):
+        self.requests.clear()
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Количество запросов и время обработки (мс) по видам"""
+        result = {}
+        for kind in ("search", "detail"):
+            timings = sorted(ms for request_kind, ms in self.requests if request_kind == kind)
+            if not timings:
+                continue
+            result[kind] = {
+                "requests": len(timings),
+                "p50_ms": round(statistics.median(timings), 2),
+                "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+            }
+        return result
+
+
+async def serve(args) -> int:
+    server = StubDaftServer.from_corpus(
+        args.corpus, listings=args.listings, latency_ms=args.latency,
+        jitter_ms=args.jitter, host=args.host, port=args.port, churn_per_minute=args.churn
+    )
+    await server.start()
+    print(f"🌐 Фикстуры daft.ie на {server.base_url}: {len(server.search_pages)} страниц поиска, "
+          f"{len(server.details)} объявлений, задержка {args.latency}±{args.jitter} мс")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Локальный сервер фикстур daft.ie")
+    arg_parser.add_argument("--corpus", type=Path, help="Каталог с search/ и detail/ (по умолчанию синтетический)")
+    arg_parser.add_argument("--listings", type=int, default=60, help="Объявлений в синтетическом наборе")
+    arg_parser.add_argument("--latency", type=float, default=50, help="Задержка ответа, мс")
+    arg_parser.add_argument("--jitter", type=float, default=10, help="Разброс задержки, мс")
+    arg_parser.add_argument("--churn", type=float, default=0, help="Новых объявлений в минуту")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8765)
+    args = arg_parser.parse_args(argv)
+
+    try:
+        return asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,20 +5,35 @@
 
 import asyncio
 import logging
-from typing import Dict, Any, List
+from contextlib import aclosing
+from typing import Dict, Any, AsyncIterator, List, Optional, Set
 from datetime import datetime
 import time
 
-from aiogram import Bot, Dispatcher, F
+from aiogram import Bot, F
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.filters import Command, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
-from aiogram.fsm.storage.memory import MemoryStorage
 
 from database.database import EnhancedDatabase
-from parser.production_parser import ProductionDaftParser
+from database.fsm_storage import SQLiteStorage
+from parser.browser_pool import browser_pool
+from parser.offload import shutdown_executor
 from config.regions import ALL_LOCATIONS, DEFAULT_SETTINGS, LIMITS
+from utils.rendering import MARKDOWN_PARSE_MODE, render_property_message
+from utils.loop_monitor import loop_monitor
+from utils.phase_timer import PhaseTimer, phase_span
+from utils.profiling import cycle_profiler
+from config.settings import settings as app_settings
+from bot.webhook import run_dispatcher
+from bot.dispatcher import BoundedDispatcher
+from bot.jobs import JobRunner
+from bot.send_throttle import ChatSendThrottle
+from bot.middlewares import ConcurrencyLimitMiddleware, TelegramMetricsMiddleware
+from utils.metrics import MONITORING_TASKS
 from bot.keyboards import (
     get_main_menu_keyboard, get_settings_menu_keyboard, get_regions_menu_keyboard,
     get_region_categories_keyboard, get_category_regions_keyboard, 
@@ -38,16 +53,54 @@ class EnhancedPropertyBot:
     """Улучшенный бот для мониторинга недвижимости"""
     
     def __init__(self, bot_token: str):
-        self.bot = Bot(token=bot_token)
-        self.dp = Dispatcher(storage=MemoryStorage())
+        # Свой адрес Bot API: локальный telegram-bot-api или фейковый сервер нагрузочного теста
+        session = None
+        if app_settings.TELEGRAM_API_URL:
+            session = AiohttpSession(api=TelegramAPIServer.from_base(app_settings.TELEGRAM_API_URL))
+        self.bot = Bot(token=bot_token, session=session)
         self.db = EnhancedDatabase()
-        self.parser = ProductionDaftParser()
+        # FSM состояния хранятся в той же базе и переживают перезапуск
+        self.dp = BoundedDispatcher(
+            storage=SQLiteStorage(
+                self.db.db_path,
+                state_ttl=app_settings.FSM_STATE_TTL,
+                flush_interval=app_settings.FSM_FLUSH_INTERVAL
+            ),
+            max_pending_updates=app_settings.MAX_PENDING_UPDATES
+        )
+        # Парсер (и Playwright) загружается при первом поиске
+        self._parser = None
+        self._warmup_task = None
         
         # Словарь активных задач мониторинга {user_id: task}
         self.monitoring_tasks: Dict[int, asyncio.Task] = {}
         
+        # Фоновые задачи и ограничение параллельной обработки апдейтов
+        self.jobs = JobRunner(app_settings.MAX_BACKGROUND_JOBS, app_settings.MAX_JOBS_PER_USER)
+        # Пауза между сообщениями одного чата, в том числе между объявлениями мониторинга
+        self.send_throttle = ChatSendThrottle(app_settings.MESSAGE_INTERVAL, app_settings.SEND_RETRY_ATTEMPTS)
+        self.dp.update.outer_middleware(ConcurrencyLimitMiddleware(app_settings.MAX_CONCURRENT_UPDATES))
+        
+        # Метрики: запросы к Bot API и активные мониторинги
+        self.bot.session.middleware(TelegramMetricsMiddleware())
+        MONITORING_TASKS.set_function(
+            lambda: sum(not task.done() for task in self.monitoring_tasks.values())
+        )
+        
         self._register_handlers()
     
+    @property
+    def parser(self):
+        """Парсер daft.ie; модуль парсера и Playwright импортируются при первом обращении"""
+        if self._parser is None:
+            from parser.production_parser import ProductionDaftParser
+            self._parser = ProductionDaftParser()
+        return self._parser
+    
+    @parser.setter
+    def parser(self, value):
+        self._parser = value
+    
     def _register_handlers(self):
         """Регистрация всех обработчиков"""
         
@@ -55,6 +108,7 @@ class EnhancedPropertyBot:
         self.dp.message.register(self.cmd_start, Command("start"))
         self.dp.message.register(self.cmd_help, Command("help"))
         self.dp.message.register(self.cmd_status, Command("status"))
+        self.dp.message.register(self.cmd_profile, Command("profile"))
         
         # Главное меню
         self.dp.callback_query.register(self.callback_main_menu, F.data == "main_menu")
@@ -130,8 +184,11 @@ class EnhancedPropertyBot:
     async def start_bot(self):
         """Запуск бота"""
         await self.db.init_database()
-        logger.info("Бот запущен")
-        await self.dp.start_polling(self.bot)
+        if app_settings.BROWSER_WARMUP:
+            # Браузер поднимается в фоне, параллельно с запуском polling
+            self._warmup_task = asyncio.create_task(browser_pool.warmup(app_settings.BROWSER_WARMUP_URL))
+        logger.info(f"Бот запущен (режим: {app_settings.BOT_MODE})")
+        await run_dispatcher(self.dp, self.bot)
     
     async def stop_bot(self):
         """Остановка бота"""
@@ -140,6 +197,12 @@ class EnhancedPropertyBot:
             task.cancel()
         self.monitoring_tasks.clear()
         
+        await self.jobs.shutdown()
+        if self._warmup_task:
+            self._warmup_task.cancel()
+        await browser_pool.close()
+        shutdown_executor()
+        await self.dp.storage.close()
         await self.bot.session.close()
         logger.info("Бот остановлен")
     
@@ -233,12 +296,41 @@ class EnhancedPropertyBot:
             f"📊 Лимит результатов: {settings['max_results_per_search']}"
         )
         
+        if app_settings.ADMIN_USER_ID and user_id == app_settings.ADMIN_USER_ID:
+            status_msg += (
+                f"\n\n🛠️ **Для администратора:**\n"
+                f"{loop_monitor.format_status()}\n"
+                f"🔄 Активных мониторингов: {sum(not task.done() for task in self.monitoring_tasks.values())}"
+            )
+        
         await message.answer(
             status_msg,
             reply_markup=get_main_menu_keyboard(),
             parse_mode="Markdown"
         )
     
+    async def cmd_profile(self, message: Message):
+        """Обработчик команды /profile [N|off] (только администратор)"""
+        user_id = message.from_user.id
+        if not (app_settings.ADMIN_USER_ID and user_id == app_settings.ADMIN_USER_ID):
+            await message.answer("❌ Команда доступна только администратору")
+            return
+        
+        args = (message.text or "").split()[1:]
+        if args and args[0].lower() == "off":
+            cycle_profiler.disarm()
+        elif args:
+            try:
+                cycle_profiler.arm(int(args[0]))
+            except ValueError:
+                await message.answer("❌ Использование: /profile [N|off]")
+                return
+        
+        await message.answer(
+            cycle_profiler.format_status() + f"\n\n📂 Профили: `{app_settings.PROFILE_DIR}`",
+            parse_mode="Markdown"
+        )
+    
     # === ГЛАВНОЕ МЕНЮ ===
     
     async def callback_main_menu(self, callback: CallbackQuery):
@@ -394,13 +486,24 @@ class EnhancedPropertyBot:
             await callback.answer()
             return
         
+        if not self.jobs.can_submit(user_id):
+            await callback.answer("⏳ Предыдущий поиск еще выполняется", show_alert=True)
+            return
+        
         await callback.message.edit_text(
             "🔍 **Выполняется поиск...**\n\nПожалуйста, подождите.",
             parse_mode="Markdown"
         )
-        await callback.answer()
         
-        # Выполняем поиск
+        # Долгий поиск выполняется в фоне, обработчик апдейта сразу освобождается
+        job = self.jobs.submit(
+            user_id, "single_search",
+            lambda: self._run_single_search(callback.message, user_id, settings)
+        )
+        await callback.answer(f"Поиск запущен (задача #{job.job_id})")
+    
+    async def _run_single_search(self, message: Message, user_id: int, settings: Dict[str, Any]):
+        """Выполняет разовый поиск в фоновой задаче"""
         try:
             start_time = time.time()
             results = await self._perform_search(settings)
@@ -420,7 +523,7 @@ class EnhancedPropertyBot:
                     # Отправляем новые объявления
                     await self._send_new_properties(user_id, new_properties)
                     
-                    await callback.message.edit_text(
+                    await message.edit_text(
                         f"✅ **Поиск завершен!**\n\n"
                         f"📊 Найдено объявлений: {len(results)}\n"
                         f"🆕 Новых объявлений: {len(new_properties)}\n"
@@ -435,7 +538,7 @@ class EnhancedPropertyBot:
                         [InlineKeyboardButton(text="🏠 Главное меню", callback_data="main_menu")]
                     ])
                     
-                    await callback.message.edit_text(
+                    await message.edit_text(
                         f"✅ **Поиск завершен!**\n\n"
                         f"📊 Найдено объявлений: {len(results)}\n"
                         f"🔄 Все объявления уже известны\n"
@@ -446,9 +549,9 @@ class EnhancedPropertyBot:
                     )
                     
                     # Сохраняем результаты в кэш для показа
-                    await self.db.cache_search_results(user_id, results)
+                    await self.db.cache_search_results(user_id, results, search_params)
             else:
-                await callback.message.edit_text(
+                await message.edit_text(
                     "❌ **Объявления не найдены**\n\n"
                     "Попробуйте изменить параметры поиска.",
                     reply_markup=get_main_menu_keyboard(),
@@ -457,7 +560,7 @@ class EnhancedPropertyBot:
                 
         except Exception as e:
             logger.error(f"Ошибка при разовом поиске для пользователя {user_id}: {e}")
-            await callback.message.edit_text(
+            await message.edit_text(
                 f"❌ **Ошибка при поиске**\n\n{str(e)[:100]}...",
                 reply_markup=get_main_menu_keyboard(),
                 parse_mode="Markdown"
@@ -489,21 +592,47 @@ class EnhancedPropertyBot:
         """Выполняет поиск недвижимости"""
         all_results = []
         
-        # Поиск по каждому региону
+        async with cycle_profiler.profile("search", settings["user_id"]):
+            # Поиск по каждому региону
+            for region in settings["regions"]:
+                try:
+                    region_results = await self.parser.search_properties(
+                        min_bedrooms=settings["min_bedrooms"],
+                        max_price=settings["max_price"],
+                        location=region,
+                        limit=settings["max_results_per_search"] // len(settings["regions"])
+                    )
+                    all_results.extend(region_results)
+                except Exception as e:
+                    logger.error(f"Ошибка поиска в регионе {region}: {e}")
+                    continue
+        
+        return all_results
+    
+    async def _iter_search(self, settings: Dict[str, Any],
+                           known_urls: Optional[Set[str]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Поиск по всем регионам с выдачей объявлений по мере разбора
+        
+        С known_urls поиск инкрементальный: сначала новые, известные
+        объявления не загружаются.
+        """
         for region in settings["regions"]:
             try:
-                region_results = await self.parser.search_properties(
+                async with aclosing(self.parser.iter_properties(
                     min_bedrooms=settings["min_bedrooms"],
                     max_price=settings["max_price"],
                     location=region,
-                    limit=settings["max_results_per_search"] // len(settings["regions"])
-                )
-                all_results.extend(region_results)
+                    limit=settings["max_results_per_search"] // len(settings["regions"]),
+                    incremental=known_urls is not None,
+                    known_urls=known_urls
+                )) as properties:
+                    async for prop in properties:
+                        yield prop
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 logger.error(f"Ошибка поиска в регионе {region}: {e}")
                 continue
-        
-        return all_results
     
     async def _monitoring_loop(self, user_id: int, settings: Dict[str, Any]):
         """Основной цикл мониторинга"""
@@ -511,34 +640,52 @@ class EnhancedPropertyBot:
         
         while True:
             try:
-                start_time = time.time()
-                
-                # Выполняем поиск
-                results = await self._perform_search(settings)
-                execution_time = time.time() - start_time
-                
-                if results:
-                    # Проверяем новые объявления
+                async with cycle_profiler.profile("monitoring", user_id):
+                    start_time = time.time()
+                    
                     search_params = self._get_search_params(settings)
-                    new_properties = await self.db.get_new_properties(user_id, results, search_params)
+                    found_count = 0
+                    new_count = 0
                     
-                    # Логируем результат
-                    await self.db.log_monitoring_session(
-                        user_id, search_params, len(results), len(new_properties), execution_time
-                    )
+                    # Каждое объявление проверяется и отправляется сразу после разбора;
+                    # время цикла раскладывается по фазам (fetch, extract, dedup, render, send)
+                    timer = PhaseTimer()
+                    with timer.activate():
+                        # Объявления из истории пользователя уже обработаны - их не загружаем
+                        known_urls = None
+                        if app_settings.INCREMENTAL_MONITORING:
+                            with timer.phase("dedup"):
+                                known_urls = await self.db.get_seen_property_urls(user_id)
+                        async with aclosing(self._iter_search(settings, known_urls)) as properties:
+                            async for prop in properties:
+                                found_count += 1
+                                with timer.phase("dedup"):
+                                    new_properties = await self.db.get_new_properties(user_id, [prop], search_params)
+                                if new_properties:
+                                    with timer.phase("send"):
+                                        await self._send_new_properties(user_id, new_properties)
+                                    new_count += 1
                     
-                    if new_properties:
-                        # Отправляем новые объявления пользователю
-                        await self._send_new_properties(user_id, new_properties)
-                        
-                        # Уведомление о мониторинге
-                        await self.bot.send_message(
-                            user_id,
-                            f"🔍 **Мониторинг:** найдено {len(new_properties)} новых объявлений!",
-                            parse_mode="Markdown"
+                    execution_time = time.time() - start_time
+                    timer.remainder("fetch", execution_time)
+                    
+                    # В инкрементальном режиме пустой цикл - нормальный результат, его тоже логируем
+                    if found_count or known_urls is not None:
+                        # Логируем результат
+                        await self.db.log_monitoring_session(
+                            user_id, search_params, found_count, new_count, execution_time,
+                            phase_timings=timer.as_dict()
                         )
-                    else:
-                        logger.info(f"Мониторинг пользователя {user_id}: новых объявлений нет")
+                        
+                        if new_count:
+                            # Уведомление о мониторинге
+                            await self.send_throttle.send(user_id, lambda: self.bot.send_message(
+                                user_id,
+                                f"🔍 **Мониторинг:** найдено {new_count} новых объявлений!",
+                                parse_mode="Markdown"
+                            ))
+                        else:
+                            logger.info(f"Мониторинг пользователя {user_id}: новых объявлений нет")
                 
                 # Ждем следующей проверки
                 await asyncio.sleep(settings["monitoring_interval"])
@@ -558,67 +705,31 @@ class EnhancedPropertyBot:
                 await asyncio.sleep(settings["monitoring_interval"])
     
     async def _send_new_properties(self, user_id: int, properties: List[Dict[str, Any]]):
-        """Отправляет новые объявления пользователю с задержкой между сообщениями"""
+        """Отправляет новые объявления пользователю с задержкой между сообщениями
+        
+        Пауза выдерживается по чату (send_throttle), поэтому соблюдается и при
+        отправке объявлений мониторинга по одному.
+        """
         sent_urls = []
         
-        for i, prop in enumerate(properties):
+        for prop in properties:
             try:
-                message = self._format_property_message(prop)
-                await self.bot.send_message(user_id, message, parse_mode="Markdown")
+                with phase_span("render"):
+                    message = self._format_property_message(prop)
+                await self.send_throttle.send(
+                    user_id, lambda: self.bot.send_message(user_id, message, parse_mode=MARKDOWN_PARSE_MODE)
+                )
                 sent_urls.append(prop["url"])
-                
-                # Добавляем задержку между сообщениями (кроме последнего)
-                if i < len(properties) - 1:
-                    await asyncio.sleep(1.5)  # Задержка 1.5 секунды между сообщениями
-                    
             except Exception as e:
                 logger.error(f"Ошибка отправки объявления пользователю {user_id}: {e}")
-                # Увеличиваем задержку при ошибке
-                await asyncio.sleep(2.0)
         
         # Отмечаем отправленные объявления
         if sent_urls:
             await self.db.mark_properties_as_sent(user_id, sent_urls)
     
-    def _escape_markdown(self, text: str) -> str:
-        """Экранирует специальные символы для Markdown"""
-        if not text:
-            return text
-        
-        # Символы, которые нужно экранировать в Markdown
-        chars_to_escape = ['_', '*', '[', ']', '(', ')', '~', '`', '>', '#', '+', '-', '=', '|', '{', '}', '.', '!']
-        
-        for char in chars_to_escape:
-            text = text.replace(char, f'\\{char}')
-        
-        return text
-    
     def _format_property_message(self, prop: Dict[str, Any]) -> str:
         """Форматирует объявление для отправки"""
-        title = self._escape_markdown(prop.get('title', 'Без названия'))
-        price = f"€{prop['price']}" if prop.get('price') else 'Цена не указана'
-        bedrooms = f"{prop['bedrooms']} спален" if prop.get('bedrooms') else 'Спальни не указаны'
-        location = self._escape_markdown(prop.get('location', 'Локация не указана'))
-        property_type = self._escape_markdown(prop.get('property_type', 'Тип не указан'))
-        url = prop.get('url', '')
-        
-        message = (
-            f"🏠 **{title}**\n\n"
-            f"💰 {price}\n"
-            f"🛏️ {bedrooms}\n"
-            f"📍 {location}\n"
-            f"🏠 {property_type}\n\n"
-        )
-        
-        if prop.get('description'):
-            desc = self._escape_markdown(prop['description'])
-            desc = desc[:150] + "..." if len(desc) > 150 else desc
-            message += f"📝 {desc}\n\n"
-        
-        if url:
-            message += f"🔗 [Посмотреть объявление]({url})"
-        
-        return message
+        return render_property_message(prop)
 
 
 # Дополнительные обработчики будут добавлены в следующей части...
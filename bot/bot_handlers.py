@@ -11,9 +11,13 @@ from aiogram.types import CallbackQuery, Message, InlineKeyboardMarkup, InlineKe
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
+from bot.jobs import JobLimitExceeded
+
 logger = logging.getLogger(__name__)
 
 from config.regions import ALL_LOCATIONS, LIMITS
+from utils.phase_timer import PHASE_TITLES
+from utils.rendering import MARKDOWN_PARSE_MODE
 from bot.keyboards import (
     get_settings_menu_keyboard, get_regions_menu_keyboard,
     get_region_categories_keyboard, get_category_regions_keyboard,
@@ -517,6 +521,13 @@ class EnhancedPropertyBotHandlers:
             f"• Новых объявлений: {stats['monitoring']['total_new_properties']}"
         )
         
+        phases = stats['monitoring'].get('phases')
+        if phases:
+            stats_text += "\n\n**⏱️ Время по фазам (среднее / p95):**"
+            for phase, title in PHASE_TITLES.items():
+                if phase in phases:
+                    stats_text += f"\n• {title}: {phases[phase]['avg']}с / {phases[phase]['p95']}с"
+        
         await callback.message.edit_text(
             stats_text,
             reply_markup=get_statistics_keyboard(),
@@ -781,22 +792,29 @@ class EnhancedPropertyBotHandlers:
             await callback.answer()
             return
         
-        await callback.message.edit_text(
-            f"📋 **Все найденные объявления ({len(results)})**\n\n"
-            "Отправляю все объявления...",
-            reply_markup=get_main_menu_keyboard(),
-            parse_mode="Markdown"
-        )
+        # Отправляем все результаты в фоне, не занимая обработчик апдейта
+        try:
+            self.jobs.submit(
+                user_id, "send_all_results",
+                lambda: self._send_all_properties(user_id, results)
+            )
+        except JobLimitExceeded:
+            await callback.answer("⏳ Дождитесь завершения предыдущей задачи", show_alert=True)
+            return
         
         # Сразу отвечаем на callback, чтобы избежать timeout
         try:
-            await callback.answer("📤 Начинаю отправку объявлений...")
+            await callback.answer("📤 Объявления поставлены в очередь на отправку")
         except Exception as e:
             # Игнорируем ошибки timeout для callback
             logger.warning(f"Callback timeout: {e}")
         
-        # Отправляем все результаты
-        await self._send_all_properties(user_id, results)
+        await callback.message.edit_text(
+            f"📋 **Все найденные объявления ({len(results)})**\n\n"
+            "Отправляю все объявления...",
+            reply_markup=get_main_menu_keyboard(),
+            parse_mode="Markdown"
+        )
 
     async def _send_all_properties(self, user_id: int, properties: List[Dict[str, Any]]):
         """Отправляет все объявления пользователю"""
@@ -813,7 +831,7 @@ class EnhancedPropertyBotHandlers:
                 await self.bot.send_message(
                     chat_id=user_id,
                     text=message,
-                    parse_mode="Markdown",
+                    parse_mode=MARKDOWN_PARSE_MODE,
                     disable_web_page_preview=False
                 )
                 
@@ -829,35 +847,3 @@ class EnhancedPropertyBotHandlers:
                 continue
         
         logger.info(f"Отправлено {count} объявлений пользователю {user_id}")
-
-    def _escape_markdown(self, text: str) -> str:
-        """Экранирует специальные символы для Markdown"""
-        if not text:
-            return str(text) if text is not None else ""
-        
-        text = str(text)
-        # Символы, которые нужно экранировать в Markdown
-        chars_to_escape = ['_', '*', '[', ']', '(', ')', '~', '`', '>', '#', '+', '-', '=', '|', '{', '}', '.', '!']
-        
-        for char in chars_to_escape:
-            text = text.replace(char, f'\\{char}')
-        
-        return text
-
-    def _format_property_message(self, prop: Dict[str, Any]) -> str:
-        """Форматирует сообщение об объявлении"""
-        title = self._escape_markdown(prop.get('title', 'Без названия'))
-        price = self._escape_markdown(prop.get('price', 'Цена не указана'))
-        bedrooms = self._escape_markdown(prop.get('bedrooms', 'Не указано'))
-        location = self._escape_markdown(prop.get('location', 'Местоположение не указано'))
-        url = prop.get('url', '')
-        
-        message = f"🏠 **{title}**\n\n"
-        message += f"💰 **Цена:** {price}\n"
-        message += f"🛏️ **Спален:** {bedrooms}\n"
-        message += f"📍 **Местоположение:** {location}\n"
-        
-        if url:
-            message += f"\n🔗 [Подробнее на Daft\\.ie]({url})"
-        
-        return message
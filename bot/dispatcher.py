@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Ограничение числа задач обработки апдейтов
+
+aiogram создает на каждый апдейт отдельную задачу: при long polling
+(handle_as_tasks) и в webhook-режиме (handle_in_background). Middleware
+ConcurrencyLimitMiddleware ограничивает только одновременно работающие
+обработчики - задачи, ждущие его семафор, все равно создаются, и при
+всплеске апдейтов их число (и память) не ограничено.
+
+Здесь ограничено само создание задач: не больше max_pending_updates
+апдейтов в работе или в ожидании. При long polling следующий апдейт не
+берется из getUpdates, пока не освободится слот, и остальные ждут на
+стороне Telegram; в webhook-режиме ответ на запрос задерживается до
+освобождения слота.
+
+aiogram 3.3 не умеет этого сам (tasks_concurrency_limit появился позже),
+поэтому переопределяются его внутренние методы: Dispatcher._listen_updates,
+Dispatcher._process_update и обработчик webhook-запроса в фоне.
+"""
+
+import asyncio
+from typing import Any, AsyncGenerator, Dict
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+from aiohttp import web
+
+
+class BoundedDispatcher(Dispatcher):
+    """Dispatcher с ограничением числа задач апдейтов"""
+
+    def __init__(self, *args: Any, max_pending_updates: int = 256, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.max_pending_updates = max_pending_updates
+        self.update_slots = asyncio.Semaphore(max_pending_updates)
+
+    async def _listen_updates(self, *args: Any, **kwargs: Any) -> AsyncGenerator[Update, None]:
+        # Слот занимается до того, как polling создаст задачу апдейта
+        async for update in super()._listen_updates(*args, **kwargs):
+            await self.update_slots.acquire()
+            yield update
+
+    async def _process_update(self, *args: Any, **kwargs: Any) -> bool:
+        try:
+            return await super()._process_update(*args, **kwargs)
+        finally:
+            self.update_slots.release()
+
+
+class BoundedRequestHandler(SimpleRequestHandler):
+    """Webhook-обработчик: фоновая задача апдейта создается только при свободном слоте"""
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        slots = getattr(self.dispatcher, "update_slots", None)
+        if slots is None:
+            return await super()._handle_request_background(bot, request)
+
+        await slots.acquire()
+        try:
+            return await super()._handle_request_background(bot, request)
+        except BaseException:
+            # Задача не создана (например, тело запроса не JSON) - слот свободен
+            slots.release()
+            raise
+
+    async def _background_feed_update(self, bot: Bot, update: Dict[str, Any]) -> None:
+        try:
+            await super()._background_feed_update(bot, update)
+        finally:
+            if getattr(self.dispatcher, "update_slots", None) is not None:
+                self.dispatcher.update_slots.release()
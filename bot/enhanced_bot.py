@@ -5,20 +5,35 @@
 
 import asyncio
 import logging
-from typing import Dict, Any, List
+from contextlib import aclosing
+from typing import Dict, Any, AsyncIterator, List, Optional, Set
 from datetime import datetime
 import time
 
-from aiogram import Bot, Dispatcher, F
+from aiogram import Bot, F
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.filters import Command, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
-from aiogram.fsm.storage.memory import MemoryStorage
 
 from database.enhanced_database import EnhancedDatabase
-from production_parser import ProductionDaftParser
+from database.fsm_storage import SQLiteStorage
+from parser.browser_pool import browser_pool
+from parser.offload import shutdown_executor
 from config.regions import ALL_LOCATIONS, DEFAULT_SETTINGS, LIMITS, TARGET_GROUP_ID
+from utils.loop_monitor import loop_monitor
+from utils.rendering import MARKDOWN_PARSE_MODE, escape_markdown, render_property_message
+from utils.phase_timer import PhaseTimer, phase_span
+from utils.profiling import cycle_profiler
+from config.settings import settings as app_settings
+from bot.webhook import run_dispatcher
+from bot.dispatcher import BoundedDispatcher
+from bot.jobs import JobRunner
+from bot.send_throttle import ChatSendThrottle
+from bot.middlewares import ConcurrencyLimitMiddleware, TelegramMetricsMiddleware
+from utils.metrics import MONITORING_TASKS
 from bot.enhanced_keyboards import (
     get_main_menu_keyboard, get_settings_menu_keyboard, get_regions_menu_keyboard,
     get_region_categories_keyboard, get_category_regions_keyboard, 
@@ -38,16 +53,54 @@ class EnhancedPropertyBot:
     """Улучшенный бот для мониторинга недвижимости"""
     
     def __init__(self, bot_token: str):
-        self.bot = Bot(token=bot_token)
-        self.dp = Dispatcher(storage=MemoryStorage())
+        # Свой адрес Bot API: локальный telegram-bot-api или фейковый сервер нагрузочного теста
+        session = None
+        if app_settings.TELEGRAM_API_URL:
+            session = AiohttpSession(api=TelegramAPIServer.from_base(app_settings.TELEGRAM_API_URL))
+        self.bot = Bot(token=bot_token, session=session)
         self.db = EnhancedDatabase()
-        self.parser = ProductionDaftParser()
+        # FSM состояния хранятся в той же базе и переживают перезапуск
+        self.dp = BoundedDispatcher(
+            storage=SQLiteStorage(
+                self.db.db_path,
+                state_ttl=app_settings.FSM_STATE_TTL,
+                flush_interval=app_settings.FSM_FLUSH_INTERVAL
+            ),
+            max_pending_updates=app_settings.MAX_PENDING_UPDATES
+        )
+        # Парсер (и Playwright) загружается при первом поиске
+        self._parser = None
+        self._warmup_task = None
         
         # Словарь активных задач мониторинга {user_id: task}
         self.monitoring_tasks: Dict[int, asyncio.Task] = {}
         
+        # Фоновые задачи и ограничение параллельной обработки апдейтов
+        self.jobs = JobRunner(app_settings.MAX_BACKGROUND_JOBS, app_settings.MAX_JOBS_PER_USER)
+        # Пауза между сообщениями одного чата, в том числе между объявлениями мониторинга
+        self.send_throttle = ChatSendThrottle(app_settings.MESSAGE_INTERVAL, app_settings.SEND_RETRY_ATTEMPTS)
+        self.dp.update.outer_middleware(ConcurrencyLimitMiddleware(app_settings.MAX_CONCURRENT_UPDATES))
+        
+        # Метрики: запросы к Bot API и активные мониторинги
+        self.bot.session.middleware(TelegramMetricsMiddleware())
+        MONITORING_TASKS.set_function(
+            lambda: sum(not task.done() for task in self.monitoring_tasks.values())
+        )
+        
         self._register_handlers()
     
+    @property
+    def parser(self):
+        """Парсер daft.ie; модуль парсера и Playwright импортируются при первом обращении"""
+        if self._parser is None:
+            from production_parser import ProductionDaftParser
+            self._parser = ProductionDaftParser()
+        return self._parser
+    
+    @parser.setter
+    def parser(self, value):
+        self._parser = value
+    
     def _register_handlers(self):
         """Регистрация всех обработчиков"""
         
@@ -55,6 +108,7 @@ class EnhancedPropertyBot:
         self.dp.message.register(self.cmd_start, Command("start"))
         self.dp.message.register(self.cmd_help, Command("help"))
         self.dp.message.register(self.cmd_status, Command("status"))
+        self.dp.message.register(self.cmd_profile, Command("profile"))
         
         # Главное меню
         self.dp.callback_query.register(self.callback_main_menu, F.data == "main_menu")
@@ -147,8 +201,11 @@ class EnhancedPropertyBot:
     async def start_bot(self):
         """Запуск бота"""
         await self.db.init_database()
-        logger.info("Бот запущен")
-        await self.dp.start_polling(self.bot)
+        if app_settings.BROWSER_WARMUP:
+            # Браузер поднимается в фоне, параллельно с запуском polling
+            self._warmup_task = asyncio.create_task(browser_pool.warmup(app_settings.BROWSER_WARMUP_URL))
+        logger.info(f"Бот запущен (режим: {app_settings.BOT_MODE})")
+        await run_dispatcher(self.dp, self.bot)
     
     async def stop_bot(self):
         """Остановка бота"""
@@ -157,6 +214,12 @@ class EnhancedPropertyBot:
             task.cancel()
         self.monitoring_tasks.clear()
         
+        await self.jobs.shutdown()
+        if self._warmup_task:
+            self._warmup_task.cancel()
+        await browser_pool.close()
+        shutdown_executor()
+        await self.dp.storage.close()
         await self.bot.session.close()
         logger.info("Бот остановлен")
     
@@ -260,12 +323,41 @@ class EnhancedPropertyBot:
             f"📊 Лимит результатов: {settings['max_results_per_search']}"
         )
         
+        if app_settings.ADMIN_USER_ID and user_id == app_settings.ADMIN_USER_ID:
+            status_msg += (
+                f"\n\n🛠️ **Для администратора:**\n"
+                f"{loop_monitor.format_status()}\n"
+                f"🔄 Активных мониторингов: {sum(not task.done() for task in self.monitoring_tasks.values())}"
+            )
+        
         await message.answer(
             status_msg,
             reply_markup=get_main_menu_keyboard(),
             parse_mode="Markdown"
         )
     
+    async def cmd_profile(self, message: Message):
+        """Обработчик команды /profile [N|off] (только администратор)"""
+        user_id = message.from_user.id
+        if not (app_settings.ADMIN_USER_ID and user_id == app_settings.ADMIN_USER_ID):
+            await message.answer("❌ Команда доступна только администратору")
+            return
+        
+        args = (message.text or "").split()[1:]
+        if args and args[0].lower() == "off":
+            cycle_profiler.disarm()
+        elif args:
+            try:
+                cycle_profiler.arm(int(args[0]))
+            except ValueError:
+                await message.answer("❌ Использование: /profile [N|off]")
+                return
+        
+        await message.answer(
+            cycle_profiler.format_status() + f"\n\n📂 Профили: `{app_settings.PROFILE_DIR}`",
+            parse_mode="Markdown"
+        )
+    
     # === ГЛАВНОЕ МЕНЮ ===
     
     async def callback_main_menu(self, callback: CallbackQuery):
@@ -430,13 +522,24 @@ class EnhancedPropertyBot:
             await callback.answer()
             return
         
+        if not self.jobs.can_submit(user_id):
+            await callback.answer("⏳ Предыдущий поиск еще выполняется", show_alert=True)
+            return
+        
         await callback.message.edit_text(
             "🔍 **Выполняется поиск...**\\n\\nПожалуйста, подождите.",
             parse_mode="Markdown"
         )
-        await callback.answer()
         
-        # Выполняем поиск
+        # Долгий поиск выполняется в фоне, обработчик апдейта сразу освобождается
+        job = self.jobs.submit(
+            user_id, "single_search",
+            lambda: self._run_single_search(callback.message, user_id, settings)
+        )
+        await callback.answer(f"Поиск запущен (задача #{job.job_id})")
+    
+    async def _run_single_search(self, message: Message, user_id: int, settings: Dict[str, Any]):
+        """Выполняет разовый поиск в фоновой задаче"""
         try:
             start_time = time.time()
             results = await self._perform_search(settings)
@@ -458,7 +561,7 @@ class EnhancedPropertyBot:
                     logger.info(f"Отправляем {len(new_properties)} новых объявлений пользователю {user_id} в чат {target_chat_id}")
                     await self._send_new_properties(user_id, new_properties, target_chat_id)
                     
-                    await callback.message.edit_text(
+                    await message.edit_text(
                         f"✅ **Поиск завершен!**\\n\\n"
                         f"📊 Найдено объявлений: {len(results)}\\n"
                         f"🆕 Новых объявлений: {len(new_properties)}\\n"
@@ -473,7 +576,7 @@ class EnhancedPropertyBot:
                         [InlineKeyboardButton(text="🏠 Главное меню", callback_data="main_menu")]
                     ])
                     
-                    await callback.message.edit_text(
+                    await message.edit_text(
                         f"✅ **Поиск завершен!**\\n\\n"
                         f"📊 Найдено объявлений: {len(results)}\\n"
                         f"🔄 Все объявления уже известны\\n"
@@ -484,9 +587,9 @@ class EnhancedPropertyBot:
                     )
                     
                     # Сохраняем результаты в кэш для показа
-                    await self.db.cache_search_results(user_id, results)
+                    await self.db.cache_search_results(user_id, results, search_params)
             else:
-                await callback.message.edit_text(
+                await message.edit_text(
                     "❌ **Объявления не найдены**\\n\\n"
                     "Попробуйте изменить параметры поиска.",
                     reply_markup=get_main_menu_keyboard(),
@@ -495,7 +598,7 @@ class EnhancedPropertyBot:
                 
         except Exception as e:
             logger.error(f"Ошибка при разовом поиске для пользователя {user_id}: {e}")
-            await callback.message.edit_text(
+            await message.edit_text(
                 f"❌ **Ошибка при поиске**\\n\\n{str(e)[:100]}...",
                 reply_markup=get_main_menu_keyboard(),
                 parse_mode="Markdown"
@@ -527,24 +630,51 @@ class EnhancedPropertyBot:
         """Выполняет поиск недвижимости"""
         all_results = []
         
-        # Поиск по каждому региону
+        async with cycle_profiler.profile("search", settings["user_id"]):
+            # Поиск по каждому региону
+            for region in settings["regions"]:
+                try:
+                    region_results = await self.parser.search_properties(
+                        min_bedrooms=settings["min_bedrooms"],
+                        max_price=settings["max_price"],
+                        location=region,
+                        limit=settings["max_results_per_search"] // len(settings["regions"])
+                    )
+                    all_results.extend(region_results)
+                except asyncio.CancelledError:
+                    logger.info(f"Поиск в регионе {region} был отменен")
+                    raise  # Переподнимаем для правильной обработки в мониторинге
+                except Exception as e:
+                    logger.error(f"Ошибка поиска в регионе {region}: {e}")
+                    continue
+        
+        return all_results
+    
+    async def _iter_search(self, settings: Dict[str, Any],
+                           known_urls: Optional[Set[str]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Поиск по всем регионам с выдачей объявлений по мере разбора
+        
+        С known_urls поиск инкрементальный: сначала новые, известные
+        объявления не загружаются.
+        """
         for region in settings["regions"]:
             try:
-                region_results = await self.parser.search_properties(
+                async with aclosing(self.parser.iter_properties(
                     min_bedrooms=settings["min_bedrooms"],
                     max_price=settings["max_price"],
                     location=region,
-                    limit=settings["max_results_per_search"] // len(settings["regions"])
-                )
-                all_results.extend(region_results)
+                    limit=settings["max_results_per_search"] // len(settings["regions"]),
+                    incremental=known_urls is not None,
+                    known_urls=known_urls
+                )) as properties:
+                    async for prop in properties:
+                        yield prop
             except asyncio.CancelledError:
                 logger.info(f"Поиск в регионе {region} был отменен")
-                raise  # Переподнимаем для правильной обработки в мониторинге
+                raise
             except Exception as e:
                 logger.error(f"Ошибка поиска в регионе {region}: {e}")
                 continue
-        
-        return all_results
     
     async def _monitoring_loop(self, user_id: int):
         """Основной цикл мониторинга"""
@@ -552,45 +682,61 @@ class EnhancedPropertyBot:
         
         while True:
             try:
-                start_time = time.time()
-                
-                # Получаем актуальные настройки пользователя
-                settings = await self.db.get_user_settings(user_id)
-                if not settings:
-                    logger.error(f"Настройки пользователя {user_id} не найдены, останавливаем мониторинг")
-                    break
-                
-                # Выполняем поиск
-                results = await self._perform_search(settings)
-                execution_time = time.time() - start_time
-                
-                if results:
-                    # Проверяем новые объявления
+                async with cycle_profiler.profile("monitoring", user_id):
+                    start_time = time.time()
+                    
+                    # Получаем актуальные настройки пользователя
+                    settings = await self.db.get_user_settings(user_id)
+                    if not settings:
+                        logger.error(f"Настройки пользователя {user_id} не найдены, останавливаем мониторинг")
+                        break
+                    
                     search_params = self._get_search_params(settings)
-                    new_properties = await self.db.get_new_properties(user_id, results, search_params)
+                    # Используем chat_id из настроек пользователя (уже с fallback на user_id)
+                    target_chat_id = settings["chat_id"]  # Этот ID уже корректный из get_user_settings
+                    found_count = 0
+                    new_count = 0
                     
-                    # Логируем результат
-                    await self.db.log_monitoring_session(
-                        user_id, search_params, len(results), len(new_properties), execution_time
-                    )
+                    # Каждое объявление проверяется и отправляется сразу после разбора;
+                    # время цикла раскладывается по фазам (fetch, extract, dedup, render, send)
+                    timer = PhaseTimer()
+                    with timer.activate():
+                        # Объявления из истории пользователя уже обработаны - их не загружаем
+                        known_urls = None
+                        if app_settings.INCREMENTAL_MONITORING:
+                            with timer.phase("dedup"):
+                                known_urls = await self.db.get_seen_property_urls(user_id)
+                        async with aclosing(self._iter_search(settings, known_urls)) as properties:
+                            async for prop in properties:
+                                found_count += 1
+                                with timer.phase("dedup"):
+                                    new_properties = await self.db.get_new_properties(user_id, [prop], search_params)
+                                if new_properties:
+                                    logger.info(f"Мониторинг: отправляем объявление пользователю {user_id} в чат {target_chat_id}")
+                                    with timer.phase("send"):
+                                        await self._send_new_properties(user_id, new_properties, target_chat_id)
+                                    new_count += 1
                     
-                    if new_properties:
-                        # Используем chat_id из настроек пользователя (уже с fallback на user_id)
-                        target_chat_id = settings["chat_id"]  # Этот ID уже корректный из get_user_settings
-                        
-                        logger.info(f"Мониторинг: отправляем {len(new_properties)} объявлений пользователю {user_id} в чат {target_chat_id}")
-                        
-                        # Отправляем новые объявления
-                        await self._send_new_properties(user_id, new_properties, target_chat_id)
-                        
-                        # Уведомление о мониторинге - отправляем в тот же чат
-                        await self.bot.send_message(
-                            target_chat_id,
-                            f"🔍 **Мониторинг:** найдено {len(new_properties)} новых объявлений!",
-                            parse_mode="Markdown"
+                    execution_time = time.time() - start_time
+                    timer.remainder("fetch", execution_time)
+                    
+                    # В инкрементальном режиме пустой цикл - нормальный результат, его тоже логируем
+                    if found_count or known_urls is not None:
+                        # Логируем результат
+                        await self.db.log_monitoring_session(
+                            user_id, search_params, found_count, new_count, execution_time,
+                            phase_timings=timer.as_dict()
                         )
-                    else:
-                        logger.info(f"Мониторинг пользователя {user_id}: новых объявлений нет")
+                        
+                        if new_count:
+                            # Уведомление о мониторинге - отправляем в тот же чат
+                            await self.send_throttle.send(target_chat_id, lambda: self.bot.send_message(
+                                target_chat_id,
+                                f"🔍 **Мониторинг:** найдено {new_count} новых объявлений!",
+                                parse_mode="Markdown"
+                            ))
+                        else:
+                            logger.info(f"Мониторинг пользователя {user_id}: новых объявлений нет")
                 
                 # Ждем следующей проверки
                 await asyncio.sleep(settings["monitoring_interval"])
@@ -616,7 +762,11 @@ class EnhancedPropertyBot:
                     break
     
     async def _send_new_properties(self, user_id: int, properties: List[Dict[str, Any]], chat_id: int = None):
-        """Отправляет новые объявления в указанный чат"""
+        """Отправляет новые объявления в указанный чат
+        
+        Пауза между сообщениями выдерживается по чату (send_throttle), в том
+        числе при отправке объявлений мониторинга по одному.
+        """
         sent_urls = []
         target_chat = chat_id or user_id  # Используем chat_id, если задан, иначе user_id
         
@@ -637,9 +787,9 @@ class EnhancedPropertyBot:
                     if user_row:
                         username, first_name = user_row
                         if username:
-                            user_info = f"\n👤 От пользователя: @{username}"
+                            user_info = f"\n👤 От пользователя: @{escape_markdown(username)}"
                         elif first_name:
-                            user_info = f"\n👤 От пользователя: {first_name}"
+                            user_info = f"\n👤 От пользователя: {escape_markdown(first_name)}"
                         else:
                             user_info = f"\n👤 От пользователя: {user_id}"
                     else:
@@ -650,8 +800,11 @@ class EnhancedPropertyBot:
         
         for prop in properties:
             try:
-                message = self._format_property_message(prop, user_info)
-                await self.bot.send_message(target_chat, message, parse_mode="Markdown")
+                with phase_span("render"):
+                    message = self._format_property_message(prop, user_info)
+                await self.send_throttle.send(
+                    target_chat, lambda: self.bot.send_message(target_chat, message, parse_mode=MARKDOWN_PARSE_MODE)
+                )
                 sent_urls.append(prop["url"])
             except Exception as e:
                 logger.error(f"Ошибка отправки объявления в чат {target_chat}: {e}")
@@ -662,35 +815,7 @@ class EnhancedPropertyBot:
     
     def _format_property_message(self, prop: Dict[str, Any], user_info: str = "") -> str:
         """Форматирует объявление для отправки"""
-        title = prop.get('title', 'Без названия')
-        price = f"€{prop['price']}" if prop.get('price') else 'Цена не указана'
-        bedrooms = f"{prop['bedrooms']} спален" if prop.get('bedrooms') else 'Спальни не указаны'
-        location = prop.get('location', 'Локация не указана')
-        property_type = prop.get('property_type', 'Тип не указан')
-        url = prop.get('url', '')
-        
-        message = (
-            f"🏠 **{title}**\\n\\n"
-            f"💰 {price}\\n"
-            f"🛏️ {bedrooms}\\n"
-            f"📍 {location}\\n"
-            f"🏠 {property_type}"
-        )
-        
-        # Добавляем информацию о пользователе, если есть
-        if user_info:
-            message += user_info
-        
-        message += "\\n\\n"
-        
-        if prop.get('description'):
-            desc = prop['description'][:150] + "..." if len(prop['description']) > 150 else prop['description']
-            message += f"📝 {desc}\\n\\n"
-        
-        if url:
-            message += f"🔗 [Посмотреть объявление]({url})"
-        
-        return message
+        return render_property_message(prop, extra=user_info)
 
     # === ДОПОЛНИТЕЛЬНЫЕ ОБРАБОТЧИКИ ===
     
@@ -860,8 +985,10 @@ class EnhancedPropertyBot:
         """Показать все найденные объявления - всегда отправляет в группу"""
         GROUP_CHAT_ID = -1002819366953  # Жестко закодированный ID группы
         
-        # Получаем кэшированные результаты (используем любой user_id, так как результаты одинаковые)
-        results = await self.db.get_cached_search_results(1665845754)  # Или любой другой ID
+        user_id = callback.from_user.id
+        
+        # Результаты последнего поиска именно этого пользователя
+        results = await self.db.get_cached_search_results(user_id)
         
         if not results:
             await callback.message.edit_text(
@@ -879,7 +1006,7 @@ class EnhancedPropertyBot:
         
         # Отправляем всегда в группу
         logger.info(f"Отправляем {len(results)} объявлений в группу {GROUP_CHAT_ID}")
-        await self._send_new_properties(1665845754, results, GROUP_CHAT_ID)
+        await self._send_new_properties(user_id, results, GROUP_CHAT_ID)
         
         await callback.message.edit_text(
             f"✅ **Отправлено!**\n\n"
@@ -11,9 +11,13 @@ from aiogram.types import CallbackQuery, Message, InlineKeyboardMarkup, InlineKe
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
+from bot.jobs import JobLimitExceeded
+
 logger = logging.getLogger(__name__)
 
 from config.regions import ALL_LOCATIONS, LIMITS
+from utils.phase_timer import PHASE_TITLES
+from utils.rendering import MARKDOWN_PARSE_MODE
 from bot.enhanced_keyboards import (
     get_settings_menu_keyboard, get_regions_menu_keyboard,
     get_region_categories_keyboard, get_category_regions_keyboard,
@@ -438,6 +442,13 @@ class EnhancedPropertyBotHandlers:
             f"• Новых объявлений: {stats['monitoring']['total_new_properties']}"
         )
         
+        phases = stats['monitoring'].get('phases')
+        if phases:
+            stats_text += "\\n\\n**⏱️ Время по фазам (среднее / p95):**"
+            for phase, title in PHASE_TITLES.items():
+                if phase in phases:
+                    stats_text += f"\\n• {title}: {phases[phase]['avg']}с / {phases[phase]['p95']}с"
+        
         await callback.message.edit_text(
             stats_text,
             reply_markup=get_statistics_keyboard(),
@@ -702,17 +713,23 @@ class EnhancedPropertyBotHandlers:
             await callback.answer()
             return
         
+        # Отправляем все результаты в фоне, не занимая обработчик апдейта
+        try:
+            self.jobs.submit(
+                user_id, "send_all_results",
+                lambda: self._send_all_properties(user_id, results)
+            )
+        except JobLimitExceeded:
+            await callback.answer("⏳ Дождитесь завершения предыдущей задачи", show_alert=True)
+            return
+        
         await callback.message.edit_text(
             f"📋 **Все найденные объявления ({len(results)})**\n\n"
             "Отправляю все объявления...",
             reply_markup=get_main_menu_keyboard(),
             parse_mode="Markdown"
         )
-        
-        # Отправляем все результаты
-        await self._send_all_properties(user_id, results)
-        
-        await callback.answer("✅ Все объявления отправлены!")
+        await callback.answer("📤 Объявления поставлены в очередь на отправку")
 
     async def _send_all_properties(self, user_id: int, properties: List[Dict[str, Any]]):
         """Отправляет все объявления пользователю"""
@@ -729,7 +746,7 @@ class EnhancedPropertyBotHandlers:
                 await self.bot.send_message(
                     chat_id=user_id,
                     text=message,
-                    parse_mode="Markdown",
+                    parse_mode=MARKDOWN_PARSE_MODE,
                     disable_web_page_preview=False
                 )
                 
@@ -743,21 +760,3 @@ class EnhancedPropertyBotHandlers:
                 continue
         
         logger.info(f"Отправлено {count} объявлений пользователю {user_id}")
-
-    def _format_property_message(self, prop: Dict[str, Any]) -> str:
-        """Форматирует сообщение об объявлении"""
-        title = prop.get('title', 'Без названия')
-        price = prop.get('price', 'Цена не указана')
-        bedrooms = prop.get('bedrooms', 'Не указано')
-        location = prop.get('location', 'Местоположение не указано')
-        url = prop.get('url', '')
-        
-        message = f"🏠 **{title}**\n\n"
-        message += f"💰 **Цена:** {price}\n"
-        message += f"🛏️ **Спален:** {bedrooms}\n"
-        message += f"📍 **Местоположение:** {location}\n"
-        
-        if url:
-            message += f"\n🔗 [Подробнее на Daft.ie]({url})"
-        
-        return message
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Фоновые задачи бота (разовый поиск, рассылка результатов)
+
+Долгие операции не выполняются внутри обработчика апдейта: обработчик
+ставит задачу в JobRunner, получает ID задачи и сразу отвечает пользователю.
+Число одновременно выполняемых задач и задач одного пользователя ограничено.
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class JobLimitExceeded(Exception):
+    """У пользователя уже максимальное количество задач в работе"""
+
+
+@dataclass
+class Job:
+    """Фоновая задача пользователя"""
+    job_id: str
+    user_id: int
+    name: str
+    created_at: float = field(default_factory=time.time)
+    status: str = "queued"  # queued, running, done, failed, cancelled
+    error: Optional[str] = None
+    task: Optional[asyncio.Task] = None
+
+
+class JobRunner:
+    """Запускает долгие операции в фоне с ограничением параллелизма"""
+
+    def __init__(self, max_concurrent_jobs: int = 3, max_jobs_per_user: int = 1):
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.max_jobs_per_user = max_jobs_per_user
+        self._semaphore = asyncio.Semaphore(max_concurrent_jobs)
+        self._ids = itertools.count(1)
+        self.jobs: Dict[str, Job] = {}
+        self._user_jobs: Dict[int, Set[str]] = {}
+
+    def can_submit(self, user_id: int) -> bool:
+        """Проверяет, может ли пользователь запустить еще одну задачу"""
+        return len(self._user_jobs.get(user_id, ())) < self.max_jobs_per_user
+
+    def submit(self, user_id: int, name: str, job_factory: Callable[[], Awaitable[None]]) -> Job:
+        """Ставит задачу в очередь и сразу возвращает её описание"""
+        if not self.can_submit(user_id):
+            raise JobLimitExceeded(f"У пользователя {user_id} уже есть задачи в работе")
+
+        user_jobs = self._user_jobs.setdefault(user_id, set())
+
+        job = Job(job_id=str(next(self._ids)), user_id=user_id, name=name)
+        self.jobs[job.job_id] = job
+        user_jobs.add(job.job_id)
+
+        job.task = asyncio.create_task(self._run(job, job_factory), name=f"job-{job.job_id}-{name}")
+        logger.info(f"Задача #{job.job_id} ({name}) поставлена в очередь для пользователя {user_id}")
+        return job
+
+    async def _run(self, job: Job, job_factory: Callable[[], Awaitable[None]]):
+        """Выполняет задачу под семафором"""
+        try:
+            async with self._semaphore:
+                job.status = "running"
+                started = time.time()
+                await job_factory()
+                job.status = "done"
+                logger.info(f"Задача #{job.job_id} ({job.name}) завершена за {time.time() - started:.1f}с")
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            logger.info(f"Задача #{job.job_id} ({job.name}) отменена")
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            logger.error(f"Задача #{job.job_id} ({job.name}) завершилась с ошибкой: {e}")
+        finally:
+            self.jobs.pop(job.job_id, None)
+            user_jobs = self._user_jobs.get(job.user_id)
+            if user_jobs is not None:
+                user_jobs.discard(job.job_id)
+                if not user_jobs:
+                    del self._user_jobs[job.user_id]
+
+    def active_jobs(self, user_id: Optional[int] = None) -> List[Job]:
+        """Возвращает задачи в работе (всех или одного пользователя)"""
+        if user_id is None:
+            return list(self.jobs.values())
+        return [self.jobs[job_id] for job_id in self._user_jobs.get(user_id, ())]
+
+    async def shutdown(self):
+        """Отменяет все задачи и ждет их завершения"""
+        tasks = [job.task for job in self.jobs.values() if job.task]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Middleware для aiogram диспетчера и сессии Bot API
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject
+
+from utils.metrics import TELEGRAM_ERRORS, TELEGRAM_REQUEST_SECONDS, TELEGRAM_RETRY_AFTER
+
+logger = logging.getLogger(__name__)
+
+
+class ConcurrencyLimitMiddleware(BaseMiddleware):
+    """Ограничивает количество одновременно обрабатываемых апдейтов
+
+    Ограничивается только работа обработчиков: задача апдейта к этому
+    моменту уже создана и ждет семафор. Число самих задач (в работе и в
+    ожидании) ограничивает BoundedDispatcher (bot/dispatcher.py).
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        self.max_concurrent_updates = max_concurrent_updates
+        self._semaphore = asyncio.Semaphore(max_concurrent_updates)
+        self.in_flight = 0
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        if self._semaphore.locked():
+            logger.debug(f"Достигнут лимит обработчиков ({self.max_concurrent_updates}), апдейт ждет")
+
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                return await handler(event, data)
+            finally:
+                self.in_flight -= 1
+
+
+class TelegramMetricsMiddleware(BaseRequestMiddleware):
+    """Длительность запросов к Bot API, ответы 429 и ошибки по методам"""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot,
+        method: TelegramMethod[TelegramType]
+    ) -> Response[TelegramType]:
+        method_name = type(method).__name__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except TelegramRetryAfter as e:
+            TELEGRAM_RETRY_AFTER.inc(method=method_name)
+            logger.warning(f"⏳ Telegram 429 на {method_name}, повтор через {e.retry_after} с")
+            raise
+        except Exception:
+            TELEGRAM_ERRORS.inc(method=method_name)
+            raise
+        finally:
+            TELEGRAM_REQUEST_SECONDS.observe(time.perf_counter() - started, method=method_name)
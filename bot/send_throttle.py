@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Ограничение частоты отправки сообщений в чат
+
+Объявления мониторинга отправляются по одному сразу после разбора, поэтому
+пауза между сообщениями хранится по чату (время последней отправки), а не
+внутри одного вызова рассылки. Ответ 429 (TelegramRetryAfter) не теряет
+объявление: отправка повторяется через указанное Telegram время.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, TypeVar
+
+from aiogram.exceptions import TelegramRetryAfter
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ChatSendThrottle:
+    """Выдерживает паузу между сообщениями одного чата и повторяет отправку после 429"""
+
+    def __init__(self, interval: float = 1.5, retry_attempts: int = 3):
+        self.interval = interval
+        self.retry_attempts = retry_attempts
+        self._last_send: Dict[int, float] = {}
+        self._locks: Dict[int, asyncio.Lock] = {}
+
+    async def send(self, chat_id: int, send: Callable[[], Awaitable[T]]) -> T:
+        """Вызывает send() не раньше чем через interval после прошлой отправки в чат
+
+        После TelegramRetryAfter ждет retry_after и повторяет (до retry_attempts
+        раз), затем пробрасывает исключение.
+        """
+        lock = self._locks.setdefault(chat_id, asyncio.Lock())
+        async with lock:
+            attempt = 0
+            while True:
+                wait = self._last_send.get(chat_id, 0.0) + self.interval - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                try:
+                    return await send()
+                except TelegramRetryAfter as e:
+                    attempt += 1
+                    if attempt > self.retry_attempts:
+                        raise
+                    logger.warning(f"⏳ Чат {chat_id}: лимит Telegram, повтор через {e.retry_after} с")
+                    await asyncio.sleep(e.retry_after)
+                finally:
+                    self._last_send[chat_id] = time.monotonic()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Webhook-режим для aiogram диспетчера (альтернатива long polling)
+
+Обновления принимаются aiohttp-сервером, секретный токен проверяется по
+заголовку X-Telegram-Bot-Api-Secret-Token, а каждое обновление
+обрабатывается в отдельной задаче, поэтому Telegram получает ответ сразу
+(пока число задач апдейтов не достигло MAX_PENDING_UPDATES).
+
+Локальная проверка без Telegram (WEBHOOK_HOST пустой, setWebhook не вызывается):
+
+    python3 -m bot.webhook --post recorded_update.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from pathlib import Path
+
+from aiohttp import web, ClientSession
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import setup_application
+
+from bot.dispatcher import BoundedRequestHandler
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def create_webhook_app(dp: Dispatcher, bot: Bot, **kwargs) -> web.Application:
+    """Создает aiohttp-приложение с обработчиком обновлений"""
+    app = web.Application()
+
+    BoundedRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        handle_in_background=True,  # Отвечаем Telegram сразу, обработка идет в отдельной задаче
+        secret_token=settings.WEBHOOK_SECRET or None,
+        **kwargs
+    ).register(app, path=settings.WEBHOOK_PATH)
+
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+async def start_webhook(dp: Dispatcher, bot: Bot, **kwargs):
+    """Запускает webhook-сервер и блокируется до отмены"""
+    app = create_webhook_app(dp, bot, **kwargs)
+
+    if settings.WEBHOOK_HOST:
+        webhook_url = settings.WEBHOOK_HOST.rstrip("/") + settings.WEBHOOK_PATH
+        await bot.set_webhook(
+            webhook_url,
+            secret_token=settings.WEBHOOK_SECRET or None,
+            allowed_updates=dp.resolve_used_update_types()
+        )
+        logger.info(f"Webhook установлен: {webhook_url}")
+    else:
+        logger.warning("WEBHOOK_HOST не задан - setWebhook не вызывается (локальный режим)")
+
+    if not settings.WEBHOOK_SECRET:
+        logger.warning("WEBHOOK_SECRET не задан - запросы к webhook не проверяются")
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, settings.WEBHOOK_LISTEN, settings.WEBHOOK_PORT)
+    await site.start()
+    logger.info(f"Webhook-сервер слушает {settings.WEBHOOK_LISTEN}:{settings.WEBHOOK_PORT}{settings.WEBHOOK_PATH}")
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+async def run_dispatcher(dp: Dispatcher, bot: Bot, **kwargs):
+    """Запускает диспетчер в режиме из настроек (BOT_MODE)"""
+    if settings.BOT_MODE == "webhook":
+        await start_webhook(dp, bot, **kwargs)
+    else:
+        # getUpdates не работает, пока установлен webhook
+        await bot.delete_webhook()
+        await dp.start_polling(bot, **kwargs)
+
+
+async def post_update(update_file: Path, url: str, secret: str) -> int:
+    """Отправляет записанный JSON обновления на локальный webhook"""
+    payload = json.loads(update_file.read_text(encoding="utf-8"))
+    updates = payload if isinstance(payload, list) else [payload]
+    headers = {SECRET_HEADER: secret} if secret else {}
+
+    async with ClientSession() as session:
+        for update in updates:
+            async with session.post(url, json=update, headers=headers) as response:
+                print(f"update_id={update.get('update_id')}: HTTP {response.status}")
+                if response.status != 200:
+                    return 1
+    return 0
+
+
+def main():
+    """CLI для локальной проверки webhook"""
+    default_url = f"http://127.0.0.1:{settings.WEBHOOK_PORT}{settings.WEBHOOK_PATH}"
+
+    arg_parser = argparse.ArgumentParser(description="Отправка записанных обновлений на локальный webhook")
+    arg_parser.add_argument("--post", type=Path, required=True, help="JSON файл с обновлением или списком обновлений")
+    arg_parser.add_argument("--url", default=default_url, help=f"Адрес webhook (по умолчанию {default_url})")
+    arg_parser.add_argument("--secret", default=settings.WEBHOOK_SECRET, help="Секретный токен")
+    args = arg_parser.parse_args()
+
+    sys.exit(asyncio.run(post_update(args.post, args.url, args.secret)))
+
+
+if __name__ == "__main__":
+    main()
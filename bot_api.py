@@ -8,6 +8,7 @@ import asyncio
 import json
 from typing import Dict, List, Any, Optional
 from production_daft_parser import ProductionDaftParser
+from utils.rendering import render_property_message
 
 class DaftParserAPI:
     """API класс для интеграции с ботом"""
@@ -168,25 +169,7 @@ class DaftParserAPI:
     
     def format_property_for_message(self, property_data: Dict[str, Any], include_url: bool = True) -> str:
         """Форматирует одно объявление для сообщения бота"""
-        title = property_data.get('title', 'Без названия')
-        price = property_data.get('price_formatted', 'Цена не указана')
-        bedrooms = property_data.get('bedrooms_formatted', 'Спальни не указаны')
-        location = property_data.get('location', 'Локация не указана')
-        
-        message_parts = [
-            f"🏠 {title}",
-            f"💰 {price}",
-            f"🛏️ {bedrooms}",
-            f"📍 {location}"
-        ]
-        
-        if property_data.get('ber_rating'):
-            message_parts.append(f"⚡ BER: {property_data['ber_rating']}")
-        
-        if include_url and property_data.get('url'):
-            message_parts.append(f"🔗 {property_data['url']}")
-        
-        return "\n".join(message_parts)
+        return render_property_message(property_data, fmt="plain", include_link=include_url)
     
     def format_multiple_properties_for_message(
         self, 
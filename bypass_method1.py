@@ -7,10 +7,11 @@ import aiohttp
 import random
 import json
 from typing import List, Dict, Optional
-from bs4 import BeautifulSoup
 import logging
 import time
 
+from utils.html_parsing import make_soup
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -184,7 +185,7 @@ class AdvancedDaftParser:
     
     async def parse_properties_from_html(self, html: str) -> List[Dict]:
         """Парсинг объявлений из HTML с множественными стратегиями"""
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = make_soup(html)
         properties = []
         
         logger.info("Parsing HTML for property listings...")
@@ -318,8 +318,8 @@ class MobileDaftParser:
     
     def parse_mobile_html(self, html: str) -> List[Dict]:
         """Парсинг мобильного HTML"""
-        from bs4 import BeautifulSoup
-        soup = BeautifulSoup(html, 'html.parser')
+        from utils.html_parsing import make_soup
+        soup = make_soup(html)
         properties = []
         
         # Мобильные селекторы
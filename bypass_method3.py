@@ -276,8 +276,9 @@ class ProxyDaftParser:
     
     def parse_html_for_properties(self, html: str) -> List[Dict]:
         """Упрощенный парсинг HTML"""
-        from bs4 import BeautifulSoup
-        soup = BeautifulSoup(html, 'html.parser')
+        from utils.html_parsing import LINKS_AND_SCRIPTS, make_soup
+        # Нужны только ссылки и скрипты - остальные теги не разбираем
+        soup = make_soup(html, LINKS_AND_SCRIPTS)
         properties = []
         
         # Ищем любые ссылки на объявления
@@ -8,9 +8,10 @@ import json
 import random
 from typing import List, Dict, Optional
 import logging
-from bs4 import BeautifulSoup
 import re
 
+from utils.html_parsing import make_soup
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -235,7 +236,7 @@ class AlternativeDaftParser:
     def extract_property_from_page(self, content: str, url: str) -> Optional[Dict]:
         """Извлечение информации об объявлении со страницы"""
         try:
-            soup = BeautifulSoup(content, 'html.parser')
+            soup = make_soup(content)
             
             # Ищем заголовок
             title_selectors = ['h1', '.property-title', '[data-testid*="title"]', 'title']
@@ -286,7 +287,7 @@ class AlternativeDaftParser:
     
     def parse_content_for_properties(self, content: str, source: str) -> List[Dict]:
         """Парсинг контента для поиска объявлений"""
-        soup = BeautifulSoup(content, 'html.parser')
+        soup = make_soup(content)
         properties = []
         
         # Стратегия 1: JSON в скриптах
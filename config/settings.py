@@ -2,22 +2,62 @@ import os
 from typing import List
 from dotenv import load_dotenv
 
-# Загружаем переменные окружения из .env файла
-load_dotenv(override=True)
+# Загружаем переменные окружения из .env файла; уже заданные в окружении
+# процесса (запуск из systemd/docker, бенчмарки) имеют приоритет
+load_dotenv()
 
 class Settings:
     # Telegram настройки
     TELEGRAM_BOT_TOKEN: str = os.getenv("TELEGRAM_BOT_TOKEN", "")
     CHAT_ID: str = os.getenv("CHAT_ID", "")
     ADMIN_USER_ID: int = int(os.getenv("ADMIN_USER_ID", "0"))
+    TELEGRAM_API_URL: str = os.getenv("TELEGRAM_API_URL", "")  # пусто - api.telegram.org
+    
+    # Режим получения обновлений: polling или webhook
+    BOT_MODE: str = os.getenv("BOT_MODE", "polling").lower()
+    WEBHOOK_HOST: str = os.getenv("WEBHOOK_HOST", "")  # Публичный адрес, например https://bot.example.com
+    WEBHOOK_PATH: str = os.getenv("WEBHOOK_PATH", "/webhook")
+    WEBHOOK_SECRET: str = os.getenv("WEBHOOK_SECRET", "")
+    WEBHOOK_LISTEN: str = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+    WEBHOOK_PORT: int = int(os.getenv("WEBHOOK_PORT", "8000"))
+    
+    # Ограничения параллельной обработки
+    MAX_CONCURRENT_UPDATES: int = int(os.getenv("MAX_CONCURRENT_UPDATES", "32"))  # одновременно обрабатываемых апдейтов
+    MAX_PENDING_UPDATES: int = int(os.getenv("MAX_PENDING_UPDATES", "256"))  # задач апдейтов (в работе и в ожидании)
+    MAX_BACKGROUND_JOBS: int = int(os.getenv("MAX_BACKGROUND_JOBS", "3"))  # одновременных фоновых поисков
+    MAX_JOBS_PER_USER: int = int(os.getenv("MAX_JOBS_PER_USER", "1"))  # задач в работе на пользователя
+    
+    # Отправка сообщений: пауза между сообщениями одного чата и повторы после 429
+    MESSAGE_INTERVAL: float = float(os.getenv("MESSAGE_INTERVAL", "1.5"))  # секунды
+    SEND_RETRY_ATTEMPTS: int = int(os.getenv("SEND_RETRY_ATTEMPTS", "3"))
     
     # База данных
     DB_PATH: str = os.getenv("DB_PATH", "./data/daftbot.db")
     
+    # FSM состояния (SQLite)
+    FSM_STATE_TTL: int = int(os.getenv("FSM_STATE_TTL", "86400"))  # секунды, 0 - без ограничения
+    FSM_FLUSH_INTERVAL: float = float(os.getenv("FSM_FLUSH_INTERVAL", "2.0"))  # период пакетной записи
+    
     # Парсер настройки
     UPDATE_INTERVAL: int = int(os.getenv("UPDATE_INTERVAL", "120"))  # секунды
     MAX_CONCURRENT_REQUESTS: int = 5
     REQUEST_DELAY: float = 1.0  # секунды между запросами
+    PARSE_EXECUTOR: str = os.getenv("PARSE_EXECUTOR", "process").lower()  # process, thread или none
+    PARSE_WORKERS: int = int(os.getenv("PARSE_WORKERS", "2"))  # воркеров пула разбора HTML
+    # Мониторинг: сначала новые, уже увиденные пользователем объявления не загружаются
+    INCREMENTAL_MONITORING: bool = os.getenv("INCREMENTAL_MONITORING", "true").lower() == "true"
+    
+    # Общий браузер Playwright для парсеров бота
+    BROWSER_POOL_SIZE: int = int(os.getenv("BROWSER_POOL_SIZE", "1"))  # процессов Chromium
+    BROWSER_MAX_CONTEXTS: int = int(os.getenv("BROWSER_MAX_CONTEXTS", "4"))  # одновременных поисков в браузере
+    BROWSER_WARMUP: bool = os.getenv("BROWSER_WARMUP", "false").lower() == "true"  # поднять браузер при старте
+    BROWSER_WARMUP_URL: str = os.getenv("BROWSER_WARMUP_URL", "https://www.daft.ie")
+    BROWSER_HEALTH_INTERVAL: float = float(os.getenv("BROWSER_HEALTH_INTERVAL", "60"))  # секунды между проверками
+    BROWSER_IDLE_TIMEOUT: float = float(os.getenv("BROWSER_IDLE_TIMEOUT", "900"))  # закрыть без поисков, 0 - никогда
+    BROWSER_CONTEXT_MAX_PAGES: int = int(os.getenv("BROWSER_CONTEXT_MAX_PAGES", "100"))  # страниц до пересоздания контекста
+    BROWSER_RECYCLE_RSS_MB: float = float(os.getenv("BROWSER_RECYCLE_RSS_MB", "400"))  # пересоздавать контексты выше, 0 - нет
+    BROWSER_MAX_RSS_MB: float = float(os.getenv("BROWSER_MAX_RSS_MB", "600"))  # перезапуск браузера выше, 0 - нет
+    BROWSER_DRAIN_TIMEOUT: float = float(os.getenv("BROWSER_DRAIN_TIMEOUT", "120"))  # ожидание поисков перед перезапуском
     
     # Фильтры по умолчанию
     DEFAULT_CITY: str = "Dublin"
@@ -29,8 +69,26 @@ class Settings:
     BASE_URL: str = "https://www.daft.ie"
     SEARCH_URL: str = "https://www.daft.ie/property-for-rent"
     
+    # Мониторинг event loop и метрики
+    LOOP_LAG_INTERVAL: float = float(os.getenv("LOOP_LAG_INTERVAL", "0.5"))  # секунды между замерами
+    SLOW_CALLBACK_MS: float = float(os.getenv("SLOW_CALLBACK_MS", "100"))  # порог зависания
+    LOOP_DEBUG: bool = os.getenv("LOOP_DEBUG", "false").lower() == "true"  # отчеты asyncio о медленных колбэках
+    METRICS_HOST: str = os.getenv("METRICS_HOST", "127.0.0.1")
+    METRICS_PORT: int = int(os.getenv("METRICS_PORT", "9108"))  # 0 - без endpoint /metrics
+    
+    # Профилирование циклов мониторинга (/profile N у администратора)
+    PROFILE_CYCLES: int = int(os.getenv("PROFILE_CYCLES", "0"))  # профилировать первые N циклов после старта
+    PROFILE_BACKEND: str = os.getenv("PROFILE_BACKEND", "auto").lower()  # auto, pyinstrument или cprofile
+    PROFILE_DIR: str = os.getenv("PROFILE_DIR", "logs/profiles")
+    PROFILE_MAX_FILES: int = int(os.getenv("PROFILE_MAX_FILES", "20"))
+    PROFILE_MAX_MB: float = float(os.getenv("PROFILE_MAX_MB", "50"))
+    
     # Логирование
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FILE: str = os.getenv("LOG_FILE", "logs/enhanced_bot.log")  # пусто - только консоль
+    LOG_JSON: bool = os.getenv("LOG_JSON", "true").lower() == "true"  # JSON-строки в файле
+    # Уровни отдельных модулей: "parser=DEBUG,aiogram.event=WARNING"
+    LOG_MODULE_LEVELS: str = os.getenv("LOG_MODULE_LEVELS", "aiogram.event=WARNING")
     LOG_FORMAT: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     
     # User Agent для парсера
@@ -6,6 +6,7 @@ CLI интерфейс для продакшн парсера daft.ie
 import argparse
 import asyncio
 import sys
+from pathlib import Path
 from production_daft_parser import ProductionDaftParser
 
 def create_parser():
@@ -17,6 +18,8 @@ def create_parser():
 Примеры использования:
   python daft_cli.py --min-bedrooms 3 --max-price 2500 --location dublin
   python daft_cli.py --min-bedrooms 2 --max-price 3000 --location cork --max-pages 5
+  python daft_cli.py --incremental --max-pages 5
+  python daft_cli.py --incremental --seen-db data/daftbot.db
   python daft_cli.py --help
         """
     )
@@ -56,6 +59,18 @@ def create_parser():
         help='Максимальное количество страниц для обхода (по умолчанию: 5)'
     )
     
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Сначала новые, обход до первой страницы с уже известными объявлениями'
+    )
+    
+    parser.add_argument(
+        '--seen-db',
+        type=str,
+        help='База бота: объявления из property_history считаются известными (с --incremental)'
+    )
+    
     parser.add_argument(
         '--log-level',
         choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
@@ -84,6 +99,16 @@ async def main():
     # Создаем парсер
     daft_parser = ProductionDaftParser(log_level=args.log_level)
     
+    # Объявления, уже найденные ботом для любого пользователя, не разбираются повторно
+    if args.incremental and args.seen_db:
+        if Path(args.seen_db).exists():
+            from database.database import EnhancedDatabase
+            seen_urls = await EnhancedDatabase(args.seen_db, result_cache_spill=False).get_seen_property_urls()
+            daft_parser.seed_known_ids(seen_urls)
+            print(f"📚 Известных объявлений из базы: {len(seen_urls)}")
+        else:
+            print(f"⚠️ База {args.seen_db} не найдена, известные объявления не загружены")
+    
     # Выводим параметры поиска
     print(f"🎯 ПАРАМЕТРЫ ПОИСКА:")
     print(f"   Минимум спален: {args.min_bedrooms}")
@@ -101,7 +126,8 @@ async def main():
             max_price=args.max_price,
             location=args.location,
             property_type=args.property_type,
-            max_pages=args.max_pages
+            max_pages=args.max_pages,
+            incremental=args.incremental
         )
         
         # Выводим результаты
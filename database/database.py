@@ -5,17 +5,29 @@
 
 import aiosqlite
 import json
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set
 from datetime import datetime, timedelta
 import logging
 
+from database.result_cache import SearchResultCache
+from utils.metrics import DB_QUERY_SECONDS, timed_methods
+from utils.phase_timer import summarize_phases
+
 logger = logging.getLogger(__name__)
 
+@timed_methods(DB_QUERY_SECONDS)
 class EnhancedDatabase:
     """Класс для работы с базой данных пользователей и поиска"""
     
-    def __init__(self, db_path: str = "data/enhanced_bot.db"):
+    def __init__(self, db_path: str = "data/enhanced_bot.db", result_cache_ttl: int = 3600,
+                 result_cache_max_items: int = 5000, result_cache_spill: bool = True):
         self.db_path = db_path
+        # Кэш результатов по пользователю и параметрам поиска, вытесненное уходит в SQLite
+        self.result_cache = SearchResultCache(
+            ttl=result_cache_ttl,
+            max_items=result_cache_max_items,
+            spill_db_path=db_path if result_cache_spill else None
+        )
     
     async def init_database(self):
         """Инициализация базы данных с созданием таблиц"""
@@ -79,11 +91,20 @@ class EnhancedDatabase:
                     execution_time REAL,  -- время выполнения в секундах
                     status TEXT DEFAULT 'success',  -- success, error
                     error_message TEXT,
+                    phase_timings TEXT,  -- JSON: секунды по фазам цикла
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY (user_id) REFERENCES users (user_id)
                 )
             """)
             
+            # Миграция: разбивка времени цикла по фазам
+            try:
+                await db.execute("ALTER TABLE monitoring_logs ADD COLUMN phase_timings TEXT")
+                logger.info("Добавлено поле phase_timings в таблицу monitoring_logs")
+            except Exception:
+                # Поле уже существует
+                pass
+            
             await db.commit()
             logger.info("База данных инициализирована")
     
@@ -240,6 +261,18 @@ class EnhancedDatabase:
         
         return new_properties
     
+    async def get_seen_property_urls(self, user_id: Optional[int] = None) -> Set[str]:
+        """URL объявлений из истории пользователя (user_id=None - всех пользователей)"""
+        query = "SELECT DISTINCT property_url FROM property_history"
+        params = ()
+        if user_id is not None:
+            query += " WHERE user_id = ?"
+            params = (user_id,)
+        
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(query, params) as cursor:
+                return {row[0] for row in await cursor.fetchall()}
+    
     async def mark_properties_as_sent(self, user_id: int, property_urls: List[str]):
         """Отмечает объявления как отправленные"""
         if not property_urls:
@@ -259,14 +292,15 @@ class EnhancedDatabase:
     async def log_monitoring_session(self, user_id: int, search_params: Dict[str, Any],
                                    properties_found: int, new_properties: int,
                                    execution_time: float, status: str = "success",
-                                   error_message: str = None):
-        """Логирует сессию мониторинга"""
+                                   error_message: str = None,
+                                   phase_timings: Optional[Dict[str, float]] = None):
+        """Логирует сессию мониторинга (phase_timings - секунды по фазам цикла)"""
         async with aiosqlite.connect(self.db_path) as db:
             await db.execute("""
                 INSERT INTO monitoring_logs 
                 (user_id, search_params, properties_found, new_properties, 
-                 execution_time, status, error_message)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
+                 execution_time, status, error_message, phase_timings)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             """, (
                 user_id,
                 json.dumps(search_params),
@@ -274,7 +308,8 @@ class EnhancedDatabase:
                 new_properties,
                 execution_time,
                 status,
-                error_message
+                error_message,
+                json.dumps(phase_timings, separators=(',', ':')) if phase_timings else None
             ))
             await db.commit()
     
@@ -306,6 +341,13 @@ class EnhancedDatabase:
             """, (user_id, since_date)) as cursor:
                 monitoring_stats = await cursor.fetchone()
             
+            # Разбивка по фазам: среднее и p95
+            async with db.execute("""
+                SELECT phase_timings FROM monitoring_logs
+                WHERE user_id = ? AND created_at >= ? AND phase_timings IS NOT NULL
+            """, (user_id, since_date)) as cursor:
+                phase_rows = [json.loads(row[0]) for row in await cursor.fetchall()]
+            
             return {
                 "days": days,
                 "properties": {
@@ -319,7 +361,8 @@ class EnhancedDatabase:
                     "total_sessions": monitoring_stats[0] or 0,
                     "successful_sessions": monitoring_stats[1] or 0,
                     "avg_execution_time": round(monitoring_stats[2] or 0, 2),
-                    "total_new_properties": monitoring_stats[3] or 0
+                    "total_new_properties": monitoring_stats[3] or 0,
+                    "phases": summarize_phases(phase_rows)
                 }
             }
     
@@ -342,27 +385,24 @@ class EnhancedDatabase:
             
             await db.commit()
             logger.info(f"Очищены данные старше {days} дней")
+        
+        await self.result_cache.cleanup_expired()
 
     def get_user_recent_searches(self, user_id: int, limit: int = 5):
         """Получает недавние поиски пользователя"""
         # Заглушка - возвращаем пустой список пока не реализован
         return []
 
-    async def cache_search_results(self, user_id: int, results: List[Dict[str, Any]]):
-        """Кэширует результаты поиска для последующего показа"""
-        # Простой кэш в памяти (в реальном проекте лучше использовать Redis)
-        if not hasattr(self, '_search_cache'):
-            self._search_cache = {}
-        
-        self._search_cache[user_id] = results
+    async def cache_search_results(self, user_id: int, results: List[Dict[str, Any]],
+                                   search_params: Dict[str, Any] = None):
+        """Кэширует результаты поиска пользователя для последующего показа"""
+        await self.result_cache.put(user_id, results, search_params)
         logger.info(f"Кэшированы результаты поиска для пользователя {user_id}: {len(results)} объявлений")
 
-    async def get_cached_search_results(self, user_id: int) -> List[Dict[str, Any]]:
-        """Получает кэшированные результаты поиска"""
-        if not hasattr(self, '_search_cache'):
-            return []
-        
-        return self._search_cache.get(user_id, [])
+    async def get_cached_search_results(self, user_id: int, search_params: Dict[str, Any] = None,
+                                        offset: int = 0, limit: int = None) -> List[Dict[str, Any]]:
+        """Получает кэшированные результаты поиска (по умолчанию - последнего поиска пользователя)"""
+        return await self.result_cache.get(user_id, search_params, offset=offset, limit=limit)
 
     async def get_user_properties_count(self, user_id: int) -> int:
         """Получает общее количество найденных объявлений для пользователя"""
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Хранилище FSM состояний aiogram в SQLite
+
+Использует тот же файл базы данных, что и бот. Состояния переживают
+перезапуск, устаревшие записи удаляются по TTL, а запись в базу
+выполняется пачками фоновой задачей (write-back кэш).
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import aiosqlite
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+logger = logging.getLogger(__name__)
+
+# Запись кэша: (состояние, данные, время последнего изменения)
+_Entry = Tuple[Optional[str], Dict[str, Any], float]
+
+
+class SQLiteStorage(BaseStorage):
+    """FSM хранилище с write-back кэшем поверх SQLite"""
+
+    def __init__(self, db_path: str = "data/enhanced_bot.db", state_ttl: int = 86400,
+                 flush_interval: float = 2.0, max_cached: int = 1000):
+        self.db_path = db_path
+        self.state_ttl = state_ttl
+        self.flush_interval = flush_interval
+        self.max_cached = max_cached
+
+        self._cache: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._dirty: set = set()
+        self._db: Optional[aiosqlite.Connection] = None
+        self._lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._last_cleanup = 0.0
+
+    # === ИНТЕРФЕЙС BaseStorage ===
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        """Устанавливает состояние"""
+        cache_key = self._make_key(key)
+        _, data, _ = await self._get_entry(cache_key)
+        state_name = state.state if isinstance(state, State) else state
+        self._put(cache_key, (state_name, data, time.time()))
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        """Возвращает состояние"""
+        state, _, _ = await self._get_entry(self._make_key(key))
+        return state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        """Устанавливает данные"""
+        cache_key = self._make_key(key)
+        state, _, _ = await self._get_entry(cache_key)
+        self._put(cache_key, (state, data.copy(), time.time()))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        """Возвращает данные"""
+        _, data, _ = await self._get_entry(self._make_key(key))
+        return data.copy()
+
+    async def close(self) -> None:
+        """Сбрасывает несохраненные изменения и закрывает соединение"""
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        self._flush_task = None
+
+        await self.flush()
+
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+    # === ВНУТРЕННИЕ МЕТОДЫ ===
+
+    @staticmethod
+    def _make_key(key: StorageKey) -> str:
+        """Строковый ключ записи"""
+        return f"{key.bot_id}:{key.chat_id}:{key.user_id}:{key.thread_id or ''}:{key.destiny}"
+
+    async def _connect(self) -> aiosqlite.Connection:
+        """Открывает соединение и создает таблицу при первом обращении"""
+        if self._db is None:
+            self._db = await aiosqlite.connect(self.db_path)
+            await self._db.execute("""
+                CREATE TABLE IF NOT EXISTS fsm_states (
+                    key TEXT PRIMARY KEY,
+                    state TEXT,
+                    data TEXT,
+                    updated_at REAL
+                )
+            """)
+            await self._db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_fsm_states_updated_at ON fsm_states(updated_at)"
+            )
+            await self._db.commit()
+        return self._db
+
+    def _is_expired(self, updated_at: float) -> bool:
+        """Проверяет, устарела ли запись"""
+        return self.state_ttl > 0 and time.time() - updated_at > self.state_ttl
+
+    async def _get_entry(self, cache_key: str) -> _Entry:
+        """Возвращает запись из кэша или базы"""
+        entry = self._cache.get(cache_key)
+
+        if entry is None:
+            async with self._lock:
+                db = await self._connect()
+                async with db.execute(
+                    "SELECT state, data, updated_at FROM fsm_states WHERE key = ?", (cache_key,)
+                ) as cursor:
+                    row = await cursor.fetchone()
+            # Пока шло чтение, set_state/set_data или другое чтение могли
+            # записать ключ в кэш - эта запись новее прочитанной из базы
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                entry = cached
+                self._cache.move_to_end(cache_key)
+            else:
+                if row:
+                    entry = (row[0], json.loads(row[1]) if row[1] else {}, row[2])
+                else:
+                    entry = (None, {}, time.time())
+                self._cache[cache_key] = entry
+                self._evict_clean()
+        else:
+            self._cache.move_to_end(cache_key)
+
+        if self._is_expired(entry[2]):
+            # Состояние устарело - сбрасываем как будто его не было
+            entry = (None, {}, time.time())
+            self._put(cache_key, entry)
+
+        return entry
+
+    def _put(self, cache_key: str, entry: _Entry):
+        """Записывает в кэш и помечает ключ для сохранения"""
+        self._cache[cache_key] = entry
+        self._cache.move_to_end(cache_key)
+        self._dirty.add(cache_key)
+        self._ensure_flush_task()
+
+    def _evict_clean(self):
+        """Вытесняет сохраненные записи сверх лимита кэша"""
+        if len(self._cache) <= self.max_cached:
+            return
+        for cache_key in list(self._cache.keys()):
+            if len(self._cache) <= self.max_cached:
+                break
+            if cache_key not in self._dirty:
+                del self._cache[cache_key]
+
+    def _ensure_flush_task(self):
+        """Запускает фоновую задачу записи при первой модификации"""
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        """Периодически сохраняет изменения пачкой"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                if time.time() - self._last_cleanup > min(self.state_ttl, 3600):
+                    await self.cleanup_expired()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка сохранения FSM состояний: {e}")
+
+    async def flush(self):
+        """Сохраняет все измененные записи одной транзакцией"""
+        if not self._dirty:
+            return
+
+        dirty, self._dirty = self._dirty, set()
+        upserts = []
+        deletes = []
+        for cache_key in dirty:
+            entry = self._cache.get(cache_key)
+            if entry is None:
+                continue
+            state, data, updated_at = entry
+            if state is None and not data:
+                deletes.append((cache_key,))
+            else:
+                upserts.append((cache_key, state, json.dumps(data, ensure_ascii=False), updated_at))
+
+        try:
+            async with self._lock:
+                db = await self._connect()
+                if upserts:
+                    await db.executemany("""
+                        INSERT INTO fsm_states (key, state, data, updated_at) VALUES (?, ?, ?, ?)
+                        ON CONFLICT(key) DO UPDATE SET
+                            state = excluded.state, data = excluded.data, updated_at = excluded.updated_at
+                    """, upserts)
+                if deletes:
+                    await db.executemany("DELETE FROM fsm_states WHERE key = ?", deletes)
+                await db.commit()
+        except Exception:
+            # Не теряем изменения - попробуем при следующем сбросе
+            self._dirty |= dirty
+            raise
+
+        self._evict_clean()
+        logger.debug(f"FSM: сохранено {len(upserts)}, удалено {len(deletes)} записей")
+
+    async def cleanup_expired(self) -> int:
+        """Удаляет устаревшие состояния из базы и кэша"""
+        self._last_cleanup = time.time()
+        if self.state_ttl <= 0:
+            return 0
+
+        cutoff = time.time() - self.state_ttl
+        for cache_key, entry in list(self._cache.items()):
+            if entry[2] < cutoff and cache_key not in self._dirty:
+                del self._cache[cache_key]
+
+        async with self._lock:
+            db = await self._connect()
+            cursor = await db.execute("DELETE FROM fsm_states WHERE updated_at < ?", (cutoff,))
+            await db.commit()
+            removed = cursor.rowcount
+
+        if removed:
+            logger.info(f"FSM: удалено {removed} устаревших состояний")
+        return removed
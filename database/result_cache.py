@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Кэш результатов поиска по пользователю и параметрам поиска
+
+Ключ - (user_id, отпечаток параметров поиска). Записи живут ttl секунд,
+общий объем в памяти ограничен количеством объявлений, при превышении
+вытесняются давно не используемые записи (LRU). Вытесненные записи
+можно сохранять в SQLite, чтобы "Показать все" не требовал повторного
+парсинга.
+"""
+
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiosqlite
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[int, str]
+
+
+def search_fingerprint(search_params: Optional[Dict[str, Any]]) -> str:
+    """Стабильный отпечаток параметров поиска"""
+    if not search_params:
+        return "default"
+    normalized = dict(search_params)
+    if isinstance(normalized.get("regions"), list):
+        normalized["regions"] = sorted(normalized["regions"])
+    payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class SearchResultCache:
+    """LRU кэш результатов поиска с TTL и сбросом на диск"""
+
+    def __init__(self, ttl: int = 3600, max_items: int = 5000, spill_db_path: Optional[str] = None):
+        self.ttl = ttl
+        self.max_items = max_items
+        self.spill_db_path = spill_db_path
+
+        # key -> (время сохранения, результаты)
+        self._entries: "OrderedDict[CacheKey, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._items = 0
+        # Последний поиск пользователя - для "Показать все" без параметров
+        self._latest: Dict[int, str] = {}
+        self._table_ready = False
+
+        self.hits = 0
+        self.misses = 0
+        self.spilled = 0
+        metrics.track_cache("search_results", self)
+
+    async def put(self, user_id: int, results: List[Dict[str, Any]],
+                  search_params: Optional[Dict[str, Any]] = None):
+        """Сохраняет результаты поиска пользователя"""
+        fingerprint = search_fingerprint(search_params)
+        key = (user_id, fingerprint)
+
+        self._remove(key)
+        self._entries[key] = (time.time(), list(results))
+        self._items += len(results)
+        self._latest[user_id] = fingerprint
+
+        await self._enforce_limits()
+
+    async def get(self, user_id: int, search_params: Optional[Dict[str, Any]] = None,
+                  offset: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Возвращает результаты (или их страницу); без параметров - последний поиск"""
+        if search_params is None:
+            fingerprint = self._latest.get(user_id)
+            if fingerprint is None:
+                fingerprint = await self._latest_from_disk(user_id)
+                if fingerprint is None:
+                    self.misses += 1
+                    return []
+        else:
+            fingerprint = search_fingerprint(search_params)
+
+        key = (user_id, fingerprint)
+        entry = self._entries.get(key)
+
+        if entry is not None and self._is_expired(entry[0]):
+            self._remove(key)
+            entry = None
+
+        if entry is None:
+            entry = await self._load_from_disk(key)
+            if entry is None:
+                self.misses += 1
+                return []
+            # Поднимаем запись обратно в память
+            self._entries[key] = entry
+            self._items += len(entry[1])
+            await self._enforce_limits()
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+
+        results = entry[1]
+        end = None if limit is None else offset + limit
+        return results[offset:end]
+
+    def stats(self) -> Dict[str, int]:
+        """Статистика кэша"""
+        return {
+            "entries": len(self._entries),
+            "items": self._items,
+            "hits": self.hits,
+            "misses": self.misses,
+            "spilled": self.spilled,
+        }
+
+    # === ВНУТРЕННИЕ МЕТОДЫ ===
+
+    def _is_expired(self, stored_at: float) -> bool:
+        return time.time() - stored_at > self.ttl
+
+    def _remove(self, key: CacheKey):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._items -= len(entry[1])
+
+    async def _enforce_limits(self):
+        """Вытесняет старые записи при превышении лимита объявлений"""
+        now = time.time()
+        for key in [k for k, (stored_at, _) in self._entries.items() if now - stored_at > self.ttl]:
+            self._remove(key)
+
+        # Последняя запись остается даже если она одна больше лимита
+        while self._items > self.max_items and len(self._entries) > 1:
+            key, (stored_at, results) = self._entries.popitem(last=False)
+            self._items -= len(results)
+            await self._spill(key, stored_at, results)
+
+    async def _ensure_table(self, db: aiosqlite.Connection):
+        if self._table_ready:
+            return
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS search_result_cache (
+                user_id INTEGER,
+                fingerprint TEXT,
+                results TEXT,  -- JSON список объявлений
+                stored_at REAL,
+                PRIMARY KEY (user_id, fingerprint)
+            )
+        """)
+        self._table_ready = True
+
+    async def _spill(self, key: CacheKey, stored_at: float, results: List[Dict[str, Any]]):
+        """Сохраняет вытесненную запись в SQLite"""
+        if not self.spill_db_path:
+            return
+        try:
+            async with aiosqlite.connect(self.spill_db_path) as db:
+                await self._ensure_table(db)
+                await db.execute("""
+                    INSERT OR REPLACE INTO search_result_cache (user_id, fingerprint, results, stored_at)
+                    VALUES (?, ?, ?, ?)
+                """, (key[0], key[1], json.dumps(results, ensure_ascii=False, default=str), stored_at))
+                await db.commit()
+            self.spilled += 1
+        except Exception as e:
+            logger.error(f"Ошибка сохранения кэша результатов на диск: {e}")
+
+    async def _load_from_disk(self, key: CacheKey) -> Optional[Tuple[float, List[Dict[str, Any]]]]:
+        """Загружает запись из SQLite, если она еще не устарела"""
+        if not self.spill_db_path:
+            return None
+        try:
+            async with aiosqlite.connect(self.spill_db_path) as db:
+                await self._ensure_table(db)
+                async with db.execute(
+                    "SELECT results, stored_at FROM search_result_cache WHERE user_id = ? AND fingerprint = ?",
+                    key
+                ) as cursor:
+                    row = await cursor.fetchone()
+        except Exception as e:
+            logger.error(f"Ошибка чтения кэша результатов с диска: {e}")
+            return None
+
+        if not row or self._is_expired(row[1]):
+            return None
+        return row[1], json.loads(row[0])
+
+    async def _latest_from_disk(self, user_id: int) -> Optional[str]:
+        """Находит последний сохраненный на диск поиск пользователя"""
+        if not self.spill_db_path:
+            return None
+        try:
+            async with aiosqlite.connect(self.spill_db_path) as db:
+                await self._ensure_table(db)
+                async with db.execute(
+                    "SELECT fingerprint FROM search_result_cache WHERE user_id = ? AND stored_at >= ? "
+                    "ORDER BY stored_at DESC LIMIT 1",
+                    (user_id, time.time() - self.ttl)
+                ) as cursor:
+                    row = await cursor.fetchone()
+        except Exception as e:
+            logger.error(f"Ошибка чтения кэша результатов с диска: {e}")
+            return None
+        return row[0] if row else None
+
+    async def cleanup_expired(self):
+        """Удаляет устаревшие записи из памяти и с диска"""
+        await self._enforce_limits()
+        if not self.spill_db_path:
+            return
+        async with aiosqlite.connect(self.spill_db_path) as db:
+            await self._ensure_table(db)
+            await db.execute(
+                "DELETE FROM search_result_cache WHERE stored_at < ?", (time.time() - self.ttl,)
+            )
+            await db.commit()
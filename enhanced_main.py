@@ -12,21 +12,21 @@ from pathlib import Path
 # Добавляем текущую директорию в PYTHONPATH
 sys.path.insert(0, str(Path(__file__).parent))
 
-from dotenv import load_dotenv
 from bot.enhanced_bot import EnhancedPropertyBot
 from bot.enhanced_bot_handlers import EnhancedPropertyBotHandlers
+from config.settings import settings
+from utils.logging_setup import setup_logging
+from utils.loop_monitor import loop_monitor
+from utils.metrics import metrics
+from utils.metrics_server import add_collector, start_metrics_server
 
-# Загружаем переменные окружения
-load_dotenv()
-
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/enhanced_bot.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
+# Настройка логирования (запись в файл - в отдельном потоке)
+setup_logging(
+    level=settings.LOG_LEVEL,
+    log_file=settings.LOG_FILE,
+    json_lines=settings.LOG_JSON,
+    module_levels=settings.LOG_MODULE_LEVELS,
+    text_format=settings.LOG_FORMAT,
 )
 logger = logging.getLogger(__name__)
 
@@ -153,6 +153,12 @@ async def main():
     
     logger.info("🚀 Запуск улучшенного бота мониторинга недвижимости")
     
+    # Инструментирование event loop и метрики подсистем на /metrics
+    loop_monitor.start(debug=settings.LOOP_DEBUG)
+    add_collector(loop_monitor.render_metrics)
+    add_collector(metrics.render)
+    metrics_runner = await start_metrics_server()
+    
     # Создаем и запускаем бота
     bot = CombinedBot(bot_token)
     
@@ -164,6 +170,9 @@ async def main():
         logger.error(f"❌ Критическая ошибка: {e}")
     finally:
         await bot.stop_bot()
+        await loop_monitor.stop()
+        if metrics_runner:
+            await metrics_runner.cleanup()
         logger.info("🛑 Бот остановлен")
 
 
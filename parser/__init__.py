@@ -1,8 +1,16 @@
 #!/usr/bin/env python3
 """
 Парсеры для Daft.ie
+
+ProductionDaftParser импортируется при первом обращении: вместе с ним
+загружается Playwright, а подмодулям (offload, extractor) он не нужен.
 """
 
-from .production_parser import ProductionDaftParser
+__all__ = ['ProductionDaftParser']
+
 
-__all__ = ['ProductionDaftParser']
\ No newline at end of file
+def __getattr__(name):
+    if name == 'ProductionDaftParser':
+        from .production_parser import ProductionDaftParser
+        return ProductionDaftParser
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""
+Общий браузер Playwright для парсеров бота
+
+Раньше каждый поиск запускал и закрывал свой Chromium: секунды на старт
+браузера добавлялись к каждому поиску. Пул держит BROWSER_POOL_SIZE
+браузеров; поиск получает в одном из них контекст (cookies и HTTP-кеш
+сохраняются между поисками) и новую страницу. Одновременно выдано не
+больше BROWSER_MAX_CONTEXTS контекстов.
+
+Playwright импортируется при первом обращении к пулу (в отдельном потоке),
+так что старт бота от него не зависит. С BROWSER_WARMUP=true бот запускает
+warmup() в фоне параллельно с polling: браузеры стартуют, загружаются
+about:blank и BROWSER_WARMUP_URL (DNS, TLS, HTTP-кеш).
+
+Раз в BROWSER_HEALTH_INTERVAL секунд каждый браузер проверяется: подключен
+ли он и отвечает ли новая страница на evaluate(). Упавший или зависший
+браузер заменяется новым, контексты, оставшиеся от прерванных поисков,
+закрываются. После BROWSER_IDLE_TIMEOUT секунд без поисков браузеры
+закрываются и снова запускаются при следующем поиске.
+
+Долгоживущий Chromium со временем растет в памяти, поэтому пул следит за
+памятью дерева процессов каждого браузера (PSS через /proc, см.
+utils.process_memory) после поисков и при проверках здоровья:
+    контекст пересоздается после BROWSER_CONTEXT_MAX_PAGES загрузок страниц
+        или когда браузер занимает больше BROWSER_RECYCLE_RSS_MB
+    браузер перезапускается, когда занимает больше BROWSER_MAX_RSS_MB: новые
+        поиски ждут, пока текущие завершатся (не дольше BROWSER_DRAIN_TIMEOUT)
+Каждое пересоздание и перезапуск пишется в лог с причиной.
+"""
+
+import asyncio
+import importlib
+import logging
+import os
+import time
+from collections import Counter
+from contextlib import asynccontextmanager, suppress
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+from config.settings import settings
+from utils.metrics import BROWSER_EVENTS, BROWSER_MEMORY_BYTES
+from utils.process_memory import descendants, process_name, process_table, tree_memory_kb
+
+logger = logging.getLogger(__name__)
+
+CHROMIUM_ARGS = [
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-blink-features=AutomationControlled',
+    '--disable-background-timer-throttling',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-renderer-backgrounding',
+]
+
+DEFAULT_CONTEXT_OPTIONS: Dict[str, Any] = {
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
+    'viewport': {'width': 1920, 'height': 1080},
+    'extra_http_headers': {
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.5',
+        'Accept-Encoding': 'gzip, deflate',
+        'Connection': 'keep-alive',
+    },
+}
+
+# Лимиты времени (секунды)
+PROBE_TIMEOUT = 15
+CLOSE_TIMEOUT = 10
+WARMUP_TIMEOUT = 30
+# Не чаще одного замера памяти браузера за столько секунд
+MEMORY_CHECK_INTERVAL = 10
+# Шаг ожидания завершения поисков перед перезапуском браузера
+DRAIN_POLL = 0.5
+
+
+@dataclass
+class _BrowserSlot:
+    """Место в пуле: браузер и его контексты"""
+    index: int
+    browser: Any = None
+    # Корневой процесс Chromium (None - не удалось определить)
+    pid: Optional[int] = None
+    # Контексты пула: загружено страниц в каждом; выданные поискам и свободные
+    pages: Dict[Any, int] = field(default_factory=dict)
+    leased: Set[Any] = field(default_factory=set)
+    idle: List[Any] = field(default_factory=list)
+    # Контексты, которые создаются прямо сейчас (еще не в pages)
+    opening: int = 0
+    launched_at: float = 0.0
+    memory_kb: int = 0
+    memory_checked_at: float = 0.0
+    # Причина отложенного перезапуска и крайний срок ожидания поисков
+    restart_reason: Optional[str] = None
+    drain_deadline: float = 0.0
+
+    def reset(self):
+        self.browser = None
+        self.pid = None
+        self.pages = {}
+        self.leased = set()
+        self.idle = []
+        self.memory_kb = 0
+        self.memory_checked_at = 0.0
+        self.restart_reason = None
+
+    @property
+    def alive(self) -> bool:
+        return self.browser is not None and self.browser.is_connected()
+
+
+class BrowserPool:
+    """Долгоживущие браузеры Chromium с проверками здоровья"""
+
+    def __init__(self, size: int = 1, max_contexts: int = 4, health_interval: float = 60.0,
+                 idle_timeout: float = 900.0, headless: bool = True, context_max_pages: int = 100,
+                 recycle_rss_mb: float = 0, max_rss_mb: float = 0, drain_timeout: float = 120.0):
+        self.size = max(1, size)
+        self.max_contexts = max(1, max_contexts)
+        self.health_interval = health_interval
+        self.idle_timeout = idle_timeout
+        self.headless = headless
+        self.context_max_pages = context_max_pages
+        self.recycle_kb = int(recycle_rss_mb * 1024)
+        self.max_kb = int(max_rss_mb * 1024)
+        self.drain_timeout = drain_timeout
+
+        self._slots: List[_BrowserSlot] = [_BrowserSlot(index) for index in range(self.size)]
+        self._playwright = None
+        self._lock = asyncio.Lock()
+        self._contexts = asyncio.Semaphore(self.max_contexts)
+        self._health_task: Optional[asyncio.Task] = None
+        self.last_used = time.monotonic()
+        self.stats: Counter = Counter()
+
+    # === ЖИЗНЕННЫЙ ЦИКЛ ===
+
+    async def start(self):
+        """Запускает драйвер Playwright и проверки здоровья (браузеры - по требованию)"""
+        if self._playwright is not None and self._health_task is not None:
+            return
+        async with self._lock:
+            await self._ensure_playwright()
+            if self._health_task is None and self.health_interval > 0:
+                self._health_task = asyncio.create_task(self._health_loop())
+
+    async def warmup(self, url: Optional[str] = None):
+        """Запускает все браузеры и загружает about:blank и url"""
+        started = time.perf_counter()
+        try:
+            await self.start()
+            async with self._lock:
+                for slot in self._slots:
+                    if not slot.alive:
+                        await self._replace(slot, "прогрев")
+            async with self.page() as page:
+                await page.goto("about:blank")
+                if url:
+                    await page.goto(url, wait_until="domcontentloaded", timeout=WARMUP_TIMEOUT * 1000)
+            logger.info(f"🔥 Браузер прогрет за {time.perf_counter() - started:.1f} с")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Не страшно: браузер запустится при первом поиске
+            logger.warning(f"⚠️ Прогрев браузера не удался: {e}")
+
+    async def close(self):
+        """Закрывает браузеры и драйвер Playwright"""
+        if self._health_task is not None:
+            self._health_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._health_task
+            self._health_task = None
+        async with self._lock:
+            for slot in self._slots:
+                if slot.browser is not None:
+                    await self._close_browser(slot)
+            await self._stop_playwright()
+
+    # === ВЫДАЧА СТРАНИЦ ===
+
+    @asynccontextmanager
+    async def page(self, **context_options) -> AsyncIterator[Any]:
+        """Новая страница в контексте одного из браузеров
+
+        Без context_options выдается свободный контекст пула (или новый) и
+        после поиска возвращается в пул; с ними - отдельный контекст,
+        который закрывается на выходе.
+        """
+        reusable = not context_options
+        async with self._contexts:
+            await self.start()
+            slot = await self._acquire_slot()
+            slot.opening += 1
+            try:
+                if reusable and slot.idle:
+                    context = slot.idle.pop()
+                else:
+                    context = await slot.browser.new_context(**(context_options or DEFAULT_CONTEXT_OPTIONS))
+                    slot.pages[context] = 0
+                slot.leased.add(context)
+            finally:
+                slot.opening -= 1
+            self.last_used = time.monotonic()
+            page = None
+            try:
+                page = await context.new_page()
+                page.on("load", lambda _: self._count_page(slot, context))
+                yield page
+            finally:
+                slot.leased.discard(context)
+                self.last_used = time.monotonic()
+                if page is not None:
+                    await self._close_quietly(page)
+                await self._release(slot, context, reusable)
+
+    def _count_page(self, slot: _BrowserSlot, context):
+        if context in slot.pages:
+            slot.pages[context] += 1
+
+    async def _release(self, slot: _BrowserSlot, context, reusable: bool):
+        """Возвращает контекст в пул или пересоздает его; выполняет отложенный перезапуск"""
+        if context not in slot.pages:
+            # Браузер перезапущен, пока шел поиск
+            await self._close_quietly(context)
+            return
+
+        if time.monotonic() - slot.memory_checked_at > MEMORY_CHECK_INTERVAL:
+            await self._check_memory(slot)
+
+        pages = slot.pages[context]
+        reason = None
+        if pages >= self.context_max_pages:
+            reason = f"{pages} страниц"
+        elif self.recycle_kb and slot.memory_kb > self.recycle_kb:
+            reason = f"браузер занимает {slot.memory_kb // 1024} МБ"
+
+        if reusable and reason is None and slot.restart_reason is None:
+            slot.idle.append(context)
+        else:
+            del slot.pages[context]
+            if reusable and reason:
+                self._log_recycle(slot, reason)
+            await self._close_quietly(context)
+
+        if slot.restart_reason and not slot.leased and not slot.opening:
+            async with self._lock:
+                if slot.restart_reason and not slot.leased and not slot.opening:
+                    await self._replace(slot, slot.restart_reason)
+
+    async def _acquire_slot(self) -> _BrowserSlot:
+        while True:
+            async with self._lock:
+                # Драйвер мог быть остановлен после простоя
+                await self._ensure_playwright()
+                for slot in self._slots:
+                    if slot.restart_reason:
+                        await self._restart_if_drained(slot)
+                ready = [slot for slot in self._slots if not slot.restart_reason]
+                if ready:
+                    # Наименее загруженный браузер; незапущенные - в последнюю очередь
+                    slot = min(ready, key=lambda item: (len(item.leased) + item.opening, item.browser is None))
+                    if not slot.alive:
+                        reason = "запуск" if slot.browser is None else "браузер отключился"
+                        if slot.browser is not None:
+                            self._count("crash")
+                        await self._replace(slot, reason)
+                    return slot
+            # Все браузеры ждут перезапуска - ждем завершения их поисков
+            await asyncio.sleep(DRAIN_POLL)
+
+    async def _restart_if_drained(self, slot: _BrowserSlot):
+        """Отложенный перезапуск: когда поиски завершились или истек срок (под self._lock)"""
+        if not slot.leased and not slot.opening:
+            await self._replace(slot, slot.restart_reason)
+        elif time.monotonic() > slot.drain_deadline:
+            await self._replace(
+                slot, f"{slot.restart_reason}; поиски не завершились за {self.drain_timeout:.0f} с, прерваны"
+            )
+
+    # === ПРОВЕРКИ ЗДОРОВЬЯ ===
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self.check_health()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Ошибка проверки браузеров: {e}")
+
+    async def check_health(self):
+        """Проверяет браузеры: простой, отключение, зависание, забытые контексты, память"""
+        idle = bool(self.idle_timeout) and time.monotonic() - self.last_used > self.idle_timeout
+        async with self._lock:
+            for slot in self._slots:
+                if slot.browser is None:
+                    continue
+                if idle and not slot.leased and not slot.opening:
+                    logger.info(f"💤 Браузер {slot.index} закрыт после простоя")
+                    self._count("idle_close")
+                    await self._close_browser(slot)
+                    continue
+                reason = await self._probe(slot)
+                if reason:
+                    self._count("probe_failed")
+                    await self._replace(slot, reason)
+                    continue
+                await self._close_leaked(slot)
+                await self._check_memory(slot)
+                if slot.restart_reason:
+                    await self._restart_if_drained(slot)
+            if all(slot.browser is None for slot in self._slots):
+                await self._stop_playwright()
+
+    async def _probe(self, slot: _BrowserSlot) -> Optional[str]:
+        """None, если браузер здоров, иначе причина замены"""
+        if not slot.browser.is_connected():
+            return "браузер отключился"
+        try:
+            result = await asyncio.wait_for(self._probe_page(slot.browser), PROBE_TIMEOUT)
+        except asyncio.TimeoutError:
+            return f"нет ответа за {PROBE_TIMEOUT} с"
+        except Exception as e:
+            return f"ошибка проверки: {e}"
+        return None if result == 2 else f"неверный ответ проверки: {result!r}"
+
+    @staticmethod
+    async def _probe_page(browser) -> Any:
+        context = await browser.new_context()
+        try:
+            page = await context.new_page()
+            return await page.evaluate("1 + 1")
+        finally:
+            await context.close()
+
+    async def _close_leaked(self, slot: _BrowserSlot):
+        """Закрывает контексты, не выданные пулом (остались от прерванных поисков)"""
+        if slot.opening:
+            return
+        leaked = [context for context in slot.browser.contexts if context not in slot.pages]
+        if not leaked:
+            return
+        logger.warning(f"🧹 Браузер {slot.index}: закрыто забытых контекстов: {len(leaked)}")
+        self._count("leaked_context", len(leaked))
+        for context in leaked:
+            await self._close_quietly(context)
+
+    # === ПАМЯТЬ ===
+
+    async def _check_memory(self, slot: _BrowserSlot):
+        """Замер памяти браузера: пересоздание свободных контекстов, отложенный перезапуск"""
+        if slot.pid is None:
+            return
+        memory_kb = await asyncio.to_thread(tree_memory_kb, slot.pid)
+        slot.memory_checked_at = time.monotonic()
+        if not memory_kb:
+            # Процесс уже завершился - браузер заменит проверка подключения
+            return
+        slot.memory_kb = memory_kb
+        BROWSER_MEMORY_BYTES.set(memory_kb * 1024, browser=str(slot.index))
+
+        if self.max_kb and memory_kb > self.max_kb and slot.restart_reason is None:
+            slot.restart_reason = f"браузер занимает {memory_kb // 1024} МБ > {self.max_kb // 1024} МБ"
+            slot.drain_deadline = time.monotonic() + self.drain_timeout
+            self._count("memory_restart")
+            logger.warning(f"🧠 Браузер {slot.index}: {slot.restart_reason}, перезапуск после текущих поисков")
+
+        if slot.idle and (slot.restart_reason or (self.recycle_kb and memory_kb > self.recycle_kb)):
+            idle, slot.idle = slot.idle, []
+            for context in idle:
+                slot.pages.pop(context, None)
+                self._log_recycle(slot, f"браузер занимает {memory_kb // 1024} МБ")
+                await self._close_quietly(context)
+
+    def _log_recycle(self, slot: _BrowserSlot, reason: str):
+        logger.info(f"♻️ Браузер {slot.index}: контекст пересоздан ({reason})")
+        self._count("context_recycle")
+
+    @staticmethod
+    def _find_browser_pid(before: Set[int]) -> Optional[int]:
+        """Корневой процесс Chromium среди процессов, появившихся после before"""
+        table = process_table()
+        new = descendants(os.getpid(), table) - before
+        roots = [
+            pid for pid in new
+            if table.get(pid) not in new and not process_name(pid).startswith("python")
+        ]
+        return min(roots) if roots else None
+
+    # === ЗАПУСК И ЗАКРЫТИЕ БРАУЗЕРОВ ===
+
+    async def _replace(self, slot: _BrowserSlot, reason: str):
+        """Запускает браузер в слоте, закрывая прежний (вызывать под self._lock)"""
+        if slot.browser is not None:
+            logger.warning(f"♻️ Перезапуск браузера {slot.index}: {reason}")
+            self._count("restart")
+            await self._close_browser(slot)
+        started = time.perf_counter()
+        before = await asyncio.to_thread(descendants, os.getpid())
+        browser = await self._playwright.chromium.launch(headless=self.headless, args=CHROMIUM_ARGS)
+        slot.reset()
+        slot.browser = browser
+        slot.launched_at = time.monotonic()
+        # Запуски идут под self._lock, поэтому новый процесс - этого браузера
+        slot.pid = await asyncio.to_thread(self._find_browser_pid, before)
+        self._count("launch")
+        logger.info(f"🌐 Браузер {slot.index} запущен ({reason}) за {time.perf_counter() - started:.1f} с")
+
+    async def _close_browser(self, slot: _BrowserSlot):
+        browser = slot.browser
+        slot.reset()
+        try:
+            await asyncio.wait_for(browser.close(), CLOSE_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"⚠️ Браузер {slot.index} не закрылся: {e}")
+
+    async def _ensure_playwright(self):
+        """Запускает драйвер Playwright (вызывать под self._lock)"""
+        if self._playwright is not None:
+            return
+        # Импорт Playwright занимает десятки миллисекунд - не в потоке event loop
+        module = await asyncio.to_thread(importlib.import_module, "playwright.async_api")
+        self._playwright = await module.async_playwright().start()
+        logger.info("🌐 Playwright запущен")
+
+    async def _stop_playwright(self):
+        if self._playwright is None:
+            return
+        playwright, self._playwright = self._playwright, None
+        with suppress(Exception):
+            await playwright.stop()
+
+    @staticmethod
+    async def _close_quietly(target):
+        """Закрывает страницу или контекст, не пробрасывая ошибки"""
+        with suppress(Exception):
+            await asyncio.wait_for(target.close(), CLOSE_TIMEOUT)
+
+    def _count(self, event: str, amount: int = 1):
+        self.stats[event] += amount
+        BROWSER_EVENTS.inc(amount, event=event)
+
+
+# Глобальный пул браузеров
+browser_pool = BrowserPool(
+    size=settings.BROWSER_POOL_SIZE,
+    max_contexts=settings.BROWSER_MAX_CONTEXTS,
+    health_interval=settings.BROWSER_HEALTH_INTERVAL,
+    idle_timeout=settings.BROWSER_IDLE_TIMEOUT,
+    context_max_pages=settings.BROWSER_CONTEXT_MAX_PAGES,
+    recycle_rss_mb=settings.BROWSER_RECYCLE_RSS_MB,
+    max_rss_mb=settings.BROWSER_MAX_RSS_MB,
+    drain_timeout=settings.BROWSER_DRAIN_TIMEOUT,
+)
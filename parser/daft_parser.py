@@ -8,14 +8,16 @@ import aiohttp
 import json
 import random
 from typing import List, Dict, Optional
-from bs4 import BeautifulSoup
 import logging
 import re
 from datetime import datetime
 from urllib.parse import urljoin, urlencode
 
 from .models import Property, SearchFilters
+from .search_cache import SearchPageCache
+from .offload import run_in_thread
 from config.settings import settings
+from utils.html_parsing import extract_hrefs, make_soup
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +28,8 @@ class DaftParser:
         self.base_url = "https://www.daft.ie"
         self.session = None
         self.logger = logging.getLogger(__name__)
+        # ETag/Last-Modified и хеши списков объявлений по страницам поиска
+        self.page_cache = SearchPageCache()
         
     async def __aenter__(self):
         """Async context manager entry"""
@@ -63,14 +67,22 @@ class DaftParser:
             await self.create_session()
         
         # Используем базовый URL без фильтров для получения максимума ссылок
-        search_url = f"{self.base_url}/property-for-rent/{city.lower()}"
+        search_url = self._listings_url(city)
         
         self.logger.info(f"Fetching: {search_url}")
         
         try:
-            async with self.session.get(search_url) as response:
+            # Условный запрос: при неизменной странице сервер ответит 304 без тела
+            headers = self.page_cache.conditional_headers(search_url)
+            async with self.session.get(search_url, headers=headers) as response:
+                if response.status == 304:
+                    content = self.page_cache.not_modified_body(search_url)
+                    if content is not None:
+                        self.logger.info("✅ Page not modified (304)")
+                        return content
                 if response.status == 200:
                     content = await response.text()
+                    self.page_cache.remember_response(search_url, response.headers, content)
                     self.logger.info(f"✅ Got page: {len(content)} chars")
                     return content
                 else:
@@ -80,16 +92,16 @@ class DaftParser:
             self.logger.error(f"Failed to get page: {type(e).__name__}: {e}")
             return None
 
+    def _listings_url(self, city: str) -> str:
+        """URL страницы с объявлениями города"""
+        return f"{self.base_url}/property-for-rent/{city.lower()}"
+
     def extract_property_links(self, content: str) -> List[str]:
         """Извлечение ссылок на реальные объявления"""
-        soup = BeautifulSoup(content, 'html.parser')
-        links = soup.find_all('a', href=True)
-        
         property_links = []
         
-        for link in links:
-            href = link.get('href', '')
-            
+        # Нужны только href - дерево документа не строим
+        for href in extract_hrefs(content):
             # Ищем ссылки на объявления с ID в конце
             if '/for-rent/' in href:
                 if any(prop_type in href for prop_type in ['apartment', 'studio', 'flat']):
@@ -111,7 +123,8 @@ class DaftParser:
             async with self.session.get(url) as response:
                 if response.status == 200:
                     content = await response.text()
-                    return self.parse_property_details(content, url)
+                    # BeautifulSoup на lxml - в потоке, чтобы не блокировать event loop
+                    return await run_in_thread(self.parse_property_details, content, url)
                 else:
                     self.logger.debug(f"Property page {url} returned {response.status}")
                     return None
@@ -123,7 +136,7 @@ class DaftParser:
     def parse_property_details(self, content: str, url: str) -> Optional[Property]:
         """Парсинг деталей объявления"""
         try:
-            soup = BeautifulSoup(content, 'html.parser')
+            soup = make_soup(content)
             
             # Заголовок из title тега
             title_elem = soup.find('title')
@@ -309,7 +322,7 @@ class DaftParser:
             return []
         
         # Извлекаем ссылки на объявления
-        property_links = self.extract_property_links(content)
+        property_links = await run_in_thread(self.extract_property_links, content)
         
         if not property_links:
             self.logger.warning("⚠️ No property links found")
@@ -317,16 +330,28 @@ class DaftParser:
         
         self.logger.info(f"Processing {len(property_links)} property links...")
         
-        # Получаем детали объявлений
-        properties = []
-        
         # Обрабатываем первые 20 ссылок
-        for i, url in enumerate(property_links[:20]):
-            self.logger.debug(f"Processing property {i+1}/{min(20, len(property_links))}")
+        links_to_process = property_links[:20]
+        search_url = self._listings_url(filters.city)
+        
+        # Список объявлений не изменился - детали не загружаем
+        properties = self.page_cache.unchanged_results(search_url, links_to_process)
+        
+        if properties is None:
+            # Получаем детали объявлений
+            properties = []
+            
+            for i, url in enumerate(links_to_process):
+                self.logger.debug(f"Processing property {i+1}/{len(links_to_process)}")
+                
+                prop_info = await self.get_property_info(url)
+                if prop_info:
+                    properties.append(prop_info)
             
-            prop_info = await self.get_property_info(url)
-            if prop_info:
-                properties.append(prop_info)
+            if len(properties) == len(links_to_process):
+                self.page_cache.store_results(search_url, links_to_process, properties)
+            else:
+                self.page_cache.invalidate_results(search_url)
         
         self.logger.info(f"✅ Got {len(properties)} properties before filtering")
         
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Извлечение данных объявления из HTML страницы за один проход
+
+Вместо десятков вызовов query_selector/text_content (каждый - отдельный
+IPC запрос к Chromium) парсер получает одну строку page.content() и
+разбирает её в процессе: HTMLParser за один проход собирает текст всех
+нужных элементов, после чего поля извлекаются регулярными выражениями.
+"""
+
+from collections import Counter
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import next_data, patterns
+
+# Элементы, текст которых нужен парсеру: ключ -> (атрибут, значение или подстрока класса).
+# Порядок ключей внутри групп совпадает с порядком селекторов в старом коде.
+PRICE_TARGETS = ['testid:price', 'class:TitleBlock_price', 'span_euro', 'class:price']
+BEDROOM_TARGETS = [
+    'testid:bed-bath', 'class:property-details', 'class:TitleBlock_meta',
+    'class:BdRmBtListing', 'testid:beds',
+]
+
+_VOID_TAGS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link',
+    'meta', 'param', 'source', 'track', 'wbr',
+}
+_SKIP_TEXT_TAGS = {'script', 'style'}
+
+_TESTIDS = {'price', 'bed-bath', 'beds'}
+_CLASS_MARKERS = ['TitleBlock_price', 'property-details', 'TitleBlock_meta', 'BdRmBtListing']
+
+
+class _TargetTextCollector(HTMLParser):
+    """Собирает текст первого вхождения каждого целевого элемента"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.texts: Dict[str, str] = {}
+        self._parts: Dict[str, List[str]] = {}
+        # Стек открытых тегов: (тег, ключи, которые закрываются вместе с ним)
+        self._stack: List[Tuple[str, List[str]]] = []
+        self._open_keys: List[str] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag: str, attrs):
+        if tag in _VOID_TAGS:
+            return
+        if tag in _SKIP_TEXT_TAGS:
+            self._skip_depth += 1
+
+        keys = []
+        if tag == 'h1':
+            keys.append('h1')
+        elif tag == 'span':
+            # Кандидат на 'span:has-text("€")' - проверяется после сбора текста
+            keys.append('span_euro')
+
+        for name, value in attrs:
+            if not value:
+                continue
+            if name == 'data-testid' and value in _TESTIDS:
+                keys.append(f'testid:{value}')
+            elif name == 'class':
+                for marker in _CLASS_MARKERS:
+                    if marker in value:
+                        keys.append(f'class:{marker}')
+                if 'price' in value.split():
+                    keys.append('class:price')
+
+        started = []
+        for key in keys:
+            if key not in self.texts and key not in self._parts:
+                self._parts[key] = []
+                self._open_keys.append(key)
+                started.append(key)
+        self._stack.append((tag, started))
+
+    def handle_endtag(self, tag: str):
+        if tag in _VOID_TAGS:
+            return
+        if tag in _SKIP_TEXT_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+        # Закрываем до соответствующего открывающего тега (HTML может быть невалидным)
+        for index in range(len(self._stack) - 1, -1, -1):
+            if self._stack[index][0] == tag:
+                for _, keys in self._stack[index:]:
+                    for key in keys:
+                        self._finish(key)
+                del self._stack[index:]
+                break
+
+    def handle_data(self, data: str):
+        if self._skip_depth or not self._open_keys:
+            return
+        for key in self._open_keys:
+            self._parts[key].append(data)
+
+    def _finish(self, key: str):
+        parts = self._parts.pop(key, None)
+        if key in self._open_keys:
+            self._open_keys.remove(key)
+        if parts is None:
+            return
+        text = ''.join(parts)
+        if key == 'span_euro' and '€' not in text:
+            # Этот span не подходит, ждем следующий
+            return
+        self.texts[key] = text
+
+    def close(self):
+        super().close()
+        for _, keys in self._stack:
+            for key in keys:
+                self._finish(key)
+        self._stack.clear()
+
+
+def collect_element_texts(html: str) -> Dict[str, str]:
+    """Возвращает тексты целевых элементов страницы за один проход"""
+    collector = _TargetTextCollector()
+    collector.feed(html)
+    collector.close()
+    return collector.texts
+
+
+def extract_title(texts: Dict[str, str]) -> Optional[str]:
+    """Заголовок объявления (h1)"""
+    title = texts.get('h1')
+    return title.strip() if title and title.strip() else None
+
+
+def extract_price(texts: Dict[str, str], json_text: str,
+                  listing: Optional[Dict[str, Any]] = None) -> Optional[int]:
+    """Цена: сначала из элементов страницы, затем из JSON данных"""
+    for key in PRICE_TARGETS:
+        price_match = patterns.PRICE_TEXT.search(texts.get(key) or '')
+        if price_match:
+            return int(price_match.group(1).replace(',', ''))
+
+    if listing is not None:
+        return next_data.listing_price(listing)
+    return patterns.search_int(patterns.JSON_PRICE, json_text)
+
+
+def _collect_bedrooms(found_bedrooms: List[int], regexes, text: str):
+    """Добавляет все реалистичные значения спален, найденные шаблонами"""
+    for regex in regexes:
+        for match in regex.findall(text):
+            bedrooms = int(match)
+            if 0 <= bedrooms <= 10:
+                found_bedrooms.append(bedrooms)
+
+
+def extract_bedrooms(texts: Dict[str, str], json_text: str, page_lower: str,
+                     listing: Optional[Dict[str, Any]] = None) -> Optional[int]:
+    """Количество спален с голосованием по всем источникам"""
+    found_bedrooms = []
+
+    # 1. JSON данные
+    if listing is not None:
+        bedrooms = next_data.listing_bedrooms(listing)
+    else:
+        bedrooms = patterns.search_int(patterns.JSON_NUM_BEDROOMS, json_text)
+    if bedrooms is not None and 0 <= bedrooms <= 10:
+        found_bedrooms.append(bedrooms)
+
+    # 2. Элементы страницы
+    for key in BEDROOM_TARGETS:
+        text = texts.get(key)
+        if text:
+            _collect_bedrooms(found_bedrooms, patterns.BEDROOM_ELEMENT_PATTERNS, text.lower())
+
+    # 3. Заголовок
+    title_text = texts.get('h1')
+    if title_text:
+        title_lower = title_text.lower()
+        if 'studio' in title_lower:
+            found_bedrooms.append(0)
+        else:
+            _collect_bedrooms(found_bedrooms, patterns.BEDROOM_TITLE_PATTERNS, title_lower)
+
+    # 4. Текст страницы (только четкие упоминания)
+    for match in patterns.page_bedroom_mentions(page_lower):
+        bedrooms = int(match)
+        if 0 <= bedrooms <= 10:
+            found_bedrooms.append(bedrooms)
+
+    return choose_bedrooms(found_bedrooms)
+
+
+def choose_bedrooms(found_bedrooms: List[int]) -> Optional[int]:
+    """Выбирает итоговое количество спален из найденных значений"""
+    if not found_bedrooms:
+        return None
+
+    unique_bedrooms = list(set(found_bedrooms))
+    if len(unique_bedrooms) == 1:
+        return unique_bedrooms[0]
+
+    most_common = Counter(found_bedrooms).most_common(1)[0][0]
+
+    # Если наиболее частое значение кажется неразумным, берем наименьшее разумное
+    if most_common > 6:
+        reasonable_values = [b for b in unique_bedrooms if 1 <= b <= 6]
+        if reasonable_values:
+            return min(reasonable_values)
+
+    return most_common
+
+
+def extract_property_type(json_text: str, listing: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """Тип недвижимости из JSON данных"""
+    if listing is not None:
+        return next_data.listing_property_type(listing)
+    type_match = patterns.JSON_PROPERTY_TYPE.search(json_text)
+    return type_match.group(1) if type_match else None
+
+
+def extract_description(json_text: str, max_length: int = 200,
+                        listing: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """Описание объявления из JSON данных"""
+    if listing is not None:
+        description = next_data.listing_description(listing)
+    else:
+        desc_match = patterns.JSON_DESCRIPTION.search(json_text)
+        description = desc_match.group(1) if desc_match else None
+    if not description:
+        return None
+    return description[:max_length] + "..." if len(description) > max_length else description
+
+
+def extract_location_from_title(title: str) -> Optional[str]:
+    """Локация из заголовка"""
+    location_match = patterns.TITLE_LOCATION.search(title)
+    return location_match.group() if location_match else None
+
+
+def extract_property_fields(html: str) -> Dict[str, Any]:
+    """Извлекает все поля объявления из HTML страницы"""
+    texts = collect_element_texts(html)
+    # Поля JSON берем из объявления в __NEXT_DATA__; если его нет - ищем
+    # шаблонами только в JSON фрагментах страницы
+    listing = next_data.find_listing(next_data.parse_next_data(html))
+    json_text = '' if listing is not None else patterns.json_scope(html)
+    page_lower = html.lower()
+    title = extract_title(texts)
+
+    return {
+        'title': title,
+        'price': extract_price(texts, json_text, listing),
+        'bedrooms': extract_bedrooms(texts, json_text, page_lower, listing),
+        'property_type': extract_property_type(json_text, listing),
+        'location': extract_location_from_title(title) if title else None,
+        'description': extract_description(json_text, listing=listing),
+    }
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Быстрое извлечение __NEXT_DATA__ со страниц daft.ie
+
+Вместо построения дерева (BeautifulSoup) или регулярных выражений по
+всему документу находим скрипт __NEXT_DATA__ по смещению (str.find)
+и передаем в json.loads только его содержимое. Поля объявления после
+этого - обычные обращения к словарю, без риска зацепиться за похожее
+объявление из соседнего виджета.
+
+Поддерживаются обе формы:
+    <script id="__NEXT_DATA__" type="application/json">{...}</script>
+    <script>window.__NEXT_DATA__ = {...};</script>
+"""
+
+import json
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from . import patterns
+
+logger = logging.getLogger(__name__)
+
+_SCRIPT_ID_MARKERS = ('id="__NEXT_DATA__"', "id='__NEXT_DATA__'", 'id=__NEXT_DATA__')
+_ASSIGNMENT_MARKER = '__NEXT_DATA__'
+_SCRIPT_END = '</script>'
+
+_decoder = json.JSONDecoder()
+
+# Пути к объявлению внутри pageProps (страница объявления)
+LISTING_PATHS = (
+    ('props', 'pageProps', 'listing'),
+    ('props', 'pageProps', 'listingDetails', 'listing'),
+    ('props', 'pageProps', 'property'),
+)
+
+
+def locate_next_data(html: str) -> Optional[Tuple[int, int]]:
+    """Смещения (начало, конец) JSON внутри скрипта __NEXT_DATA__"""
+    for marker in _SCRIPT_ID_MARKERS:
+        marker_at = html.find(marker)
+        if marker_at < 0:
+            continue
+        start = html.find('>', marker_at) + 1
+        end = html.find(_SCRIPT_END, start)
+        if start > 0 and end > 0:
+            return start, end
+
+    return None
+
+
+def parse_next_data(html: str) -> Optional[Dict[str, Any]]:
+    """JSON из __NEXT_DATA__ или None, если его нет на странице"""
+    bounds = locate_next_data(html)
+    if bounds:
+        try:
+            return json.loads(html[bounds[0]:bounds[1]])
+        except ValueError as e:
+            logger.warning(f"Не удалось разобрать __NEXT_DATA__: {e}")
+            return None
+
+    # Старая форма: window.__NEXT_DATA__ = {...}; - границы JSON определяет сам декодер
+    position = html.find(_ASSIGNMENT_MARKER)
+    while position >= 0:
+        brace = html.find('{', position)
+        if brace < 0:
+            return None
+        if html[position + len(_ASSIGNMENT_MARKER):brace].strip() == '=':
+            try:
+                data, _ = _decoder.raw_decode(html, brace)
+                return data
+            except ValueError as e:
+                logger.warning(f"Не удалось разобрать __NEXT_DATA__: {e}")
+                return None
+        position = html.find(_ASSIGNMENT_MARKER, position + len(_ASSIGNMENT_MARKER))
+
+    return None
+
+
+def find_listing(data: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Объявление из данных страницы объявления"""
+    if not isinstance(data, dict):
+        return None
+    for path in LISTING_PATHS:
+        current: Any = data
+        for key in path:
+            current = current.get(key) if isinstance(current, dict) else None
+        if isinstance(current, dict):
+            return current
+    return None
+
+
+def _as_int(value: Any) -> Optional[int]:
+    """Число из значения JSON: 2000, "2000", "2 Bed", "€2,000 per month" """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        digits = patterns.LEADING_NUMBER.search(value)
+        if digits:
+            return int(digits.group().replace(',', ''))
+    return None
+
+
+def listing_price(listing: Dict[str, Any]) -> Optional[int]:
+    """Цена объявления"""
+    price = listing.get('price')
+    if isinstance(price, dict):
+        price = price.get('amount') or price.get('displayValue')
+    return _as_int(price)
+
+
+def listing_bedrooms(listing: Dict[str, Any]) -> Optional[int]:
+    """Количество спален объявления"""
+    return _as_int(listing.get('numBedrooms'))
+
+
+def listing_property_type(listing: Dict[str, Any]) -> Optional[str]:
+    """Тип недвижимости"""
+    property_type = listing.get('propertyType')
+    return property_type if isinstance(property_type, str) else None
+
+
+def listing_description(listing: Dict[str, Any]) -> Optional[str]:
+    """Полное описание объявления"""
+    description = listing.get('description')
+    return description if isinstance(description, str) else None
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Вынос CPU-тяжелого разбора HTML из event loop
+
+Регулярные выражения по 300KB страницам, HTMLParser и json.loads держат
+GIL и блокируют обработку апдейтов aiogram на время разбора. Здесь разбор
+выполняется в пуле процессов (по умолчанию) или потоков: туда уходит
+HTML, обратно возвращается компактный словарь полей.
+
+Режим задается PARSE_EXECUTOR: process, thread или none (в event loop).
+Пул потоков полезен для lxml, который отпускает GIL при разборе.
+
+Процессы пула запускаются через forkserver (spawn, где его нет), а не fork:
+к моменту создания пула у бота уже работают поток QueueListener логов,
+потоки aiosqlite и драйвер Playwright, и fork с чужими захваченными
+блокировками (например, блокировкой обработчика логов) может повесить
+воркер. Воркер пишет логи в stderr - очередь логов родителя ему недоступна.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+from config.settings import settings
+from utils.logging_setup import parse_module_levels, stop_logging
+
+from .extractor import extract_property_fields
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_MODES = ("process", "thread", "none")
+
+_executor: Optional[Executor] = None
+_executor_mode: Optional[str] = None
+
+
+def _process_context():
+    """Контекст запуска воркеров без fork"""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _init_worker(level: int):
+    """Логирование воркера пула процессов: stderr с уровнями бота
+
+    Воркер заново импортирует точку входа (__mp_main__), а она настраивает
+    логирование родителя - его поток записи здесь останавливается.
+    """
+    stop_logging()
+    logging.basicConfig(stream=sys.stderr, level=level, format=settings.LOG_FORMAT, force=True)
+    for name, module_level in parse_module_levels(settings.LOG_MODULE_LEVELS).items():
+        logging.getLogger(name).setLevel(module_level)
+
+
+def get_executor(mode: Optional[str] = None, workers: Optional[int] = None) -> Optional[Executor]:
+    """Общий пул для разбора (создается при первом обращении); None - без пула"""
+    global _executor, _executor_mode
+
+    mode = (mode or settings.PARSE_EXECUTOR).lower()
+    if mode not in EXECUTOR_MODES:
+        logger.warning(f"Неизвестный PARSE_EXECUTOR={mode}, разбор в event loop")
+        mode = "none"
+
+    if _executor is not None and _executor_mode == mode:
+        return _executor
+    shutdown_executor()
+
+    workers = workers or settings.PARSE_WORKERS
+    if mode == "process":
+        _executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=_process_context(),
+            initializer=_init_worker,
+            initargs=(logging.getLogger().getEffectiveLevel(),),
+        )
+    elif mode == "thread":
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="parse")
+    _executor_mode = mode
+
+    if _executor is not None:
+        logger.info(f"Разбор HTML вынесен в пул ({mode}, {workers} воркеров)")
+    return _executor
+
+
+def shutdown_executor():
+    """Останавливает пул (при остановке бота)"""
+    global _executor, _executor_mode
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+    _executor = None
+    _executor_mode = None
+
+
+async def run_cpu(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Выполняет func в пуле разбора; в режиме none - прямо в event loop
+
+    Для пула процессов func и аргументы должны сериализоваться pickle
+    (функции уровня модуля, строки, словари).
+    """
+    executor = get_executor()
+    if executor is None:
+        return func(*args, **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, partial(func, *args, **kwargs))
+
+
+async def run_in_thread(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Выполняет func в потоке - для методов с несериализуемым состоянием и lxml"""
+    if (_executor_mode or settings.PARSE_EXECUTOR).lower() == "none":
+        return func(*args, **kwargs)
+    return await asyncio.to_thread(func, *args, **kwargs)
+
+
+async def extract_fields(html: str) -> Dict[str, Any]:
+    """extract_property_fields вне event loop"""
+    return await run_cpu(extract_property_fields, html)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Предкомпилированные регулярные выражения для извлечения данных daft.ie
+
+Все шаблоны компилируются один раз при импорте. Поиск JSON полей
+выполняется только по JSON фрагментам страницы (script с данными),
+а текстовые шаблоны применяются к одному заранее приведенному к нижнему
+регистру буферу.
+"""
+
+import re
+from typing import List, Optional
+
+# === ЦЕНА ===
+PRICE_TEXT = re.compile(r'€\s*([\d,]+)')
+JSON_PRICE = re.compile(r'"price":\s*(\d+)')
+
+# Первое число в строке значения JSON ("2 Bed", "€2,000 per month")
+LEADING_NUMBER = re.compile(r'\d[\d,]*')
+
+# === СПАЛЬНИ ===
+JSON_NUM_BEDROOMS = re.compile(r'"numBedrooms":\s*"?(\d+)"?')
+
+# Шаблоны для текста элементов (текст уже в нижнем регистре)
+BEDROOM_ELEMENT_PATTERNS = (
+    re.compile(r'(\d+)\s*bed'),
+    re.compile(r'(\d+)\s*bedroom'),
+    re.compile(r'(\d+)\s*br\b'),
+    re.compile(r'beds?\s*:\s*(\d+)'),
+    re.compile(r'(\d+)\s*-?\s*bed'),
+)
+
+BEDROOM_TITLE_PATTERNS = (
+    re.compile(r'(\d+)\s*bed'),
+    re.compile(r'(\d+)\s*bedroom'),
+)
+
+# Только четкие упоминания в тексте страницы. Эти шаблоны начинаются с \d+
+# или с альтернативы, поэтому движок re пробует каждую позицию 300KB
+# документа; page_bedroom_mentions() дает тот же результат, начиная поиск
+# с литерала "bed" и разбирая число вокруг найденного места.
+BEDROOM_PAGE_PATTERNS = (
+    re.compile(r'(\d+)\s*bedroom\s*(?:house|apartment|flat)'),
+    re.compile(r'(?:house|apartment|flat).*?(\d+)\s*bedroom'),
+    re.compile(r'(\d+)\s*bed\s*(?:house|apartment|flat)'),
+)
+
+PROPERTY_KEYWORD = re.compile(r'house|apartment|flat')
+_BEDROOM_BEFORE_KEYWORD = re.compile(r'bedroom\s*(?:house|apartment|flat)')
+_BED_BEFORE_KEYWORD = re.compile(r'bed\s*(?:house|apartment|flat)')
+_BEDROOM = re.compile(r'bedroom')
+
+# === ТИП И ОПИСАНИЕ ===
+JSON_PROPERTY_TYPE = re.compile(r'"propertyType":\s*"([^"]*)"')
+JSON_DESCRIPTION = re.compile(r'"description":\s*"([^"]*)"')
+
+# === ЛОКАЦИЯ ===
+TITLE_LOCATION = re.compile(r'Dublin\s+\d+|Dublin\s+\w+')
+
+# === JSON ФРАГМЕНТЫ СТРАНИЦЫ ===
+JSON_SCRIPT = re.compile(
+    r'<script\b[^>]*type="application/(?:ld\+)?json"[^>]*>(.*?)</script>',
+    re.S | re.I
+)
+
+
+def _number_before(text: str, position: int) -> int:
+    """Начало числа, за которым (через пробелы) следует позиция; -1 если числа нет"""
+    end = position
+    while end > 0 and text[end - 1].isspace():
+        end -= 1
+    start = end
+    while start > 0 and text[start - 1].isdecimal():
+        start -= 1
+    return start if start < end else -1
+
+
+def _numbers_before(anchor: re.Pattern, text: str) -> List[str]:
+    """Эквивалент findall(r'(\\d+)\\s*' + anchor) с поиском от литерала"""
+    numbers = []
+    for match in anchor.finditer(text):
+        start = _number_before(text, match.start())
+        if start >= 0:
+            numbers.append(text[start:match.start()].rstrip())
+    return numbers
+
+
+def _numbers_after_keyword(text: str) -> List[str]:
+    """Эквивалент findall(r'(?:house|apartment|flat).*?(\\d+)\\s*bedroom')"""
+    numbers = []
+    position = 0
+    for match in _BEDROOM.finditer(text):
+        start = _number_before(text, match.start())
+        if start < position:
+            # Нет числа или оно попадает в предыдущее совпадение
+            continue
+        # '.' не совпадает с переводом строки - ключевое слово ищем в той же строке
+        line_start = max(position, text.rfind('\n', position, start) + 1)
+        if PROPERTY_KEYWORD.search(text, line_start, start):
+            numbers.append(text[start:match.start()].rstrip())
+            position = match.end()
+    return numbers
+
+
+def page_bedroom_mentions(page_lower: str) -> List[str]:
+    """Числа спален из четких упоминаний - как findall по BEDROOM_PAGE_PATTERNS подряд"""
+    return (
+        _numbers_before(_BEDROOM_BEFORE_KEYWORD, page_lower)
+        + _numbers_after_keyword(page_lower)
+        + _numbers_before(_BED_BEFORE_KEYWORD, page_lower)
+    )
+
+
+def json_scope(html: str) -> str:
+    """Возвращает JSON фрагменты страницы (script с данными) или весь документ"""
+    slices = JSON_SCRIPT.findall(html)
+    return '\n'.join(slices) if slices else html
+
+
+def search_int(pattern: re.Pattern, text: str) -> Optional[int]:
+    """Первое совпадение шаблона как целое число"""
+    match = pattern.search(text)
+    return int(match.group(1)) if match else None
@@ -36,6 +36,9 @@ class PlaywrightDaftParser:
         self.retry_delay = 2
         self.page_timeout = 30000
         self.property_timeout = 15000
+        # Ожидание после загрузки страницы (мс) и пауза между страницами поиска (с)
+        self.settle_delay = 3000
+        self.page_delay = 2
     
     async def __aenter__(self):
         """Async context manager entry"""
@@ -150,7 +153,7 @@ class PlaywrightDaftParser:
                 
                 if response and response.status == 200:
                     # Ждем загрузки контента
-                    await self.page.wait_for_timeout(3000)
+                    await self.page.wait_for_timeout(self.settle_delay)
                     
                     # Получаем HTML
                     content = await self.page.content()
@@ -486,7 +489,7 @@ class PlaywrightDaftParser:
                     break
                 
                 # Задержка между страницами
-                await asyncio.sleep(2)
+                await asyncio.sleep(self.page_delay)
                     
             except Exception as e:
                 logger.error(f"Error processing page {page}: {e}")
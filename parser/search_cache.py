@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Состояние страниц поиска между циклами мониторинга
+
+Для каждого URL поиска хранятся ETag/Last-Modified последнего ответа,
+хеш списка ID объявлений и результат разбора. HTTP-парсер отправляет
+условный запрос (If-None-Match / If-Modified-Since), а если список ID
+не изменился, вся фаза загрузки деталей пропускается и возвращается
+прошлый результат. Такие циклы считаются холостыми.
+"""
+
+import hashlib
+import logging
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+_LISTING_ID = re.compile(r'/(\d+)/?$')
+
+# Сортировка daft.ie "сначала новые" для инкрементального обхода
+NEWEST_FIRST_SORT = "sort=publishDateDesc"
+
+
+def listing_ids_hash(urls: Iterable[str]) -> str:
+    """Хеш набора ID объявлений (порядок на странице не важен)"""
+    ids = sorted({_listing_id(url) for url in urls})
+    return hashlib.sha1("\n".join(ids).encode("utf-8")).hexdigest()
+
+
+def _listing_id(url: str) -> str:
+    match = _LISTING_ID.search(url)
+    return match.group(1) if match else url
+
+
+def _result_url(result: Any) -> Optional[str]:
+    """URL объявления из результата (словарь или объект Property)"""
+    if isinstance(result, dict):
+        return result.get('url')
+    return getattr(result, 'url', None)
+
+
+@dataclass
+class SearchPageState:
+    """Состояние одного URL поиска"""
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    body: Optional[str] = None
+    ids_hash: Optional[str] = None
+    results: List[Any] = field(default_factory=list)
+    # Объявления, которые были загружены, но не попали в результат (валидация)
+    rejected: Set[str] = field(default_factory=set)
+    updated_at: float = 0.0
+
+
+class SearchPageCache:
+    """Валидаторы HTTP и хеши списков объявлений по URL поиска"""
+
+    def __init__(self, max_urls: int = 200):
+        self.max_urls = max_urls
+        self._states: "OrderedDict[str, SearchPageState]" = OrderedDict()
+
+        self.cycles = 0
+        self.noop_cycles = 0
+        self.not_modified = 0
+        metrics.track_cache("search_page", self)
+
+    @property
+    def hits(self) -> int:
+        """Холостые циклы - детали взяты из прошлого результата"""
+        return self.noop_cycles
+
+    @property
+    def misses(self) -> int:
+        return self.cycles - self.noop_cycles
+
+    def _state(self, url: str) -> SearchPageState:
+        state = self._states.get(url)
+        if state is None:
+            state = self._states[url] = SearchPageState()
+            while len(self._states) > self.max_urls:
+                self._states.popitem(last=False)
+        self._states.move_to_end(url)
+        return state
+
+    # === УСЛОВНЫЕ ЗАПРОСЫ ===
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Заголовки If-None-Match / If-Modified-Since для URL"""
+        state = self._states.get(url)
+        headers = {}
+        if state is None or state.body is None:
+            # Без сохраненного тела ответ 304 нечем заменить
+            return headers
+        if state.etag:
+            headers['If-None-Match'] = state.etag
+        if state.last_modified:
+            headers['If-Modified-Since'] = state.last_modified
+        return headers
+
+    def remember_response(self, url: str, headers, body: str):
+        """Сохраняет валидаторы и тело ответа 200"""
+        state = self._state(url)
+        state.etag = headers.get('ETag')
+        state.last_modified = headers.get('Last-Modified')
+        state.body = body if (state.etag or state.last_modified) else None
+
+    def not_modified_body(self, url: str) -> Optional[str]:
+        """Тело прошлого ответа для 304 Not Modified"""
+        state = self._states.get(url)
+        if state is None or state.body is None:
+            return None
+        self.not_modified += 1
+        return state.body
+
+    # === СПИСОК ОБЪЯВЛЕНИЙ ===
+
+    def unchanged_results(self, url: str, listing_urls: Iterable[str]) -> Optional[List[Any]]:
+        """Прошлый результат, если список объявлений не изменился; иначе None"""
+        state = self._states.get(url)
+        if state is None or state.ids_hash is None or state.ids_hash != listing_ids_hash(listing_urls):
+            self.record_cycle(noop=False)
+            return None
+
+        self._states.move_to_end(url)
+        self.record_cycle(noop=True)
+        logger.info(f"♻️ Список объявлений не изменился ({url}), холостых циклов: {self.noop_cycles}")
+        return list(state.results)
+
+    def reusable_results(self, url: str) -> Tuple[Dict[str, Any], Set[str]]:
+        """Результаты прошлого цикла по URL объявления и отклоненные URL
+
+        Для конвейерной обработки, где список объявлений становится известен
+        постепенно: уже разобранные объявления не загружаются повторно.
+        """
+        state = self._states.get(url)
+        if state is None or state.ids_hash is None:
+            return {}, set()
+        by_url = {_result_url(result): result for result in state.results}
+        by_url.pop(None, None)
+        return by_url, set(state.rejected)
+
+    def record_cycle(self, noop: bool):
+        """Учитывает цикл; noop - детали не загружались"""
+        self.cycles += 1
+        if noop:
+            self.noop_cycles += 1
+
+    def store_results(self, url: str, listing_urls: Iterable[str], results: List[Any]):
+        """Запоминает результат разбора для списка объявлений"""
+        listing_urls = list(listing_urls)
+        state = self._state(url)
+        state.ids_hash = listing_ids_hash(listing_urls)
+        state.results = list(results)
+        state.rejected = set(listing_urls) - {_result_url(result) for result in results}
+        state.updated_at = time.time()
+
+    def invalidate_results(self, url: str):
+        """Сбрасывает хеш списка - следующий цикл загрузит детали заново"""
+        state = self._states.get(url)
+        if state is not None:
+            state.ids_hash = None
+            state.results = []
+            state.rejected = set()
+
+    def stats(self) -> Dict[str, int]:
+        """Статистика холостых циклов"""
+        return {
+            'urls': len(self._states),
+            'cycles': self.cycles,
+            'noop_cycles': self.noop_cycles,
+            'not_modified': self.not_modified,
+        }
@@ -13,11 +13,19 @@ import re
 import json
 import datetime
 import logging
-from typing import List, Dict, Any, Optional
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Set
 from pathlib import Path
 from playwright.async_api import async_playwright
 import time
 
+from parser.search_cache import NEWEST_FIRST_SORT, SearchPageCache
+from utils.logging_setup import setup_logging
+from utils.metrics import PAGE_LOAD_SECONDS, PARSE_RESULTS, PARSE_SECONDS, observe_cycle
+
+# Метка парсера в метриках
+METRICS_NAME = "production_daft"
+
+
 class ProductionDaftParser:
     """Продакшн-готовый парсер daft.ie"""
     
@@ -37,6 +45,8 @@ class ProductionDaftParser:
             'successful_parses': 0,
             'failed_parses': 0,
             'retries': 0,
+            'incremental_stops': 0,
+            'noop_cycles': 0,
             'start_time': None,
             'end_time': None
         }
@@ -46,22 +56,36 @@ class ProductionDaftParser:
         self.retry_delay = 2
         self.page_timeout = 30000
         self.property_timeout = 15000
+        # Ожидание после загрузки страниц поиска и объявления (мс), пауза между объявлениями (с)
+        self.search_settle_delay = 2000
+        self.detail_settle_delay = 1500
+        self.request_pause = 0.5
+        
+        # Конвейер: вкладки для разбора объявлений и размер очереди ссылок
+        self.detail_workers = 1
+        self.pipeline_queue_size = 20
+        
+        # Инкрементальный обход: самый новый ID (высшая отметка) по каждому запросу
+        self.crawl_state_file = self.results_dir / "crawl_state.json"
+        self.crawl_state = self._load_crawl_state()
+        # ID объявлений, уже разобранных этим парсером
+        self.known_ids: Set[str] = set()
+        # Хеши списков объявлений: неизменный список - без загрузки деталей
+        self.page_cache = SearchPageCache()
     
     def _setup_logging(self, level: str):
-        """Настройка системы логирования"""
-        log_format = '%(asctime)s - %(levelname)s - %(message)s'
-        
-        # Создаем папку для логов
-        Path("logs").mkdir(exist_ok=True)
-        
-        logging.basicConfig(
-            level=getattr(logging, level.upper()),
-            format=log_format,
-            handlers=[
-                logging.FileHandler(f'logs/daft_parser_{datetime.datetime.now().strftime("%Y%m%d")}.log'),
-                logging.StreamHandler()
-            ]
-        )
+        """Настройка системы логирования
+        
+        В боте логирование уже настроено (utils.logging_setup) - парсер
+        только берет свой логгер; при отдельном запуске пишет в дневной файл.
+        """
+        if not logging.getLogger().handlers:
+            setup_logging(
+                level=level,
+                log_file=f'logs/daft_parser_{datetime.datetime.now().strftime("%Y%m%d")}.log',
+                json_lines=False,
+                text_format='%(asctime)s - %(levelname)s - %(message)s'
+            )
         self.logger = logging.getLogger(__name__)
         
     async def search_all_properties(
@@ -70,7 +94,9 @@ class ProductionDaftParser:
         max_price: int = 2500, 
         location: str = "dublin",
         property_type: str = "all",  # "all", "houses", "apartments"
-        max_pages: int = 5
+        max_pages: int = 5,
+        incremental: bool = False,
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None
     ) -> List[Dict[str, Any]]:
         """
         Полный поиск с обходом всех страниц
@@ -81,12 +107,15 @@ class ProductionDaftParser:
             location: Локация для поиска
             property_type: Тип недвижимости ("all", "houses", "apartments")
             max_pages: Максимальное количество страниц для обхода
+            incremental: Сортировка "сначала новые", обход до первой страницы
+                         только с известными объявлениями, известные не разбираются
+            on_result: Вызывается с каждым подходящим объявлением сразу после разбора
             
         Returns:
             Список словарей с данными о недвижимости
         """
         self.stats['start_time'] = datetime.datetime.now()
-        print(f"🔍 Начинаем поиск: {min_bedrooms}+ спален, до €{max_price}, {location}")
+        self.logger.info(f"🔍 Начинаем поиск: {min_bedrooms}+ спален, до €{max_price}, {location}")
         
         # Формируем правильный URL в зависимости от типа недвижимости
         if location.lower() == 'dublin':
@@ -105,6 +134,11 @@ class ProductionDaftParser:
             else:  # all
                 base_search_url = f"{self.base_url}/property-for-rent/{location}?rentalPrice_to={max_price}&numBeds_from={min_bedrooms}&pageSize=20"
         
+        # Ключ запроса для высшей отметки - URL без сортировки
+        query_key = base_search_url if incremental else None
+        if incremental:
+            base_search_url = f"{base_search_url}&{NEWEST_FIRST_SORT}"
+        
         async with async_playwright() as p:
             browser = await p.chromium.launch(
                 headless=True,
@@ -116,38 +150,17 @@ class ProductionDaftParser:
                 viewport={'width': 1920, 'height': 1080}
             )
             
-            page = await context.new_page()
-            
             try:
-                # Собираем все ссылки со всех страниц
-                all_property_urls = await self._collect_all_property_urls(page, base_search_url, max_pages)
-                self.logger.info(f"🔗 Всего найдено ссылок: {len(all_property_urls)}")
-                
-                # Парсим каждое объявление
-                results = []
-                for i, url in enumerate(all_property_urls, 1):
-                    self.logger.info(f"📝 Обрабатываем {i}/{len(all_property_urls)}: {self._get_property_id(url)}")
-                    
-                    property_data = await self._parse_property_with_retry(page, url)
-                    if property_data:
-                        # Валидируем данные
-                        if self._validate_property_data(property_data):
-                            results.append(property_data)
-                            self.stats['successful_parses'] += 1
-                            self._log_property_summary(property_data)
-                        else:
-                            self.logger.warning(f"❌ Данные не прошли валидацию: {url}")
-                            self.stats['failed_parses'] += 1
-                    else:
-                        self.stats['failed_parses'] += 1
-                    
-                    self.stats['total_processed'] += 1
-                    
-                    # Небольшая пауза между запросами
-                    await asyncio.sleep(0.5)
+                results = await self._run_pipeline(
+                    context, base_search_url, max_pages,
+                    query_key=query_key, incremental=incremental,
+                    on_result=on_result
+                )
                 
                 self.stats['end_time'] = datetime.datetime.now()
                 self._log_final_statistics()
+                observe_cycle(METRICS_NAME, pages=self.stats['total_pages'],
+                              listings=self.stats['total_processed'])
                 
                 return results
                 
@@ -158,10 +171,160 @@ class ProductionDaftParser:
             finally:
                 await browser.close()
     
-    async def _collect_all_property_urls(self, page, base_url: str, max_pages: int) -> List[str]:
-        """Собирает ссылки со всех страниц результатов"""
+    async def iter_properties(self, **search_kwargs) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Отдает каждое подходящее объявление сразу после разбора
+        
+        Принимает те же параметры, что и search_all_properties. При выходе
+        из цикла раньше времени поиск отменяется, браузер закрывается.
+        """
+        output: asyncio.Queue = asyncio.Queue()
+        finished = object()
+        
+        async def run():
+            try:
+                await self.search_all_properties(on_result=output.put_nowait, **search_kwargs)
+            finally:
+                output.put_nowait(finished)
+        
+        task = asyncio.create_task(run())
+        try:
+            while True:
+                prop = await output.get()
+                if prop is finished:
+                    break
+                yield prop
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    
+    async def _run_pipeline(self, context, base_search_url: str, max_pages: int,
+                            query_key: Optional[str] = None,
+                            incremental: bool = False,
+                            on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+        """Конвейер: обход страниц поиска и разбор объявлений идут параллельно
+        
+        Производитель кладет ссылки в ограниченную очередь сразу после
+        загрузки каждой страницы поиска, обработчики разбирают их на своих
+        вкладках. Полная очередь останавливает обход (обратное давление).
+        
+        Высшая отметка запроса (query_key) сдвигается после завершения
+        обработчиков и только по обработанным объявлениям - не дальше первого
+        объявления, которое не удалось загрузить, чтобы в следующем цикле
+        оно загружалось снова.
+        """
+        url_queue: asyncio.Queue = asyncio.Queue(maxsize=self.pipeline_queue_size)
+        search_page = await context.new_page()
+        detail_pages = [await context.new_page() for _ in range(self.detail_workers)]
+        
+        # Объявления прошлого цикла по этому запросу не загружаются повторно
+        reused, rejected = ({}, set()) if incremental else self.page_cache.reusable_results(base_search_url)
+        
+        results: List[Dict[str, Any]] = []
+        discovered: List[str] = []
+        counters = {'fetch_failed': 0, 'reused': 0}
+        # Найденные, отданные обработчикам и разобранные (в т.ч. не прошедшие валидацию) ссылки
+        collected: List[str] = []
+        queued: List[str] = []
+        parsed: Set[str] = set()
+        
+        async def produce():
+            try:
+                collected[:] = await self._collect_all_property_urls(
+                    search_page, base_search_url, max_pages,
+                    query_key=query_key, url_queue=url_queue, queued=queued
+                )
+            finally:
+                for _ in detail_pages:
+                    await url_queue.put(None)
+        
+        async def consume(page):
+            while True:
+                url = await url_queue.get()
+                if url is None:
+                    return
+                discovered.append(url)
+                
+                if url in reused or url in rejected:
+                    counters['reused'] += 1
+                    if url in reused:
+                        results.append(reused[url])
+                        if on_result:
+                            on_result(reused[url])
+                    continue
+                
+                self.logger.debug("📝 Обрабатываем %d: %s", len(discovered), url)
+                
+                property_data = await self._parse_property_with_retry(page, url)
+                if property_data:
+                    parsed.add(url)
+                    # Валидируем данные
+                    if self._validate_property_data(property_data):
+                        results.append(property_data)
+                        self.known_ids.add(self._get_property_id(url))
+                        self.stats['successful_parses'] += 1
+                        PARSE_RESULTS.inc(parser=METRICS_NAME, result="matched")
+                        self._log_property_summary(property_data)
+                        if on_result:
+                            on_result(property_data)
+                    else:
+                        self.logger.warning(f"❌ Данные не прошли валидацию: {url}")
+                        self.stats['failed_parses'] += 1
+                        PARSE_RESULTS.inc(parser=METRICS_NAME, result="filtered")
+                else:
+                    counters['fetch_failed'] += 1
+                    self.stats['failed_parses'] += 1
+                    PARSE_RESULTS.inc(parser=METRICS_NAME, result="failed")
+                
+                self.stats['total_processed'] += 1
+                
+                # Небольшая пауза между запросами
+                await asyncio.sleep(self.request_pause)
+        
+        tasks = [asyncio.create_task(produce())]
+        tasks += [asyncio.create_task(consume(page)) for page in detail_pages]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            # При ошибке одного участника не оставляем остальных ждать очередь
+            for task in tasks:
+                task.cancel()
+        
+        self.logger.info(f"🔗 Всего обработано ссылок: {len(discovered)}, из прошлого цикла: {counters['reused']}")
+        
+        if query_key:
+            pending = {url for url in queued if url not in parsed}
+            self._update_high_water(query_key, [url for url in collected if url not in pending], pending)
+        
+        if not incremental:
+            noop = bool(discovered) and counters['reused'] == len(discovered)
+            self.page_cache.record_cycle(noop)
+            if noop:
+                self.stats['noop_cycles'] += 1
+                self.logger.info("♻️ Список объявлений не изменился, детали не загружались")
+        
+        # Результат с ошибками загрузки не запоминаем
+        if counters['fetch_failed']:
+            self.page_cache.invalidate_results(base_search_url)
+        elif not incremental:
+            self.page_cache.store_results(base_search_url, discovered, results)
+        
+        return results
+    
+    async def _collect_all_property_urls(self, page, base_url: str, max_pages: int,
+                                         query_key: Optional[str] = None,
+                                         url_queue: Optional[asyncio.Queue] = None,
+                                         queued: Optional[List[str]] = None) -> List[str]:
+        """Собирает ссылки со всех страниц результатов
+        
+        С query_key (инкрементальный режим) обход останавливается на первой
+        странице, где все объявления уже известны. С url_queue новые ссылки
+        передаются обработчикам сразу после загрузки страницы (известные
+        в инкрементальном режиме пропускаются) и записываются в queued.
+        """
         all_urls = set()
         current_page = 1
+        high_water = self._get_high_water(query_key) if query_key else None
         
         while current_page <= max_pages:
             # Формируем URL для текущей страницы
@@ -175,8 +338,9 @@ class ProductionDaftParser:
             self.logger.info(f"📄 Загружаем страницу {current_page}: {page_url}")
             
             try:
-                await page.goto(page_url, wait_until='networkidle', timeout=self.page_timeout)
-                await page.wait_for_timeout(2000)
+                with PAGE_LOAD_SECONDS.time(parser=METRICS_NAME, kind="search"):
+                    await page.goto(page_url, wait_until='networkidle', timeout=self.page_timeout)
+                await page.wait_for_timeout(self.search_settle_delay)
                 
                 # Проверяем количество результатов на первой странице
                 if current_page == 1:
@@ -184,19 +348,36 @@ class ProductionDaftParser:
                     self.logger.info(f"📊 Общее количество объявлений: {total_count}")
                 
                 # Собираем ссылки на текущей странице
-                page_urls = await self._collect_property_urls_on_page(page)
+                with PARSE_SECONDS.time(parser=METRICS_NAME, phase="links"):
+                    page_urls = await self._collect_property_urls_on_page(page)
                 
                 if not page_urls:
                     self.logger.info(f"🔚 Больше нет объявлений на странице {current_page}")
                     break
                 
-                before_count = len(all_urls)
-                all_urls.update(page_urls)
-                new_urls = len(all_urls) - before_count
+                fresh_urls = [url for url in page_urls if url not in all_urls]
+                all_urls.update(fresh_urls)
                 
-                self.logger.info(f"✅ Страница {current_page}: найдено {len(page_urls)} ссылок, новых: {new_urls}")
+                self.logger.info(f"✅ Страница {current_page}: найдено {len(page_urls)} ссылок, новых: {len(fresh_urls)}")
                 self.stats['total_pages'] += 1
                 
+                if url_queue is not None:
+                    for url in fresh_urls:
+                        if query_key and self._is_known(self._get_property_id(url), high_water):
+                            continue
+                        if queued is not None:
+                            queued.append(url)
+                        # Ждет, если обработчики не успевают
+                        await url_queue.put(url)
+                
+                # Сортировка "сначала новые": дальше только уже известные объявления
+                if query_key and all(
+                    self._is_known(self._get_property_id(url), high_water) for url in page_urls
+                ):
+                    self.logger.info(f"⏹️ Страница {current_page}: все объявления уже известны, обход остановлен")
+                    self.stats['incremental_stops'] += 1
+                    break
+                
                 # Если на странице меньше 20 объявлений, это последняя страница
                 if len(page_urls) < 20:
                     self.logger.info(f"🔚 Последняя страница: {current_page}")
@@ -209,8 +390,59 @@ class ProductionDaftParser:
                 break
         
         self.stats['total_links_found'] = len(all_urls)
+        
         return list(all_urls)
     
+    def _load_crawl_state(self) -> Dict[str, Any]:
+        """Загружает высшие отметки запросов"""
+        try:
+            if self.crawl_state_file.exists():
+                with open(self.crawl_state_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            self.logger.warning(f"⚠️ Не удалось загрузить состояние обхода: {e}")
+        return {}
+    
+    def _get_high_water(self, query_key: Optional[str]) -> Optional[int]:
+        """Самый новый ID, встреченный по запросу"""
+        if not query_key:
+            return None
+        return self.crawl_state.get(query_key, {}).get('high_water_id')
+    
+    def _update_high_water(self, query_key: str, done_urls, pending_urls=()):
+        """Сохраняет самый новый обработанный ID запроса
+        
+        Отметка не переходит через объявления из pending_urls (не удалось
+        загрузить): они новее отметки и в следующем цикле загрузятся снова.
+        """
+        ids = [int(pid) for pid in map(self._get_property_id, done_urls) if pid.isdigit()]
+        pending = [int(pid) for pid in map(self._get_property_id, pending_urls) if pid.isdigit()]
+        if pending:
+            ids = [property_id for property_id in ids if property_id < min(pending)]
+        if not ids:
+            return
+        
+        high_water = max(ids + [self._get_high_water(query_key) or 0])
+        self.crawl_state[query_key] = {
+            'high_water_id': high_water,
+            'updated_at': datetime.datetime.now().isoformat()
+        }
+        try:
+            with open(self.crawl_state_file, 'w', encoding='utf-8') as f:
+                json.dump(self.crawl_state, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            self.logger.warning(f"⚠️ Не удалось сохранить состояние обхода: {e}")
+    
+    def seed_known_ids(self, urls: Iterable[str]):
+        """Добавляет в известные объявления уже увиденные (например, из property_history)"""
+        self.known_ids.update(self._get_property_id(url) for url in urls)
+    
+    def _is_known(self, property_id: str, high_water: Optional[int]) -> bool:
+        """Объявление уже встречалось: в известных ID или не новее высшей отметки"""
+        if property_id in self.known_ids:
+            return True
+        return high_water is not None and property_id.isdigit() and int(property_id) <= high_water
+    
     async def _collect_property_urls_on_page(self, page) -> List[str]:
         """Собирает ссылки на объявления с одной страницы"""
         try:
@@ -298,13 +530,15 @@ class ProductionDaftParser:
     async def _parse_property(self, page, url: str) -> Optional[Dict[str, Any]]:
         """Парсит отдельную страницу объявления"""
         try:
-            await page.goto(url, wait_until='domcontentloaded', timeout=self.property_timeout)
-            await page.wait_for_timeout(1500)
+            with PAGE_LOAD_SECONDS.time(parser=METRICS_NAME, kind="detail"):
+                await page.goto(url, wait_until='domcontentloaded', timeout=self.property_timeout)
+            await page.wait_for_timeout(self.detail_settle_delay)
             
             # Получаем содержимое страницы
             page_content = await page.content()
             
             # Извлекаем данные
+            extract_started = time.perf_counter()
             property_data = {
                 'url': url,
                 'property_id': self._get_property_id(url),
@@ -320,6 +554,7 @@ class ProductionDaftParser:
                 'posted_date': self._extract_posted_date(page_content),
                 'parsed_at': datetime.datetime.now().isoformat()
             }
+            PARSE_SECONDS.observe(time.perf_counter() - extract_started, parser=METRICS_NAME, phase="extract")
             
             return property_data
             
@@ -671,13 +906,15 @@ class ProductionDaftParser:
         return True
     
     def _log_property_summary(self, prop: Dict[str, Any]):
-        """Логирует краткую информацию об объявлении"""
+        """Логирует краткую информацию об объявлении (уровень DEBUG)"""
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
         title = prop.get('title', 'Без названия')[:40]
         price = f"€{prop['price']}" if prop.get('price') else 'Цена не указана'
         bedrooms = f"{prop['bedrooms']} спален" if prop.get('bedrooms') else 'Спальни не указаны'
         location = prop.get('location', 'Локация не указана')
         
-        self.logger.info(f"✅ {title} | {price} | {bedrooms} | {location}")
+        self.logger.debug("✅ %s | %s | %s | %s", title, price, bedrooms, location)
     
     def _log_final_statistics(self):
         """Логирует финальную статистику"""
@@ -693,6 +930,9 @@ class ProductionDaftParser:
         self.logger.info(f"✅ Успешно: {self.stats['successful_parses']}")
         self.logger.info(f"❌ Неудачно: {self.stats['failed_parses']}")
         self.logger.info(f"🔄 Повторных попыток: {self.stats['retries']}")
+        self.logger.info(f"♻️ Холостых циклов: {self.stats['noop_cycles']}")
+        if self.stats['incremental_stops']:
+            self.logger.info(f"⏹️ Остановок на известных объявлениях: {self.stats['incremental_stops']}")
         
         if self.stats['total_processed'] > 0:
             success_rate = (self.stats['successful_parses'] / self.stats['total_processed']) * 100
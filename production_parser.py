@@ -5,13 +5,23 @@
 
 import asyncio
 import re
-from typing import List, Dict, Any, Optional
-from playwright.async_api import async_playwright
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
 import json
 import datetime
 import logging
 from pathlib import Path
 
+from parser.browser_pool import browser_pool
+from parser.offload import extract_fields
+from parser.search_cache import NEWEST_FIRST_SORT, SearchPageCache
+from utils.metrics import PAGE_LOAD_SECONDS, PARSE_RESULTS, PARSE_SECONDS, observe_cycle
+from utils.phase_timer import phase_span
+
+logger = logging.getLogger(__name__)
+
+# Метка парсера в метриках
+METRICS_NAME = "enhanced"
+
 class ProductionDaftParser:
     """
     Продакшен-готовый парсер для daft.ie с полной функциональностью
@@ -19,6 +29,8 @@ class ProductionDaftParser:
     
     def __init__(self):
         self.base_url = "https://www.daft.ie"
+        # Хеши списков объявлений по страницам поиска - для пропуска холостых циклов
+        self.page_cache = SearchPageCache()
         
     async def search_properties(
         self, 
@@ -39,109 +51,117 @@ class ProductionDaftParser:
         Returns:
             Список словарей с данными о недвижимости
         """
-        print(f"🔍 ПОИСК: {min_bedrooms}+ спален, до €{max_price}, {location}")
+        return [prop async for prop in self.iter_properties(min_bedrooms, max_price, location, limit)]
+    
+    async def iter_properties(
+        self, 
+        min_bedrooms: int = 3, 
+        max_price: int = 2500, 
+        location: str = "dublin-city", 
+        limit: int = 20,
+        incremental: bool = False,
+        known_urls: Optional[Set[str]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Как search_properties, но отдает каждое подходящее объявление сразу
+        после разбора, не дожидаясь конца поиска.
+        
+        Контекст браузера возвращается в пул при завершении генератора, поэтому при досрочном
+        выходе из цикла используйте contextlib.aclosing().
+        
+        incremental - сортировка "сначала новые" (в limit попадают самые свежие);
+        объявления из known_urls (уже увиденные пользователем) не загружаются.
+        С known_urls кэш страницы поиска не используется: набор известных
+        у каждого пользователя свой.
+        
+        Yields:
+            Словари с данными о недвижимости
+        """
+        logger.info(f"🔍 ПОИСК: {min_bedrooms}+ спален, до €{max_price}, {location}")
         
         # Используем правильную структуру URL для daft.ie
         search_url = f"{self.base_url}/property-for-rent/{location}/houses?rentalPrice_to={max_price}&numBeds_from={min_bedrooms}&pageSize=20"
+        if incremental:
+            search_url = f"{search_url}&{NEWEST_FIRST_SORT}"
         
-        async with async_playwright() as p:
-            browser = None
-            context = None
-            page = None
-            
-            try:
-                browser = await p.chromium.launch(
-                    headless=True,
-                    args=[
-                        '--no-sandbox', 
-                        '--disable-setuid-sandbox', 
-                        '--disable-blink-features=AutomationControlled',
-                        '--disable-background-timer-throttling',
-                        '--disable-backgrounding-occluded-windows',
-                        '--disable-renderer-backgrounding'
-                    ]
-                )
-                
-                context = await browser.new_context(
-                    user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
-                    viewport={'width': 1920, 'height': 1080},
-                    extra_http_headers={
-                        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                        'Accept-Language': 'en-US,en;q=0.5',
-                        'Accept-Encoding': 'gzip, deflate',
-                        'Connection': 'keep-alive',
-                    }
-                )
-                
-                page = await context.new_page()
-            
+        async with browser_pool.page() as page:
             try:
                 # Загружаем страницу поиска
-                print(f"📄 Загружаем страницу поиска: {search_url}")
-                await page.goto(search_url, wait_until='networkidle', timeout=30000)
+                logger.info(f"📄 Загружаем страницу поиска: {search_url}")
+                with PAGE_LOAD_SECONDS.time(parser=METRICS_NAME, kind="search"):
+                    await page.goto(search_url, wait_until='networkidle', timeout=30000)
                 await page.wait_for_timeout(3000)
                 
                 # Получаем общее количество результатов
                 total_count = await self._get_results_count(page)
-                print(f"📊 Доступно объявлений: {total_count}")
+                logger.debug("📊 Доступно объявлений: %s", total_count)
                 
                 # Собираем ссылки на объявления
-                property_urls = await self._collect_property_urls(page)
-                print(f"🔗 Найдено ссылок: {len(property_urls)}")
+                with PARSE_SECONDS.time(parser=METRICS_NAME, phase="links"):
+                    property_urls = await self._collect_property_urls(page)
+                logger.debug("🔗 Найдено ссылок: %d", len(property_urls))
                 
                 # Ограничиваем количество
                 urls_to_process = property_urls[:limit]
-                print(f"📝 Будем обрабатывать: {len(urls_to_process)} объявлений")
+                logger.debug("📝 Будем обрабатывать: %d объявлений", len(urls_to_process))
+                
+                # Список объявлений не изменился с прошлого цикла - детали не загружаем
+                cache_key = f"{search_url}|{limit}"
+                cached_results = None
+                if known_urls is None:
+                    cached_results = self.page_cache.unchanged_results(cache_key, urls_to_process)
+                if cached_results is not None:
+                    logger.info(f"♻️ Список не изменился, прошлый результат: {len(cached_results)} объявлений")
+                    observe_cycle(METRICS_NAME, pages=1, listings=0)
+                    for prop in cached_results:
+                        yield prop
+                    return
                 
                 # Парсим каждое объявление с фильтрацией
                 results = []
                 filtered_out = 0
+                failed = 0
+                known = 0
                 
                 for i, url in enumerate(urls_to_process, 1):
-                    print(f"  {i}/{len(urls_to_process)}: {self._get_property_name(url)}")
+                    if known_urls and url in known_urls:
+                        known += 1
+                        continue
+                    logger.debug("  %d/%d: %s", i, len(urls_to_process), url)
                     
                     property_data = await self._parse_property(page, url)
                     if property_data:
                         # ВАЖНО: Проверяем фильтры перед добавлением
                         if self._validate_property(property_data, min_bedrooms, max_price):
                             results.append(property_data)
+                            PARSE_RESULTS.inc(parser=METRICS_NAME, result="matched")
                             self._print_property_summary(property_data)
+                            yield property_data
                         else:
                             filtered_out += 1
-                            print(f"    🚫 Отфильтровано: {property_data.get('bedrooms', '?')} спален, €{property_data.get('price', '?')}")
+                            PARSE_RESULTS.inc(parser=METRICS_NAME, result="filtered")
+                            logger.debug("    🚫 Отфильтровано: %s спален, €%s", property_data.get('bedrooms', '?'), property_data.get('price', '?'))
                     else:
-                        print("    ❌ Не удалось получить данные")
+                        failed += 1
+                        PARSE_RESULTS.inc(parser=METRICS_NAME, result="failed")
+                        logger.debug("    ❌ Не удалось получить данные: %s", url)
+                
+                # Результат с ошибками не запоминаем - иначе потерянные объявления не вернутся
+                if failed:
+                    self.page_cache.invalidate_results(cache_key)
+                elif known_urls is None:
+                    self.page_cache.store_results(cache_key, urls_to_process, results)
                 
-                print(f"📊 Результат: {len(results)} подходящих, {filtered_out} отфильтрованных")
-                return results
+                observe_cycle(METRICS_NAME, pages=1, listings=len(urls_to_process) - known)
+                logger.info(f"📊 Результат: {len(results)} подходящих, {filtered_out} отфильтрованных, "
+                            f"{failed} с ошибками, {known} уже известных")
                 
             except asyncio.CancelledError:
-                print("🛑 Парсинг был отменен")
+                logger.info("🛑 Парсинг был отменен")
                 raise  # Переподнимаем CancelledError для правильной обработки
                 
             except Exception as e:
-                print(f"❌ Ошибка поиска: {e}")
-                return []
-                
-            finally:
-                # Закрываем ресурсы в обратном порядке
-                try:
-                    if page:
-                        await page.close()
-                except:
-                    pass
-                    
-                try:
-                    if context:
-                        await context.close()
-                except:
-                    pass
-                    
-                try:
-                    if browser:
-                        await browser.close()
-                except:
-                    pass
+                logger.error(f"❌ Ошибка поиска: {e}")
     
     async def _get_results_count(self, page) -> int:
         """Получает общее количество результатов поиска"""
@@ -170,59 +190,29 @@ class ProductionDaftParser:
         except:
             return []
     
-    def _get_property_name(self, url: str) -> str:
-        """Извлекает краткое название из URL"""
-        try:
-            return url.split('/')[-2][:40] + "..." if len(url.split('/')[-2]) > 40 else url.split('/')[-2]
-        except:
-            return "unknown"
-    
     async def _parse_property(self, page, url: str) -> Optional[Dict[str, Any]]:
         """Парсит отдельную страницу объявления"""
         try:
-            await page.goto(url, wait_until='domcontentloaded', timeout=15000)
+            with PAGE_LOAD_SECONDS.time(parser=METRICS_NAME, kind="detail"):
+                await page.goto(url, wait_until='domcontentloaded', timeout=15000)
             await page.wait_for_timeout(2000)
             
-            # Получаем содержимое страницы для поиска данных
+            # Один запрос к браузеру - дальше все поля извлекаются в пуле разбора
             page_content = await page.content()
             
+            try:
+                with PARSE_SECONDS.time(parser=METRICS_NAME, phase="extract"), phase_span("extract"):
+                    fields = await extract_fields(page_content)
+            except Exception as e:
+                logger.warning(f"⚠️ Ошибка извлечения данных {url}: {e}")
+                return None
+            
             property_data = {
                 'url': url,
-                'title': None,
-                'price': None,
-                'bedrooms': None,
-                'property_type': None,
-                'location': None,
-                'description': None,
+                **fields,
                 'parsed_at': datetime.datetime.now().isoformat()
             }
             
-            # Извлекаем данные пошагово с обработкой ошибок
-            try:
-                property_data['title'] = await self._extract_title(page)
-            except Exception as e:
-                print(f"    ⚠️ Ошибка извлечения заголовка: {e}")
-            
-            try:
-                property_data['price'] = await self._extract_price(page, page_content)
-            except Exception as e:
-                print(f"    ⚠️ Ошибка извлечения цены: {e}")
-            
-            try:
-                property_data['bedrooms'] = await self._extract_bedrooms(page, page_content)
-            except Exception as e:
-                print(f"    ⚠️ Ошибка извлечения спален: {e}")
-            
-            try:
-                property_data['property_type'] = self._extract_property_type(page_content)
-                property_data['description'] = self._extract_description(page_content)
-            except Exception as e:
-                print(f"    ⚠️ Ошибка извлечения доп. данных: {e}")
-            
-            # Извлекаем локацию из заголовка
-            if property_data['title']:
-                property_data['location'] = self._extract_location_from_title(property_data['title'])
-            
             # Проверяем, что получили основные данные
             if property_data['title'] or property_data['price']:
                 return property_data
@@ -230,51 +220,9 @@ class ProductionDaftParser:
             return None
             
         except Exception as e:
-            print(f"    ⚠️ Ошибка: {str(e)[:50]}...")
+            logger.warning(f"⚠️ Ошибка загрузки {url}: {str(e)[:200]}")
             return None
-    
-    async def _extract_title(self, page) -> Optional[str]:
-        """Извлекает заголовок объявления"""
-        try:
-            title_element = await page.query_selector('h1')
-            if title_element:
-                title_text = await title_element.text_content()
-                return title_text.strip() if title_text else None
-        except:
-            pass
-        return None
-    
-    async def _extract_price(self, page, page_content: str) -> Optional[int]:
-        """Извлекает цену из разных источников на странице"""
-        # Пробуем селекторы
-        price_selectors = [
-            '[data-testid="price"]',
-            '.TitleBlock_price',
-            'span:has-text("€")',
-            '.price'
-        ]
-        
-        for selector in price_selectors:
-            try:
-                price_element = await page.query_selector(selector)
-                if price_element:
-                    price_text = await price_element.text_content()
-                    price_match = re.search(r'€([\d,]+)', price_text or '')
-                    if price_match:
-                        return int(price_match.group(1).replace(',', ''))
-            except:
-                continue
-        
-        # Ищем в JSON данных
-        try:
-            json_match = re.search(r'"price":\s*(\d+)', page_content)
-            if json_match:
-                return int(json_match.group(1))
-        except:
-            pass
-        
-        return None
-    
+
     def _validate_property(self, property_data: Dict[str, Any], min_bedrooms: int, max_price: int) -> bool:
         """Валидация объявления по фильтрам и реалистичности данных"""
         
@@ -307,161 +255,14 @@ class ProductionDaftParser:
         
         return True
 
-    async def _extract_bedrooms(self, page, page_content: str) -> Optional[int]:
-        """Извлекает количество спален с улучшенной логикой и валидацией"""
-        
-        # Список для сбора всех найденных значений
-        found_bedrooms = []
-        
-        # 1. Ищем в JSON данных
-        try:
-            # Structured data
-            json_match = re.search(r'"numBedrooms":\s*"?(\d+)"?', page_content)
-            if json_match:
-                bedrooms = int(json_match.group(1))
-                if 0 <= bedrooms <= 10:  # Реалистичный диапазон
-                    found_bedrooms.append(bedrooms)
-        except:
-            pass
-        
-        # 2. Ищем в селекторах на странице
-        try:
-            bed_selectors = [
-                '[data-testid="bed-bath"]',
-                '.property-details',
-                '.TitleBlock_meta',
-                '.BdRmBtListing',
-                '[data-testid="beds"]'
-            ]
-            
-            for selector in bed_selectors:
-                element = await page.query_selector(selector)
-                if element:
-                    text = await element.text_content()
-                    if text:  # Проверяем что text не None
-                        # Ищем различные паттерны
-                        patterns = [
-                            r'(\d+)\s*bed',
-                            r'(\d+)\s*bedroom',
-                            r'(\d+)\s*br\b',
-                            r'beds?\s*:\s*(\d+)',
-                            r'(\d+)\s*-?\s*bed'
-                        ]
-                        
-                        for pattern in patterns:
-                            matches = re.findall(pattern, text.lower())
-                            for match in matches:
-                                bedrooms = int(match)
-                                if 0 <= bedrooms <= 10:
-                                    found_bedrooms.append(bedrooms)
-        except:
-            pass
-        
-        # 3. Ищем в заголовке страницы
-        try:
-            title_element = await page.query_selector('h1')
-            if title_element:
-                title_text = await title_element.text_content()
-                if title_text:  # Проверяем что title_text не None
-                    patterns = [
-                        r'(\d+)\s*bed',
-                        r'(\d+)\s*bedroom',
-                        r'studio'  # Отдельно обрабатываем studio
-                    ]
-                    
-                    if 'studio' in title_text.lower():
-                        found_bedrooms.append(0)
-                    else:
-                        for pattern in patterns[:2]:  # Только bed/bedroom паттерны
-                            matches = re.findall(pattern, title_text.lower())
-                            for match in matches:
-                                bedrooms = int(match)
-                                if 0 <= bedrooms <= 10:
-                                    found_bedrooms.append(bedrooms)
-        except:
-            pass
-        
-        # 4. Последний шанс - ищем в тексте страницы (более осторожно)
-        try:
-            # Ищем только четкие упоминания
-            bed_patterns = [
-                r'(\d+)\s*bedroom\s*(?:house|apartment|flat)',
-                r'(?:house|apartment|flat).*?(\d+)\s*bedroom',
-                r'(\d+)\s*bed\s*(?:house|apartment|flat)',
-            ]
-            
-            for pattern in bed_patterns:
-                matches = re.findall(pattern, page_content.lower())
-                for match in matches:
-                    bedrooms = int(match)
-                    if 0 <= bedrooms <= 10:
-                        found_bedrooms.append(bedrooms)
-        except:
-            pass
-        
-        # Анализируем найденные значения
-        if found_bedrooms:
-            # Удаляем дубликаты и сортируем
-            unique_bedrooms = list(set(found_bedrooms))
-            
-            # Если все значения одинаковые - берем его
-            if len(unique_bedrooms) == 1:
-                return unique_bedrooms[0]
-            
-            # Если есть разные значения, берем наиболее часто встречающееся
-            from collections import Counter
-            counter = Counter(found_bedrooms)
-            most_common = counter.most_common(1)[0][0]
-            
-            # Дополнительная проверка: если наиболее частое значение кажется неразумным,
-            # берем наименьшее разумное значение
-            if most_common > 6:  # Очень много спален
-                reasonable_values = [b for b in unique_bedrooms if 1 <= b <= 6]
-                if reasonable_values:
-                    return min(reasonable_values)
-            
-            return most_common
-        
-        # Если ничего не найдено, возвращаем None
-        return None
-    
-    def _extract_property_type(self, page_content: str) -> Optional[str]:
-        """Извлекает тип недвижимости"""
-        try:
-            type_match = re.search(r'"propertyType":\s*"([^"]*)"', page_content)
-            if type_match:
-                return type_match.group(1)
-        except:
-            pass
-        return None
-    
-    def _extract_description(self, page_content: str, max_length: int = 200) -> Optional[str]:
-        """Извлекает описание объявления"""
-        try:
-            desc_match = re.search(r'"description":\s*"([^"]*)"', page_content)
-            if desc_match:
-                description = desc_match.group(1)
-                return description[:max_length] + "..." if len(description) > max_length else description
-        except:
-            pass
-        return None
-    
-    def _extract_location_from_title(self, title: str) -> Optional[str]:
-        """Извлекает локацию из заголовка"""
-        try:
-            location_match = re.search(r'Dublin\s+\d+|Dublin\s+\w+', title)
-            if location_match:
-                return location_match.group()
-        except:
-            pass
-        return None
-    
     def _print_property_summary(self, prop: Dict[str, Any]):
-        """Выводит краткую информацию об объявлении"""
+        """Логирует краткую информацию об объявлении (уровень DEBUG)"""
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
         title = prop.get('title', 'Без названия')[:50]
         price = f"€{prop['price']}" if prop.get('price') else 'Цена не указана'
         beds = f"{prop['bedrooms']} спален" if prop.get('bedrooms') else 'Спальни не указаны'
-        print(f"    ✅ {title} - {price}, {beds}")
+        logger.debug("    ✅ %s - %s, %s", title, price, beds)
     
     def format_results(self, results: List[Dict[str, Any]], show_details: bool = True) -> str:
         """Форматирует результаты для вывода"""
@@ -519,6 +320,9 @@ class ProductionDaftParser:
 
 async def main():
     """Основная функция для демонстрации"""
+    # Ход поиска по объявлениям - на уровне DEBUG
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logger.setLevel(logging.DEBUG)
     print("🚀 DAFT.IE PRODUCTION PARSER")
     print("=" * 50)
     
@@ -4,13 +4,12 @@ JSON-парсер для извлечения реальных данных из
 """
 import asyncio
 import aiohttp
-import json
 import random
-import re
 from typing import List, Dict, Optional
-from bs4 import BeautifulSoup
 import logging
 
+from parser.next_data import parse_next_data
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -20,6 +19,8 @@ class RealDaftParser:
     def __init__(self):
         self.base_url = "https://www.daft.ie"
         self.session = None
+        # Случайная пауза перед запросом, секунды (от, до)
+        self.request_delay = (2.0, 4.0)
     
     async def get_session(self):
         """Создание сессии с настройками"""
@@ -54,7 +55,7 @@ class RealDaftParser:
         session = await self.get_session()
         
         # Случайная задержка
-        delay = random.uniform(2.0, 4.0)
+        delay = random.uniform(*self.request_delay)
         logger.info(f"Fetching {url} with delay {delay:.1f}s")
         await asyncio.sleep(delay)
         
@@ -67,27 +68,13 @@ class RealDaftParser:
                 html = await response.text()
                 logger.info(f"Received HTML: {len(html)} characters")
                 
-                # Парсим HTML и ищем __NEXT_DATA__
-                soup = BeautifulSoup(html, 'html.parser')
-                
-                # Ищем скрипт с __NEXT_DATA__
-                script_tag = soup.find('script', string=lambda text: text and '__NEXT_DATA__' in text)
+                # Находим __NEXT_DATA__ по смещению и разбираем только его JSON
+                data = parse_next_data(html)
                 
-                if not script_tag:
+                if data is None:
                     logger.error("__NEXT_DATA__ not found")
                     return None
                 
-                # Извлекаем JSON
-                script_content = script_tag.string
-                match = re.search(r'__NEXT_DATA__\s*=\s*({.*?});?\s*$', script_content, re.MULTILINE | re.DOTALL)
-                
-                if not match:
-                    logger.error("Failed to extract JSON from __NEXT_DATA__")
-                    return None
-                
-                json_str = match.group(1)
-                data = json.loads(json_str)
-                
                 logger.info("Successfully parsed __NEXT_DATA__")
                 return data
                 
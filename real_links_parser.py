@@ -8,10 +8,11 @@ import json
 import random
 import re
 from typing import List, Dict, Optional
-from bs4 import BeautifulSoup
 import logging
 from datetime import datetime
 
+from utils.html_parsing import make_soup
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -204,7 +205,7 @@ class RealLinksDaftParser:
     
     def parse_property_details(self, content: str, url: str) -> Dict:
         """Парсинг деталей объявления"""
-        soup = BeautifulSoup(content, 'html.parser')
+        soup = make_soup(content)
         
         # Извлекаем заголовок
         title_selectors = [
@@ -15,6 +15,8 @@ from typing import List, Dict, Any
 import aiohttp
 from dotenv import load_dotenv
 
+from utils.rendering import render_property_message
+
 # Загружаем переменные окружения
 load_dotenv()
 
@@ -82,31 +84,7 @@ class TelegramSender:
     
     def format_property_message(self, prop: Dict[str, Any]) -> str:
         """Форматирует объявление для отправки в Telegram"""
-        title = prop.get('title', 'Без названия')
-        price = f"€{prop['price']}" if prop.get('price') else 'Цена не указана'
-        bedrooms = prop.get('bedrooms', 'Не указано')
-        location = prop.get('location', 'Локация не указана')
-        url = prop.get('url', '')
-        
-        # Форматируем спальни
-        if bedrooms == 0:
-            bed_text = "Studio"
-        elif bedrooms == 1:
-            bed_text = "1 спальня"
-        elif bedrooms in [2, 3, 4]:
-            bed_text = f"{bedrooms} спальни"
-        else:
-            bed_text = f"{bedrooms} спален"
-        
-        message = f"""🏠 <b>{title}</b>
-
-💰 <b>Цена:</b> {price}
-🛏️ <b>Спальни:</b> {bed_text}
-📍 <b>Район:</b> {location}
-
-🔗 <a href="{url}">Посмотреть на Daft.ie</a>"""
-        
-        return message
+        return render_property_message(prop, fmt="html")
     
     async def send_properties(self, properties: List[Dict[str, Any]]) -> int:
         """Отправляет список объявлений в Telegram"""
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Тестирование инкрементального обхода ProductionDaftParser без браузера
+
+Страницы поиска и объявления подменяются заглушками. Проверяется, что
+высшая отметка запроса не перескакивает через объявление, которое не
+удалось загрузить, и что в следующем цикле оно загружается снова.
+"""
+
+import asyncio
+import os
+import tempfile
+
+from database.database import EnhancedDatabase
+from production_daft_parser import ProductionDaftParser
+
+QUERY = "https://www.daft.ie/property-for-rent/dublin?numBeds_from=3"
+LISTINGS = [f"https://www.daft.ie/for-rent/house-{listing_id}/{listing_id}" for listing_id in (105, 104, 103, 102, 101)]
+
+
+class StubPage:
+    async def goto(self, url, **kwargs):
+        pass
+
+    async def wait_for_timeout(self, ms):
+        pass
+
+
+class StubContext:
+    async def new_page(self):
+        return StubPage()
+
+
+def make_parser(failing_ids, fetched):
+    parser = ProductionDaftParser()
+    parser.search_settle_delay = 0
+    parser.request_pause = 0
+
+    async def collect_on_page(page):
+        return list(LISTINGS)
+
+    async def results_count(page):
+        return len(LISTINGS)
+
+    async def parse_with_retry(page, url):
+        listing_id = parser._get_property_id(url)
+        fetched.append(listing_id)
+        if listing_id in failing_ids:
+            return None
+        return {'url': url, 'title': f"House {listing_id}", 'price': 2000, 'bedrooms': 3}
+
+    parser._collect_property_urls_on_page = collect_on_page
+    parser._get_results_count = results_count
+    parser._parse_property_with_retry = parse_with_retry
+    return parser
+
+
+async def run_cycle(parser):
+    return await parser._run_pipeline(StubContext(), QUERY, max_pages=1, query_key=QUERY, incremental=True)
+
+
+def test_failed_listing_retried_next_cycle():
+    """Объявление с ошибкой загрузки разбирается в следующем цикле"""
+    cwd = os.getcwd()
+    os.chdir(tempfile.mkdtemp(prefix="incremental-crawl-"))
+    try:
+        fetched = []
+        parser = make_parser({"103"}, fetched)
+        results = asyncio.run(run_cycle(parser))
+
+        assert sorted(fetched) == ["101", "102", "103", "104", "105"]
+        assert len(results) == 4
+        # Отметка останавливается перед объявлением с ошибкой
+        assert parser._get_high_water(QUERY) == 102
+
+        # Тот же процесс: разобранные объявления известны, повторяется только 103
+        fetched.clear()
+        retry_parser = make_parser(set(), fetched)
+        retry_parser.known_ids = set(parser.known_ids)
+        results = asyncio.run(run_cycle(retry_parser))
+
+        assert fetched == ["103"]
+        assert [result['url'] for result in results] == [LISTINGS[2]]
+        assert retry_parser._get_high_water(QUERY) == 105
+
+        # Перезапуск: отметка сохранена в файле, новых объявлений нет
+        fetched.clear()
+        restarted = make_parser(set(), fetched)
+        assert asyncio.run(run_cycle(restarted)) == []
+        assert fetched == []
+    finally:
+        os.chdir(cwd)
+
+
+def test_first_cycle_parses_new_listings():
+    """Первый инкрементальный цикл разбирает все новые объявления"""
+    cwd = os.getcwd()
+    os.chdir(tempfile.mkdtemp(prefix="incremental-crawl-"))
+    try:
+        fetched = []
+        parser = make_parser(set(), fetched)
+        results = asyncio.run(run_cycle(parser))
+
+        assert len(results) == len(LISTINGS)
+        assert parser._get_high_water(QUERY) == 105
+    finally:
+        os.chdir(cwd)
+
+
+def test_known_ids_seeded_from_history():
+    """Объявления из property_history бота не разбираются"""
+    cwd = os.getcwd()
+    os.chdir(tempfile.mkdtemp(prefix="incremental-crawl-"))
+    try:
+        async def seen_urls():
+            db = EnhancedDatabase("history.db", result_cache_spill=False)
+            await db.init_database()
+            for url in LISTINGS[:2]:
+                await db.add_property_to_history(1, {'url': url}, {})
+            return await db.get_seen_property_urls()
+
+        fetched = []
+        parser = make_parser(set(), fetched)
+        parser.seed_known_ids(asyncio.run(seen_urls()))
+        asyncio.run(run_cycle(parser))
+
+        assert sorted(fetched) == ["101", "102", "103"]
+    finally:
+        os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    test_first_cycle_parses_new_listings()
+    test_failed_listing_retried_next_cycle()
+    test_known_ids_seeded_from_history()
+    print("✅ Инкрементальный обход: все проверки пройдены")
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Тестирование экранирования объявлений под parse_mode, с которым они отправляются
+
+Объявления уходят в legacy Markdown: экранируются только _ * ` [, а точки,
+дефисы и скобки остаются как есть - иначе Telegram покажет обратные косые
+черты ("Dublin 4\\.").
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from bot.bot import EnhancedPropertyBot
+from bot.send_throttle import ChatSendThrottle
+from utils.rendering import MARKDOWN_PARSE_MODE, PropertyMessageRenderer
+
+PROP = {
+    'url': "https://www.daft.ie/for-rent/house-ballsbridge/7000001",
+    'title': "2-bed (top floor). Ballsbridge_Court *new*",
+    'price': 2400,
+    'bedrooms': 2,
+    'location': "Dublin 4.",
+    'property_type': "Apartment",
+}
+
+
+def test_markdown_escaping_legacy():
+    """Экранируются только символы legacy Markdown"""
+    message = PropertyMessageRenderer().render(PROP)
+
+    assert "2-bed (top floor). Ballsbridge\\_Court \\*new\\*" in message
+    assert "📍 Dublin 4.\n" in message
+    for char in ".-(":
+        assert f"\\{char}" not in message
+
+
+def test_sent_with_matching_parse_mode():
+    """Объявления мониторинга отправляются в том parse_mode, под который экранированы"""
+    sent = []
+
+    async def send_message(chat_id, text, parse_mode=None, **kwargs):
+        sent.append((text, parse_mode))
+
+    async def mark_properties_as_sent(user_id, urls):
+        pass
+
+    stub = SimpleNamespace(
+        bot=SimpleNamespace(send_message=send_message),
+        db=SimpleNamespace(mark_properties_as_sent=mark_properties_as_sent),
+        send_throttle=ChatSendThrottle(interval=0),
+        _format_property_message=lambda prop: EnhancedPropertyBot._format_property_message(None, prop),
+    )
+    asyncio.run(EnhancedPropertyBot._send_new_properties(stub, 1, [PROP]))
+
+    assert MARKDOWN_PARSE_MODE == "Markdown"
+    assert [parse_mode for _, parse_mode in sent] == [MARKDOWN_PARSE_MODE]
+    assert "Dublin 4.\n" in sent[0][0]
+
+
+if __name__ == "__main__":
+    test_markdown_escaping_legacy()
+    test_sent_with_matching_parse_mode()
+    print("✅ Рендеринг объявлений: все проверки пройдены")
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Общий разбор HTML для парсеров на BeautifulSoup
+
+make_soup() строит дерево на lxml (есть в requirements.txt), а если lxml
+не установлен - на html.parser. Когда парсеру нужны только ссылки или
+скрипты, дерево строится частично через SoupStrainer: остальные теги
+отбрасываются еще при разборе. Для списка href BeautifulSoup не нужен
+вовсе - lxml разбирает документ в C, и читаются только атрибуты <a>.
+"""
+
+import logging
+from typing import List, Optional
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    from lxml import etree, html as lxml_html
+except ImportError:  # lxml не обязателен - работаем медленнее через html.parser
+    etree = lxml_html = None
+
+logger = logging.getLogger(__name__)
+
+HTML_BACKEND = 'lxml' if lxml_html is not None else 'html.parser'
+
+# Частичный разбор: только нужные теги (вместе с их содержимым)
+LINKS_ONLY = SoupStrainer('a', href=True)
+LINKS_AND_SCRIPTS = SoupStrainer(['a', 'script'])
+
+_UTF8_PARSER = lxml_html.HTMLParser(encoding='utf-8') if lxml_html is not None else None
+
+
+def make_soup(html: str, parse_only: Optional[SoupStrainer] = None) -> BeautifulSoup:
+    """Дерево BeautifulSoup на самом быстром доступном парсере"""
+    return BeautifulSoup(html, HTML_BACKEND, parse_only=parse_only)
+
+
+def extract_hrefs(html: str) -> List[str]:
+    """Значения href всех ссылок страницы в порядке появления"""
+    if lxml_html is None:
+        return [link['href'] for link in make_soup(html, LINKS_ONLY).find_all('a', href=True)]
+
+    if not html:
+        return []
+    try:
+        # Байты с явной кодировкой: lxml не принимает str с XML-декларацией
+        tree = lxml_html.document_fromstring(html.encode('utf-8', 'replace'), parser=_UTF8_PARSER)
+    except (etree.ParserError, ValueError) as e:
+        logger.debug(f"lxml не смог разобрать страницу: {e}")
+        return []
+    return [str(href) for href in tree.xpath('//a/@href')]
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Неблокирующее логирование: QueueHandler + QueueListener
+
+Логгеры пишут записи в очередь, а файл и консоль обслуживает отдельный
+поток QueueListener, так что запись на диск больше не выполняется в
+потоке event loop. В файл пишутся JSON-строки (по одному объекту на
+запись, LOG_JSON=false - прежний текстовый формат), в консоль - текст.
+
+Уровни задаются на уровне логгеров: LOG_LEVEL для корня и LOG_MODULE_LEVELS
+для отдельных модулей, например "parser=DEBUG,aiogram.event=WARNING".
+Отключенные уровни отсекаются в logger.debug() до создания записи и
+форматирования сообщения.
+"""
+
+import atexit
+import json
+import logging
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+from typing import Dict, Optional
+
+# Поля LogRecord, которые не попадают в JSON как extra
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись - одна JSON-строка"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        # logger.info(..., extra={...}) - дополнительные поля записи
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and key not in entry:
+                entry[key] = value if isinstance(value, (str, int, float, bool, type(None))) else repr(value)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _RecordQueueHandler(QueueHandler):
+    """QueueHandler, сохраняющий трассировку отдельно от сообщения
+
+    Стандартный prepare() вклеивает трассировку в текст сообщения; здесь
+    сообщение и трассировка форматируются заранее (аргументы и exc_info
+    нельзя безопасно передавать в другой поток), но остаются разными полями.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        prepared = logging.makeLogRecord(record.__dict__)
+        prepared.msg = message
+        prepared.message = message
+        prepared.args = None
+        prepared.exc_info = None
+        return prepared
+
+
+def parse_module_levels(spec: str) -> Dict[str, int]:
+    """"parser=DEBUG,aiogram.event=WARNING" -> {"parser": 10, "aiogram.event": 30}"""
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        name, level = name.strip(), level.strip().upper()
+        if not name or not level:
+            continue
+        value = logging.getLevelName(level)
+        if isinstance(value, int):
+            levels[name] = value
+        else:
+            print(f"⚠️ Неизвестный уровень логирования {level} для {name}", file=sys.stderr)
+    return levels
+
+
+def setup_logging(level: str = "INFO", log_file: Optional[str] = None, json_lines: bool = True,
+                  module_levels: str = "", text_format: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s") -> QueueListener:
+    """Настраивает корневой логгер на очередь и запускает поток записи
+
+    Повторный вызов останавливает прежний поток и заменяет обработчики.
+    """
+    global _listener
+    stop_logging()
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter(text_format))
+    handlers = [console]
+    if log_file:
+        Path(log_file).parent.mkdir(parents=True, exist_ok=True)
+        file_handler = logging.FileHandler(log_file, encoding="utf-8")
+        file_handler.setFormatter(JsonFormatter() if json_lines else logging.Formatter(text_format))
+        handlers.append(file_handler)
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(_RecordQueueHandler(log_queue))
+    root.setLevel(getattr(logging, level.upper(), logging.INFO))
+
+    for name, module_level in parse_module_levels(module_levels).items():
+        logging.getLogger(name).setLevel(module_level)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging():
+    """Дописывает очередь и останавливает поток записи"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+# Записи, сделанные до выхода, не теряются
+atexit.register(stop_logging)
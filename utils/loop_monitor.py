@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Мониторинг задержки event loop
+
+В одном event loop работают IPC Playwright, потоки aiosqlite и HTTP
+запросы к Telegram, и любой синхронный участок задерживает все остальное.
+Фоновая корутина засыпает на LOOP_LAG_INTERVAL и измеряет, насколько
+позже она проснулась; по последним замерам считаются p50/p95/p99.
+Задержки выше SLOW_CALLBACK_MS пишутся в лог как зависания. С
+LOOP_DEBUG=true asyncio дополнительно называет конкретный медленный
+колбэк (режим отладки заметно замедляет loop, только для диагностики).
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _quantile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class LoopLagMonitor:
+    """Скользящие перцентили задержки event loop"""
+
+    def __init__(self, interval: float = 0.5, window: int = 1200, slow_threshold: float = 0.1):
+        self.interval = interval
+        self.slow_threshold = slow_threshold
+        self._samples: "deque[float]" = deque(maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+
+        self.total_samples = 0
+        self.total_lag = 0.0
+        self.stalls = 0
+        self.max_lag = 0.0
+        self.started_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, debug: bool = False):
+        """Запускает замеры в текущем event loop"""
+        if self.running:
+            return
+        loop = asyncio.get_running_loop()
+        # Порог для отчетов asyncio о медленных колбэках (действует в режиме отладки)
+        loop.slow_callback_duration = self.slow_threshold
+        if debug:
+            loop.set_debug(True)
+            logging.getLogger('asyncio').setLevel(logging.WARNING)
+
+        self.started_at = time.time()
+        self._task = asyncio.create_task(self._run(), name="loop-lag-monitor")
+        logger.info(f"⏱️ Мониторинг event loop: замер каждые {self.interval * 1000:.0f} ms, "
+                    f"порог зависания {self.slow_threshold * 1000:.0f} ms")
+
+    async def stop(self):
+        """Останавливает замеры"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.record(max(0.0, loop.time() - expected))
+
+    def record(self, lag: float):
+        """Учитывает один замер задержки (секунды)"""
+        self._samples.append(lag)
+        self.total_samples += 1
+        self.total_lag += lag
+        self.max_lag = max(self.max_lag, lag)
+        if lag >= self.slow_threshold:
+            self.stalls += 1
+            logger.warning(f"🐢 Event loop был заблокирован {lag * 1000:.0f} ms")
+
+    def snapshot(self) -> Dict[str, float]:
+        """Перцентили по окну последних замеров (секунды)"""
+        ordered = sorted(self._samples)
+        result = {f"p{int(q * 100)}": _quantile(ordered, q) if ordered else 0.0 for q in QUANTILES}
+        result.update({
+            'window_max': ordered[-1] if ordered else 0.0,
+            'max': self.max_lag,
+            'samples': self.total_samples,
+            'stalls': self.stalls,
+        })
+        return result
+
+    def format_status(self) -> str:
+        """Блок для /status администратора"""
+        if not self.total_samples:
+            return "⏱️ **Event loop:** нет замеров"
+        snap = self.snapshot()
+        return (
+            f"⏱️ **Event loop:** p50 {snap['p50'] * 1000:.1f} ms, "
+            f"p95 {snap['p95'] * 1000:.1f} ms, p99 {snap['p99'] * 1000:.1f} ms\n"
+            f"🐢 Зависаний > {self.slow_threshold * 1000:.0f} ms: {self.stalls}, "
+            f"максимум {self.max_lag * 1000:.0f} ms"
+        )
+
+    def render_metrics(self) -> str:
+        """Метрики в текстовом формате Prometheus"""
+        snap = self.snapshot()
+        lines = [
+            "# HELP daftbot_loop_lag_seconds Event loop wake-up lag over the recent window",
+            "# TYPE daftbot_loop_lag_seconds summary",
+        ]
+        for q in QUANTILES:
+            lines.append(f'daftbot_loop_lag_seconds{{quantile="{q}"}} {snap[f"p{int(q * 100)}"]:.6f}')
+        lines += [
+            f"daftbot_loop_lag_seconds_sum {self.total_lag:.6f}",
+            f"daftbot_loop_lag_seconds_count {self.total_samples}",
+            "# HELP daftbot_loop_lag_max_seconds Maximum event loop lag since start",
+            "# TYPE daftbot_loop_lag_max_seconds gauge",
+            f"daftbot_loop_lag_max_seconds {self.max_lag:.6f}",
+            "# HELP daftbot_loop_stalls_total Lag samples above the slow callback threshold",
+            "# TYPE daftbot_loop_stalls_total counter",
+            f"daftbot_loop_stalls_total {self.stalls}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+# Глобальный экземпляр
+loop_monitor = LoopLagMonitor(
+    interval=settings.LOOP_LAG_INTERVAL,
+    slow_threshold=settings.SLOW_CALLBACK_MS / 1000,
+)
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Реестр метрик парсера, базы данных и Telegram
+
+Счетчики, gauge и гистограммы в памяти процесса с выводом в текстовом
+формате Prometheus (его отдает utils.metrics_server на /metrics). Внешние
+библиотеки и сервисы не нужны. Кэши регистрируются через track_cache и
+опрашиваются только при выводе, поэтому на горячем пути счетчики кэшей
+не трогаются.
+"""
+
+import functools
+import inspect
+import logging
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "daftbot_"
+
+# Границы гистограмм (секунды)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PAGE_LOAD_BUCKETS = (0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 8.0, 13.0, 20.0, 30.0)
+# Границы для количеств за цикл
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Общая часть метрик: имя, описание, значения по набору меток"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # Метрики обновляются и из потоков пула разбора
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: ожидаются метки {self.labelnames}, получены {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Монотонно растущий счетчик"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_number(value)}"
+                for key, value in values]
+
+
+class Gauge(_Metric):
+    """Текущее значение; может вычисляться функцией при выводе"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._functions: Dict[LabelValues, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float], **labels):
+        """Значение вычисляется при каждом выводе метрик"""
+        self._functions[self._key(labels)] = function
+
+    def value(self, **labels) -> float:
+        key = self._key(labels)
+        if key in self._functions:
+            return self._functions[key]()
+        return self._values.get(key, 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        for key, function in self._functions.items():
+            try:
+                values[key] = function()
+            except Exception as e:
+                logger.debug(f"{self.name}: ошибка вычисления значения: {e}")
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_number(value)}"
+                for key, value in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    """Распределение значений по корзинам"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # метки -> [счетчики по корзинам, сумма, количество]
+        self._values: Dict[LabelValues, List[Any]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Замеряет длительность блока with"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total, count))
+                            for key, (counts, total, count) in self._values.items())
+        lines = []
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = f'le="{_format_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total!r}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Все метрики процесса и отслеживаемые кэши"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        # имя кэша -> слабые ссылки на объекты с атрибутами hits/misses
+        self._caches: Dict[str, List[weakref.ref]] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def track_cache(self, name: str, cache: Any):
+        """Отслеживает попадания кэша (объект с атрибутами hits и misses)"""
+        refs = self._caches.setdefault(name, [])
+        refs[:] = [ref for ref in refs if ref() is not None]
+        refs.append(weakref.ref(cache))
+
+    def cache_stats(self) -> Dict[str, Tuple[int, int]]:
+        """(попадания, промахи) по имени кэша, суммарно по живым экземплярам"""
+        stats = {}
+        for name, refs in self._caches.items():
+            hits = misses = 0
+            for ref in refs:
+                cache = ref()
+                if cache is not None:
+                    hits += cache.hits
+                    misses += cache.misses
+            stats[name] = (hits, misses)
+        return stats
+
+    def _render_caches(self) -> List[str]:
+        stats = self.cache_stats()
+        if not stats:
+            return []
+        lines = [
+            f"# HELP {PREFIX}cache_hits_total Cache hits",
+            f"# TYPE {PREFIX}cache_hits_total counter",
+        ]
+        lines += [f'{PREFIX}cache_hits_total{{cache="{name}"}} {hits}' for name, (hits, _) in sorted(stats.items())]
+        lines += [
+            f"# HELP {PREFIX}cache_misses_total Cache misses",
+            f"# TYPE {PREFIX}cache_misses_total counter",
+        ]
+        lines += [f'{PREFIX}cache_misses_total{{cache="{name}"}} {misses}' for name, (_, misses) in sorted(stats.items())]
+        lines += [
+            f"# HELP {PREFIX}cache_hit_ratio Cache hit ratio since start",
+            f"# TYPE {PREFIX}cache_hit_ratio gauge",
+        ]
+        for name, (hits, misses) in sorted(stats.items()):
+            ratio = hits / (hits + misses) if hits + misses else 0.0
+            lines.append(f'{PREFIX}cache_hit_ratio{{cache="{name}"}} {ratio:.4f}')
+        return lines
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus"""
+        lines = []
+        for metric in self._metrics.values():
+            samples = metric.render()
+            if samples:
+                lines += metric.header() + samples
+        lines += self._render_caches()
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+def timed_methods(histogram: Histogram, label: str = "method"):
+    """Декоратор класса: длительность каждого публичного async метода в histogram"""
+    def decorate(cls):
+        for name, method in list(vars(cls).items()):
+            if name.startswith("_") or not inspect.iscoroutinefunction(method):
+                continue
+            setattr(cls, name, _timed(method, histogram, label, name))
+        return cls
+    return decorate
+
+
+def _timed(method, histogram: Histogram, label: str, name: str):
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - started, **{label: name})
+    return wrapper
+
+
+# Глобальный реестр
+metrics = MetricsRegistry()
+
+# === ПАРСЕР ===
+PAGE_LOAD_SECONDS = metrics.histogram(
+    "page_load_seconds", "Browser/HTTP page load time", ("parser", "kind"), PAGE_LOAD_BUCKETS)
+PARSE_SECONDS = metrics.histogram(
+    "parse_seconds", "Parsing time per phase", ("parser", "phase"))
+CYCLE_PAGES = metrics.histogram(
+    "cycle_pages", "Search pages loaded per cycle", ("parser",), COUNT_BUCKETS)
+CYCLE_LISTINGS = metrics.histogram(
+    "cycle_listings", "Listings parsed per cycle", ("parser",), COUNT_BUCKETS)
+PARSE_RESULTS = metrics.counter(
+    "parse_results_total", "Parsed listings by outcome", ("parser", "result"))
+BROWSER_EVENTS = metrics.counter(
+    "browser_events_total", "Shared browser lifecycle events (launch, crash, probe_failed, ...)", ("event",))
+BROWSER_MEMORY_BYTES = metrics.gauge(
+    "browser_memory_bytes", "Memory (PSS) of each shared browser process tree", ("browser",))
+
+# === БАЗА ДАННЫХ ===
+DB_QUERY_SECONDS = metrics.histogram(
+    "db_query_seconds", "Database method latency", ("method",))
+
+# === TELEGRAM ===
+TELEGRAM_REQUEST_SECONDS = metrics.histogram(
+    "telegram_request_seconds", "Telegram Bot API request latency", ("method",))
+TELEGRAM_RETRY_AFTER = metrics.counter(
+    "telegram_retry_after_total", "Telegram 429 Too Many Requests responses", ("method",))
+TELEGRAM_ERRORS = metrics.counter(
+    "telegram_errors_total", "Failed Telegram Bot API requests", ("method",))
+
+# === МОНИТОРИНГ ===
+MONITORING_TASKS = metrics.gauge(
+    "monitoring_tasks_active", "Running per-user monitoring tasks")
+
+
+def observe_cycle(parser: str, pages: int, listings: int):
+    """Учитывает завершенный цикл поиска"""
+    CYCLE_PAGES.observe(pages, parser=parser)
+    CYCLE_LISTINGS.observe(listings, parser=parser)
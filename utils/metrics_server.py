@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+HTTP endpoint с метриками в текстовом формате Prometheus
+
+Сервер работает в том же event loop, что и бот, и на каждый запрос
+/metrics склеивает вывод зарегистрированных источников. Внешние сервисы
+не нужны: метрики можно смотреть curl'ом или собирать Prometheus.
+
+    curl http://127.0.0.1:9108/metrics
+"""
+
+import logging
+from typing import Callable, List, Optional
+
+from aiohttp import web
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_collectors: List[Callable[[], str]] = []
+
+
+def add_collector(render: Callable[[], str]):
+    """Регистрирует источник метрик (функция, возвращающая текст)"""
+    if render not in _collectors:
+        _collectors.append(render)
+
+
+def render_all() -> str:
+    """Метрики всех источников"""
+    parts = []
+    for render in _collectors:
+        try:
+            parts.append(render())
+        except Exception as e:
+            logger.error(f"❌ Ошибка сбора метрик {render}: {e}")
+    return "".join(parts)
+
+
+async def _handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(body=render_all().encode("utf-8"), headers={"Content-Type": CONTENT_TYPE})
+
+
+async def start_metrics_server(host: Optional[str] = None, port: Optional[int] = None) -> Optional[web.AppRunner]:
+    """Запускает сервер метрик; None, если METRICS_PORT=0"""
+    host = host or settings.METRICS_HOST
+    port = settings.METRICS_PORT if port is None else port
+    if not port:
+        return None
+
+    app = web.Application()
+    app.router.add_get("/metrics", _handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+    except OSError as e:
+        logger.error(f"❌ Не удалось запустить сервер метрик на {host}:{port}: {e}")
+        await runner.cleanup()
+        return None
+
+    logger.info(f"📈 Метрики доступны на http://{host}:{port}/metrics")
+    return runner
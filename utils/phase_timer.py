@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Разбивка времени цикла мониторинга по фазам
+
+Цикл мониторинга создает PhaseTimer и делает его текущим (contextvar),
+а парсер и отправка сообщений отмечают свои участки через phase_span()
+без передачи таймера по цепочке вызовов. Участки одного таймера должны
+выполняться последовательно (цикл мониторинга так и устроен).
+
+Вложенные участки исключаются из внешнего: render внутри send учитывается
+только в render. fetch считается остатком - время цикла минус остальные
+фазы (ожидание следующего объявления от парсера).
+
+Фазы:
+    fetch    - загрузка страниц (вместе с паузами парсера)
+    extract  - извлечение полей из HTML
+    dedup    - проверка новых объявлений в БД
+    render   - подготовка текста сообщения
+    send     - отправка в Telegram и отметка отправленных
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+PHASES = ("fetch", "extract", "dedup", "render", "send")
+
+# Подписи фаз для статистики пользователя
+PHASE_TITLES = {
+    "fetch": "Загрузка",
+    "extract": "Разбор",
+    "dedup": "Проверка новых",
+    "render": "Подготовка сообщений",
+    "send": "Отправка",
+}
+
+_current: ContextVar[Optional["PhaseTimer"]] = ContextVar("phase_timer", default=None)
+
+
+class PhaseTimer:
+    """Суммарное время по фазам одного цикла"""
+
+    def __init__(self):
+        self.totals: Dict[str, float] = dict.fromkeys(PHASES, 0.0)
+        self._stack: List[str] = []
+
+    def add(self, phase: str, seconds: float):
+        self.totals[phase] = self.totals.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, phase: str) -> Iterator[None]:
+        """Замеряет блок with в фазу phase (без вложенных фаз)"""
+        parent = self._stack[-1] if self._stack else None
+        self._stack.append(phase)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self._stack.pop()
+            self.add(phase, elapsed)
+            if parent is not None:
+                self.add(parent, -elapsed)
+
+    def remainder(self, phase: str, elapsed: float):
+        """Записывает в phase время цикла, не попавшее в другие фазы"""
+        other = sum(seconds for name, seconds in self.totals.items() if name != phase)
+        self.totals[phase] = max(0.0, elapsed - other)
+
+    @contextmanager
+    def activate(self) -> Iterator["PhaseTimer"]:
+        """Делает таймер текущим для phase_span()"""
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    def as_dict(self) -> Dict[str, float]:
+        """Время по фазам в секундах (с точностью до мс)"""
+        return {phase: round(seconds, 3) for phase, seconds in self.totals.items()}
+
+
+def current_timer() -> Optional[PhaseTimer]:
+    return _current.get()
+
+
+@contextmanager
+def phase_span(phase: str) -> Iterator[None]:
+    """Учитывает блок with в текущем таймере; без таймера ничего не делает"""
+    timer = _current.get()
+    if timer is None:
+        yield
+        return
+    with timer.phase(phase):
+        yield
+
+
+def summarize_phases(rows: List[Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    """Среднее и p95 по каждой фазе для списка разбивок циклов"""
+    summary = {}
+    for phase in PHASES:
+        values = sorted(row[phase] for row in rows if isinstance(row.get(phase), (int, float)))
+        if not values:
+            continue
+        p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+        summary[phase] = {
+            "avg": round(sum(values) / len(values), 2),
+            "p95": round(p95, 2),
+        }
+    return summary
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Память дерева процессов через /proc (Linux, без psutil)
+
+Chromium - это несколько процессов (браузер, GPU, рендереры), которые
+делят библиотеки и часть памяти. Простая сумма VmRSS считает общие
+страницы в каждом процессе, поэтому для дерева берется PSS из
+/proc/<pid>/smaps_rollup (общие страницы делятся между процессами), а
+если он недоступен - VmRSS. Без /proc функции возвращают пустые значения.
+"""
+
+import os
+from typing import Dict, Optional, Set
+
+PROC = "/proc"
+
+
+def process_table() -> Dict[int, int]:
+    """{pid: ppid} всех процессов"""
+    table: Dict[int, int] = {}
+    try:
+        entries = os.scandir(PROC)
+    except OSError:
+        return table
+    with entries:
+        for entry in entries:
+            if not entry.name.isdigit():
+                continue
+            try:
+                with open(f"{PROC}/{entry.name}/stat", "rb") as stat:
+                    data = stat.read()
+            except OSError:
+                continue
+            # Имя процесса в скобках может содержать пробелы и скобки
+            fields = data[data.rfind(b")") + 2:].split()
+            table[int(entry.name)] = int(fields[1])
+    return table
+
+
+def descendants(pid: int, table: Optional[Dict[int, int]] = None) -> Set[int]:
+    """Все потомки процесса"""
+    table = process_table() if table is None else table
+    children: Dict[int, list] = {}
+    for child, parent in table.items():
+        children.setdefault(parent, []).append(child)
+    found: Set[int] = set()
+    stack = list(children.get(pid, ()))
+    while stack:
+        child = stack.pop()
+        if child not in found:
+            found.add(child)
+            stack.extend(children.get(child, ()))
+    return found
+
+
+def process_name(pid: int) -> str:
+    try:
+        with open(f"{PROC}/{pid}/comm", encoding="utf-8", errors="replace") as comm:
+            return comm.read().strip()
+    except OSError:
+        return ""
+
+
+def memory_kb(pid: int) -> int:
+    """PSS процесса в KB (VmRSS, если smaps_rollup недоступен); 0 - процесса нет"""
+    for path, key in ((f"{PROC}/{pid}/smaps_rollup", "Pss:"), (f"{PROC}/{pid}/status", "VmRSS:")):
+        try:
+            with open(path, encoding="ascii", errors="replace") as source:
+                for line in source:
+                    if line.startswith(key):
+                        return int(line.split()[1])
+        except (OSError, ValueError):
+            continue
+    return 0
+
+
+def tree_memory_kb(pid: int, table: Optional[Dict[int, int]] = None) -> int:
+    """Память процесса вместе со всеми потомками, KB"""
+    return sum(memory_kb(member) for member in {pid} | descendants(pid, table))
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Профилирование отдельных циклов мониторинга и поисков по запросу
+
+Администратор включает профилирование следующих N циклов командой
+/profile N (или PROFILE_CYCLES при старте). Каждый цикл мониторинга и
+вызов _perform_search оборачиваются в cycle_profiler.profile(): пока
+профилирование выключено, это проверка одного счетчика и общий no-op
+контекст, без установки профилировщика.
+
+Бэкенды:
+    pyinstrument - семплирующий, async_mode: время ожидания await'ов
+                   приписывается месту ожидания в профилируемой задаче
+    cprofile     - детерминированный из стандартной библиотеки; учитывает
+                   весь поток, то есть и другие задачи event loop'а
+pyinstrument указан в requirements.txt; если он не установлен,
+PROFILE_BACKEND=auto переходит на cProfile. cProfile вызывается на каждый
+вызов функции и замедляет профилируемый цикл (для разбора HTML в
+несколько раз), поэтому его цифры годятся для сравнения функций между
+собой, а не для абсолютного времени цикла. Одновременно профилируется
+один цикл - остальные выполняются без профилировщика и счетчик не тратят.
+
+Профили пишутся в PROFILE_DIR как <вид>_<user_id>_<время с мс>.html (.prof и
+.txt для cProfile); старые профили удаляются сверх PROFILE_MAX_FILES
+(профилей, а не файлов) и PROFILE_MAX_MB.
+"""
+
+import asyncio
+import cProfile
+import io
+import logging
+import pstats
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Deque, Dict, List
+
+from config.settings import settings
+
+try:
+    from pyinstrument import Profiler as PyinstrumentProfiler
+except ImportError:  # pyinstrument не обязателен - профилируем через cProfile
+    PyinstrumentProfiler = None
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("auto", "pyinstrument", "cprofile")
+# Строк в текстовой сводке cProfile
+CPROFILE_SUMMARY_LINES = 40
+
+
+class _NoProfile:
+    """Пустой контекст для выключенного профилирования"""
+
+    async def __aenter__(self):
+        return None
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+_NO_PROFILE = _NoProfile()
+
+
+class _ProfileSession:
+    """Один профилируемый цикл"""
+
+    def __init__(self, owner: "CycleProfiler", kind: str, user_id: int):
+        self.owner = owner
+        self.kind = kind
+        self.user_id = user_id
+        self.backend = owner.backend_name
+        self._profiler = None
+        self._started = 0.0
+
+    async def __aenter__(self):
+        self.owner._active = True
+        if self.backend == "pyinstrument":
+            self._profiler = PyinstrumentProfiler(async_mode="enabled")
+            self._profiler.start()
+        else:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._started = time.perf_counter()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        duration = time.perf_counter() - self._started
+        try:
+            if self.backend == "pyinstrument":
+                self._profiler.stop()
+            else:
+                self._profiler.disable()
+        finally:
+            self.owner._active = False
+
+        try:
+            # Запись и форматирование профиля - вне event loop
+            path = await asyncio.to_thread(self.owner._save, self, duration)
+            logger.info(f"🔬 Профиль {self.kind} пользователя {self.user_id} ({duration:.1f} с): {path}")
+        except Exception as e:
+            logger.error(f"❌ Не удалось сохранить профиль {self.kind} пользователя {self.user_id}: {e}")
+        return False
+
+
+class CycleProfiler:
+    """Профилирование следующих N циклов с ограничением места на диске"""
+
+    def __init__(self, directory: str = "logs/profiles", backend: str = "auto",
+                 max_files: int = 20, max_mb: float = 50, cycles: int = 0):
+        if backend not in BACKENDS:
+            logger.warning(f"⚠️ Неизвестный PROFILE_BACKEND={backend}, используется auto")
+            backend = "auto"
+        if backend == "pyinstrument" and PyinstrumentProfiler is None:
+            logger.warning("⚠️ pyinstrument не установлен, профилирование через cProfile")
+        self.directory = Path(directory)
+        self.backend = backend
+        self.max_files = max_files
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.remaining = max(0, cycles)
+        self.recent: Deque[str] = deque(maxlen=5)
+        self._active = False
+
+    @property
+    def backend_name(self) -> str:
+        if self.backend != "cprofile" and PyinstrumentProfiler is not None:
+            return "pyinstrument"
+        return "cprofile"
+
+    def arm(self, cycles: int):
+        """Профилировать следующие cycles циклов"""
+        self.remaining = max(0, cycles)
+        logger.info(f"🔬 Профилирование следующих {self.remaining} циклов ({self.backend_name})")
+
+    def disarm(self):
+        self.remaining = 0
+
+    def profile(self, kind: str, user_id: int):
+        """Асинхронный контекст цикла: профилирует, если есть неизрасходованные циклы"""
+        if self.remaining <= 0 or self._active:
+            return _NO_PROFILE
+        self.remaining -= 1
+        return _ProfileSession(self, kind, user_id)
+
+    def _save(self, session: _ProfileSession, duration: float) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Миллисекунды и номер: профили одной секунды не перезаписывают друг друга
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")[:-3]
+        base = self.directory / f"{session.kind}_{session.user_id}_{stamp}"
+        sequence = 1
+        while any(self.directory.glob(f"{base.name}.*")):
+            sequence += 1
+            base = self.directory / f"{session.kind}_{session.user_id}_{stamp}-{sequence}"
+
+        if session.backend == "pyinstrument":
+            path = base.with_suffix(".html")
+            path.write_text(session._profiler.output_html(), encoding="utf-8")
+        else:
+            path = base.with_suffix(".prof")
+            session._profiler.dump_stats(path)
+            summary = io.StringIO()
+            summary.write(f"{session.kind} user={session.user_id} duration={duration:.3f}s\n\n")
+            stats = pstats.Stats(session._profiler, stream=summary)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(CPROFILE_SUMMARY_LINES)
+            base.with_suffix(".txt").write_text(summary.getvalue(), encoding="utf-8")
+
+        self.recent.append(path.name)
+        self._prune()
+        return path
+
+    def _prune(self):
+        """Удаляет самые старые профили сверх лимитов количества и размера
+
+        Профиль - все файлы с общим именем без расширения (.prof и .txt
+        cProfile считаются одним профилем и удаляются вместе).
+        """
+        profiles: Dict[str, List[Path]] = {}
+        for path in self.directory.iterdir():
+            if path.is_file():
+                profiles.setdefault(path.stem, []).append(path)
+        oldest_first = sorted(
+            profiles.items(),
+            key=lambda item: max(path.stat().st_mtime for path in item[1])
+        )
+        total = sum(path.stat().st_size for paths in profiles.values() for path in paths)
+
+        pruned = set()
+        while oldest_first and (len(oldest_first) > self.max_files or total > self.max_bytes):
+            stem, paths = oldest_first.pop(0)
+            for path in paths:
+                total -= path.stat().st_size
+                path.unlink(missing_ok=True)
+            pruned.add(stem)
+
+        if pruned:
+            kept = [name for name in self.recent if Path(name).stem not in pruned]
+            self.recent.clear()
+            self.recent.extend(kept)
+
+    def format_status(self) -> str:
+        """Блок для ответа на /profile"""
+        lines = [f"🔬 **Профилирование:** осталось циклов {self.remaining} ({self.backend_name})"]
+        if self._active:
+            lines.append("⏺️ Сейчас профилируется цикл")
+        if self.recent:
+            lines.append("📁 Последние профили:")
+            lines += [f"`{name}`" for name in reversed(self.recent)]
+        return "\n".join(lines)
+
+
+# Глобальный профилировщик циклов
+cycle_profiler = CycleProfiler(
+    directory=settings.PROFILE_DIR,
+    backend=settings.PROFILE_BACKEND,
+    max_files=settings.PROFILE_MAX_FILES,
+    max_mb=settings.PROFILE_MAX_MB,
+    cycles=settings.PROFILE_CYCLES,
+)
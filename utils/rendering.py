@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Единый рендеринг сообщений об объявлениях для Telegram
+
+Шаблоны компилируются один раз при импорте модуля, экранирование выполняется
+через заранее построенные таблицы str.translate, а готовый текст кэшируется
+по ключу (ID объявления, локаль, формат). При рассылке одного объявления
+нескольким пользователям оно рендерится только один раз.
+"""
+
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Tuple, NamedTuple
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Объявления отправляются в legacy Markdown (parse_mode="Markdown"): в нем
+# экранируются только _ * ` [, остальные символы с обратной косой чертой
+# Telegram показал бы как есть ("Dublin 4\."). Набор MarkdownV2 шире.
+MARKDOWN_PARSE_MODE = "Markdown"
+MARKDOWN_SPECIAL_CHARS = '_*`['
+MARKDOWN_ESCAPE_TABLE = str.maketrans({char: f'\\{char}' for char in MARKDOWN_SPECIAL_CHARS})
+
+HTML_ESCAPE_TABLE = str.maketrans({
+    '&': '&amp;',
+    '<': '&lt;',
+    '>': '&gt;',
+    '"': '&quot;',
+    "'": '&#x27;',
+})
+
+# Поля объявления, от которых зависит текст сообщения
+_FINGERPRINT_FIELDS = (
+    'title', 'price', 'bedrooms', 'location', 'property_type', 'description',
+    'url', 'price_formatted', 'bedrooms_formatted', 'ber_rating',
+)
+
+DESCRIPTION_LIMIT = 150
+
+
+def escape_markdown(text: Any) -> str:
+    """Экранирует специальные символы для legacy Markdown (MARKDOWN_PARSE_MODE)"""
+    if text is None:
+        return ""
+    return str(text).translate(MARKDOWN_ESCAPE_TABLE)
+
+
+def escape_html(text: Any) -> str:
+    """Экранирует специальные символы для HTML"""
+    if text is None:
+        return ""
+    return str(text).translate(HTML_ESCAPE_TABLE)
+
+
+def _format_bedrooms_plural(bedrooms: Any) -> str:
+    """Склоняет количество спален"""
+    if bedrooms == 0:
+        return "Studio"
+    if bedrooms == 1:
+        return "1 спальня"
+    if bedrooms in (2, 3, 4):
+        return f"{bedrooms} спальни"
+    return f"{bedrooms} спален"
+
+
+class RenderedListing(NamedTuple):
+    """Отрендеренное объявление, разбитое на части.
+
+    Между head и tail вставляется дополнительный текст (например, автор
+    в групповом чате), link добавляется в конец по необходимости.
+    """
+    head: str
+    tail: str
+    link: str
+
+
+# Скомпилированные шаблоны: (локаль, формат) -> связанные методы str.format
+TEMPLATES: Dict[Tuple[str, str], Dict[str, Any]] = {
+    ("ru", "markdown"): {
+        "head": "🏠 **{title}**\n\n💰 {price}\n🛏️ {bedrooms}\n📍 {location}\n🏠 {property_type}".format,
+        "description": "📝 {description}\n\n".format,
+        "link": "🔗 [Посмотреть объявление]({url})".format,
+        "defaults": {
+            "title": "Без названия",
+            "price": "Цена не указана",
+            "bedrooms": "Спальни не указаны",
+            "location": "Локация не указана",
+            "property_type": "Тип не указан",
+        },
+    },
+    ("ru", "html"): {
+        "head": "🏠 <b>{title}</b>\n\n💰 <b>Цена:</b> {price}\n🛏️ <b>Спальни:</b> {bedrooms}\n📍 <b>Район:</b> {location}".format,
+        "link": '🔗 <a href="{url}">Посмотреть на Daft.ie</a>'.format,
+        "defaults": {
+            "title": "Без названия",
+            "price": "Цена не указана",
+            "bedrooms": "Не указано",
+            "location": "Локация не указана",
+        },
+    },
+    ("ru", "plain"): {
+        "head": "🏠 {title}\n💰 {price}\n🛏️ {bedrooms}\n📍 {location}".format,
+        "ber": "\n⚡ BER: {ber_rating}".format,
+        "link": "\n🔗 {url}".format,
+        "defaults": {
+            "title": "Без названия",
+            "price": "Цена не указана",
+            "bedrooms": "Спальни не указаны",
+            "location": "Локация не указана",
+        },
+    },
+}
+
+
+class PropertyMessageRenderer:
+    """Рендерер сообщений с LRU-кэшем готовых текстов"""
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[Tuple[str, str, str], Tuple[tuple, RenderedListing]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        metrics.track_cache("render", self)
+
+    def render(self, prop: Dict[str, Any], fmt: str = "markdown", locale: str = "ru",
+               extra: str = "", include_link: bool = True) -> str:
+        """Возвращает текст сообщения для объявления"""
+        parts = self.render_parts(prop, fmt, locale)
+        message = parts.head + extra + parts.tail
+        if include_link:
+            message += parts.link
+        return message
+
+    def render_parts(self, prop: Dict[str, Any], fmt: str = "markdown",
+                     locale: str = "ru") -> RenderedListing:
+        """Возвращает части сообщения, используя кэш по ID объявления"""
+        listing_id = prop.get('property_id') or prop.get('url')
+        fingerprint = tuple(prop.get(field) for field in _FINGERPRINT_FIELDS)
+
+        if listing_id:
+            key = (str(listing_id), locale, fmt)
+            cached = self._cache.get(key)
+            # Содержимое объявления могло измениться (например, цена) - сверяем отпечаток
+            if cached is not None and cached[0] == fingerprint:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+
+        self.misses += 1
+        parts = self._build(prop, fmt, locale)
+
+        if listing_id:
+            self._cache[key] = (fingerprint, parts)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+        return parts
+
+    def clear(self):
+        """Очищает кэш"""
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Статистика попаданий в кэш"""
+        return {"entries": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+    def _build(self, prop: Dict[str, Any], fmt: str, locale: str) -> RenderedListing:
+        """Рендерит объявление без кэша"""
+        template = TEMPLATES.get((locale, fmt)) or TEMPLATES[("ru", fmt)]
+        defaults = template["defaults"]
+        url = prop.get('url') or ''
+
+        if fmt == "markdown":
+            price = f"€{prop['price']}" if prop.get('price') else defaults["price"]
+            bedrooms = f"{prop['bedrooms']} спален" if prop.get('bedrooms') else defaults["bedrooms"]
+            head = template["head"](
+                title=escape_markdown(prop.get('title') or defaults["title"]),
+                price=price,
+                bedrooms=bedrooms,
+                location=escape_markdown(prop.get('location') or defaults["location"]),
+                property_type=escape_markdown(prop.get('property_type') or defaults["property_type"]),
+            )
+            tail = "\n\n"
+            description = prop.get('description')
+            if description:
+                # Обрезаем до экранирования, чтобы не разорвать escape-последовательность
+                if len(description) > DESCRIPTION_LIMIT:
+                    description = description[:DESCRIPTION_LIMIT] + "..."
+                tail += template["description"](description=escape_markdown(description))
+            link = template["link"](url=url) if url else ""
+
+        elif fmt == "html":
+            price = f"€{prop['price']}" if prop.get('price') else defaults["price"]
+            bedrooms = prop.get('bedrooms')
+            head = template["head"](
+                title=escape_html(prop.get('title') or defaults["title"]),
+                price=price,
+                bedrooms=_format_bedrooms_plural(bedrooms) if bedrooms is not None else defaults["bedrooms"],
+                location=escape_html(prop.get('location') or defaults["location"]),
+            )
+            tail = "\n\n"
+            link = template["link"](url=escape_html(url)) if url else ""
+
+        elif fmt == "plain":
+            head = template["head"](
+                title=prop.get('title') or defaults["title"],
+                price=prop.get('price_formatted') or defaults["price"],
+                bedrooms=prop.get('bedrooms_formatted') or defaults["bedrooms"],
+                location=prop.get('location') or defaults["location"],
+            )
+            if prop.get('ber_rating'):
+                head += template["ber"](ber_rating=prop['ber_rating'])
+            tail = ""
+            link = template["link"](url=url) if url else ""
+
+        else:
+            raise ValueError(f"Неизвестный формат сообщения: {fmt}")
+
+        return RenderedListing(head, tail, link)
+
+
+# Общий рендерер процесса
+renderer = PropertyMessageRenderer()
+
+
+def render_property_message(prop: Dict[str, Any], fmt: str = "markdown", locale: str = "ru",
+                            extra: str = "", include_link: bool = True) -> str:
+    """Рендерит объявление через общий рендерер"""
+    return renderer.render(prop, fmt=fmt, locale=locale, extra=extra, include_link=include_link)